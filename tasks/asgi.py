@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tasks.settings')
+# Route the read-heavy views to their async versions (see user/async_views.py)
+os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
+# Persistent connections would pile up: every async request runs its queries on a new thread
+os.environ.setdefault('CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
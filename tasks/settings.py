@@ -4,16 +4,20 @@ Generated by 'django-admin startproject' using Django 5.1.6.
 """
 
 from pathlib import Path
-import os
+import importlib.util
+import environ
+from django.core.exceptions import ImproperlyConfigured
+
+env = environ.Env()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-v(mho8306pr4!^b1$xapv&h^x%=1ef%i6vqh(zb0@!hcnq_+^x')
+SECRET_KEY = env.str('SECRET_KEY', default='django-insecure-v(mho8306pr4!^b1$xapv&h^x%=1ef%i6vqh(zb0@!hcnq_+^x')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = os.environ.get('DEBUG', 'False') == 'True'
+DEBUG = env.bool('DEBUG', default=False)
 
 ALLOWED_HOSTS = ['django-crud-1cgj.onrender.com', 'localhost', '127.0.0.1']
 
@@ -30,7 +34,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise here
+    'user.middleware.QueryMetricsMiddleware',  # Outermost after security so session/auth queries count
+    'user.middleware.ReplicaRoutingMiddleware',
+    'user.middleware.AsyncWhiteNoiseMiddleware',  # WhiteNoise, kept async under ASGI
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -43,10 +49,17 @@ ROOT_URLCONF = 'tasks.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'user.instrumentation.InstrumentedDjangoTemplates',  # DjangoTemplates + render timing
         'DIRS': ['templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Compiled templates are kept per process, in development too; runserver's
+            # autoreloader resets the cache when a template file changes
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -60,11 +73,179 @@ TEMPLATES = [
 WSGI_APPLICATION = 'tasks.wsgi.application'
 
 # Database
+# DATABASE_URL selects the primary (a local SQLite file by default). Setting
+# DATABASE_REPLICA_URL adds a read replica for the REPLICA_READ_VIEWS below.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+    'default': env.db('DATABASE_URL', default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
+}
+if env('DATABASE_REPLICA_URL', default=''):
+    DATABASES['replica'] = {
+        **env.db('DATABASE_REPLICA_URL'),
+        'TEST': {'MIRROR': 'default'},
     }
+DATABASE_POOL = env.bool('DATABASE_POOL', default=False)
+if DATABASE_POOL and importlib.util.find_spec('psycopg_pool') is None:
+    # requirements.txt installs psycopg2, which has no pool
+    raise ImproperlyConfigured("DATABASE_POOL needs psycopg 3 with its pool: pip install 'psycopg[pool]'")
+for database in DATABASES.values():
+    if DATABASE_POOL:
+        # Django's connection pool (PostgreSQL with psycopg 3 only) replaces persistent connections
+        database['OPTIONS'] = {**database.get('OPTIONS', {}), 'pool': True}
+        database['CONN_MAX_AGE'] = 0
+    else:
+        # Reuse connections across requests instead of reconnecting every time;
+        # asgi.py sets 0 because each async request runs on a fresh thread
+        database['CONN_MAX_AGE'] = env.int('CONN_MAX_AGE', default=60)
+    database['CONN_HEALTH_CHECKS'] = True
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['user.routers.PrimaryReplicaRouter']
+
+# GET views (by URL name) that may read from a replica; form querysets are re-read on POST
+REPLICA_READ_VIEWS = [
+    'task_list', 'project_tasks', 'task_feed', 'export_tasks', 'task_search',
+    'create_task', 'update_task', 'create_project', 'update_project',
+]
+# How long a client's reads stay on the primary after it writes (should exceed replication lag)
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=5)
+
+# Cache
+# Local memory by default; point REDIS_URL at a shared server in production so
+# task_list entries and their invalidations are seen by every worker.
+# 'fragments' holds the rendered task rows (user.fragments); it is kept apart so
+# thousands of rows don't push the task_list entries out of the default cache.
+REDIS_URL = env.str('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+        'fragments': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'fragments',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'fragments': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'fragments',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        },
+    }
+
+# Sessions: 'db', 'cached_db' (reads from the cache, writes through to the table)
+# or 'signed_cookies' (no server-side storage; a logout can't revoke a copied
+# cookie). cached_db needs the shared REDIS_URL cache once there are several
+# workers, or a worker could keep serving a session another one ended.
+SESSION_ENGINES = {
+    'db': 'user.sessions.db',
+    'cached_db': 'user.sessions.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_MODE = env.str('SESSION_MODE', default='cached_db' if REDIS_URL else 'db')
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+
+# The cached backend comes first so new logins use it; sessions that name the stock one keep working
+AUTHENTICATION_BACKENDS = [
+    'user.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+# Seconds each process reuses a user loaded for a session (0 turns it off)
+AUTH_USER_CACHE_SECONDS = env.int('AUTH_USER_CACHE_SECONDS', default=30)
+
+# Seconds a user's computed task_list page stays cached (signals invalidate it earlier on change)
+TASK_LIST_CACHE_TIMEOUT = env.int('TASK_LIST_CACHE_TIMEOUT', default=300)
+
+# Seconds a rendered task row stays cached (0 turns row caching off)
+TASK_ROW_CACHE_TIMEOUT = env.int('TASK_ROW_CACHE_TIMEOUT', default=3600)
+
+# Completed tasks untouched for this many days are moved to the archive by `manage.py archive_tasks`
+TASK_ARCHIVE_AFTER_DAYS = env.int('TASK_ARCHIVE_AFTER_DAYS', default=90)
+
+# Projects with at least this many tasks are deleted on a background thread
+PROJECT_PURGE_BACKGROUND_TASKS = env.int('PROJECT_PURGE_BACKGROUND_TASKS', default=2000)
+
+# Delta sync (user.sync): tokens older than the retained events are refused, and
+# `manage.py prune_sync_events` deletes those events. The grace period keeps a
+# round's upper bound behind transactions that stamped a row but haven't committed.
+SYNC_EVENT_RETENTION_DAYS = env.int('SYNC_EVENT_RETENTION_DAYS', default=30)
+SYNC_COMMIT_GRACE_SECONDS = env.int('SYNC_COMMIT_GRACE_SECONDS', default=2)
+
+# Email. The default backend writes each message to a file under EMAIL_FILE_PATH, a local outbox.
+EMAIL_BACKEND = env.str('EMAIL_BACKEND', default='django.core.mail.backends.filebased.EmailBackend')
+EMAIL_FILE_PATH = env.str('EMAIL_FILE_PATH', default=str(BASE_DIR / 'outbox'))
+DEFAULT_FROM_EMAIL = env.str('DEFAULT_FROM_EMAIL', default='tasks@localhost')
+
+# `manage.py send_reminders` mails each user their overdue tasks and those due within this many days
+REMINDER_DUE_SOON_DAYS = env.int('REMINDER_DUE_SOON_DAYS', default=2)
+
+# Activity log (user.activity): events are buffered per process and written in
+# one bulk insert once this many are pending or the oldest is this many seconds old
+ACTIVITY_FLUSH_SIZE = env.int('ACTIVITY_FLUSH_SIZE', default=100)
+ACTIVITY_FLUSH_SECONDS = env.int('ACTIVITY_FLUSH_SECONDS', default=5)
+# The daemon thread that flushes idle processes; the test suite turns this off
+ACTIVITY_FLUSH_THREAD = env.bool('ACTIVITY_FLUSH_THREAD', default=True)
+# Events kept while the database refuses flushes; older ones are dropped beyond this
+ACTIVITY_MAX_PENDING = env.int('ACTIVITY_MAX_PENDING', default=10000)
+
+# Serve task_list, project_tasks and task_feed from user.async_views; asgi.py turns this on
+ASYNC_READ_VIEWS = env.bool('ASYNC_READ_VIEWS', default=False)
+
+# Request metrics (user.middleware.QueryMetricsMiddleware)
+# Off in production unless asked for: every request pays for the capture
+REQUEST_METRICS_ENABLED = env.bool('REQUEST_METRICS_ENABLED', default=DEBUG)
+REQUEST_METRICS_HEADERS = DEBUG  # X-DB-Queries / Server-Timing headers
+REQUEST_METRICS_STRICT = False  # Raise instead of warn on a blown budget; the test suite turns this on
+
+# Per-view ceilings keyed by URL name: any of 'queries', 'duplicates', 'db_ms'.
+# Counts include the session and user lookups every authenticated request makes.
+VIEW_QUERY_BUDGETS = {
+    'landing_page': {'queries': 2, 'duplicates': 0},
+    'register': {'queries': 8, 'duplicates': 0},
+    'login': {'queries': 9, 'duplicates': 0},
+    'logout': {'queries': 5, 'duplicates': 0},
+    'task_list': {'queries': 10, 'duplicates': 0},
+    'project_tasks': {'queries': 6, 'duplicates': 0},
+    'task_feed': {'queries': 4, 'duplicates': 0},
+    'project_activity': {'queries': 4, 'duplicates': 0},
+    'task_sync': {'queries': 8, 'duplicates': 0},
+    'export_tasks': {'queries': 3, 'duplicates': 0},
+    'task_search': {'queries': 6, 'duplicates': 0},
+    'archived_tasks': {'queries': 5, 'duplicates': 0},
+    'project_autocomplete': {'queries': 3, 'duplicates': 0},
+    'user_autocomplete': {'queries': 3, 'duplicates': 0},
+    'create_project': {'queries': 23, 'duplicates': 2},
+    'update_project': {'queries': 24, 'duplicates': 7},
+    'delete_project': {'queries': 31, 'duplicates': 2},  # One batch of tasks and one of archived tasks
+    'create_task': {'queries': 17, 'duplicates': 0},
+    'update_task': {'queries': 17, 'duplicates': 0},
+    'delete_task': {'queries': 13, 'duplicates': 0},
+    'bulk_task_action': {'queries': 24, 'duplicates': 0},
+    'bulk_task_permissions': {'queries': 8, 'duplicates': 1},
+    'manage_task_permissions': {'queries': 11, 'duplicates': 1},
+    'set_task_permission': {'queries': 9, 'duplicates': 1},
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # One JSON line per request at INFO; budget overruns at WARNING
+        'user.metrics': {
+            'handlers': ['console'],
+            'level': env.str('REQUEST_METRICS_LOG_LEVEL', default='WARNING'),
+            'propagate': False,
+        },
+    },
 }
 
 # Password validation
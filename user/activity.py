@@ -0,0 +1,265 @@
+"""
+Write-behind activity log: views record ActivityEvents, which wait in a
+per-process buffer and are written with one bulk_create when
+ACTIVITY_FLUSH_SIZE have piled up or the oldest is ACTIVITY_FLUSH_SECONDS
+old, so a request that records an event doesn't pay for an INSERT.
+
+Events join the buffer when the surrounding transaction commits. A daemon
+thread flushes an idle process (unless ACTIVITY_FLUSH_THREAD is off), and an
+atexit hook flushes on a normal shutdown. If the database is unavailable the
+events are kept for the next flush, up to ACTIVITY_MAX_PENDING; past that the
+oldest are dropped and logged. A flush that breaks a constraint is retried
+row by row, so one bad event can't hold up the rest. The feed trails the
+writes by up to ACTIVITY_FLUSH_SECONDS.
+"""
+import atexit
+import base64
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import Model, Q
+from django.utils import timezone
+from .models import ActivityEvent
+from .pagination import InvalidCursor
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_PAGE_SIZE = 50
+ACTIVITY_MAX_PAGE_SIZE = 200
+
+
+def flush_size():
+    return getattr(settings, 'ACTIVITY_FLUSH_SIZE', 100)
+
+
+def flush_seconds():
+    return getattr(settings, 'ACTIVITY_FLUSH_SECONDS', 5)
+
+
+def max_pending():
+    return getattr(settings, 'ACTIVITY_MAX_PENDING', 10000)
+
+
+def flush_thread_enabled():
+    return getattr(settings, 'ACTIVITY_FLUSH_THREAD', True)
+
+
+class ActivityBuffer:
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+        self.oldest = None  # time.monotonic() of the oldest pending event
+        self.dropped = 0
+        self.flusher = None
+        self.stopping = threading.Event()
+
+    def __len__(self):
+        return len(self.events)
+
+    def add(self, event):
+        with self.lock:
+            self.events.append(event)
+            self.trim()
+            if self.oldest is None:
+                self.oldest = time.monotonic()
+            due = self.is_due()
+            if self.flusher is None and flush_thread_enabled():
+                self.flusher = threading.Thread(
+                    target=self.flush_when_idle, args=(self.stopping,), name='activity-flusher', daemon=True,
+                )
+                self.flusher.start()
+        if due:
+            self.flush()
+
+    def trim(self):
+        # Called with the lock held
+        excess = len(self.events) - max_pending()
+        if excess > 0:
+            del self.events[:excess]
+            self.dropped += excess
+            logger.error('Activity buffer full; dropped %s events (%s in total)', excess, self.dropped)
+
+    def is_due(self):
+        return bool(self.events) and (
+            len(self.events) >= flush_size() or time.monotonic() - self.oldest >= flush_seconds()
+        )
+
+    def flush(self):
+        """
+        Write the pending events; returns how many were written. Safe to
+        call from any thread.
+        """
+        with self.lock:
+            events, self.events, self.oldest = self.events, [], None
+        if not events:
+            return 0
+        return self.write(events)
+
+    def requeue(self, events):
+        logger.exception('Writing %s activity events failed; keeping them for the next flush', len(events))
+        with self.lock:
+            self.events[:0] = events
+            self.oldest = time.monotonic()
+            self.trim()
+
+    def write(self, events):
+        # Actors deleted since their event was recorded would break the foreign key
+        actor_ids = {event.actor_id for event in events if event.actor_id is not None}
+        try:
+            if actor_ids:
+                existing = set(User.objects.filter(id__in=actor_ids).values_list('id', flat=True))
+                for event in events:
+                    if event.actor_id not in existing:
+                        event.actor_id = None
+            with transaction.atomic():
+                ActivityEvent.objects.bulk_create(events)
+            return len(events)
+        except IntegrityError:
+            logger.exception('Writing %s activity events broke a constraint; retrying one at a time', len(events))
+        except DatabaseError:
+            self.requeue(events)
+            return 0
+        written = 0
+        for i, event in enumerate(events):
+            try:
+                with transaction.atomic():
+                    ActivityEvent.objects.bulk_create([event])
+                written += 1
+            except IntegrityError:
+                with self.lock:
+                    self.dropped += 1
+                logger.exception('Dropped activity event %s %s %s', event.kind, event.action, event.object_id)
+            except DatabaseError:
+                self.requeue(events[i:])
+                break
+        return written
+
+    def flush_when_idle(self, stopping):
+        while not stopping.wait(max(flush_seconds() / 2, 0.1)):
+            with self.lock:
+                due = self.is_due()
+            if due:
+                self.flush()
+                # This thread's own connection; don't leave it open between flushes
+                connection.close()
+
+    def stop(self):
+        # Stop the flusher thread and wait for it; the next add() starts a new one
+        with self.lock:
+            flusher, self.flusher = self.flusher, None
+            stopping, self.stopping = self.stopping, threading.Event()
+        stopping.set()
+        if flusher is not None:
+            flusher.join()
+
+
+buffer = ActivityBuffer()
+atexit.register(buffer.flush)
+
+
+def flush():
+    return buffer.flush()
+
+
+def json_value(value):
+    if isinstance(value, Model):
+        return value.pk
+    if isinstance(value, (list, tuple, set)) or hasattr(value, 'model'):
+        return sorted(json_value(item) for item in value)
+    return value
+
+
+def diff(before, after):
+    # {field: [old, new]} for the fields whose value differs
+    return {
+        name: [json_value(before.get(name)), json_value(after.get(name))]
+        for name in after
+        if json_value(before.get(name)) != json_value(after.get(name))
+    }
+
+
+def form_changes(form):
+    # The changed fields of a bound, valid ModelForm, from its initial data
+    return diff(
+        {name: form.initial.get(name) for name in form.changed_data},
+        {name: form.cleaned_data.get(name) for name in form.changed_data},
+    )
+
+
+def record(actor, kind, action, object_id, project_id=None, summary='', changes=None):
+    event = ActivityEvent(
+        kind=kind, action=action, object_id=object_id, project_id=project_id,
+        actor_id=getattr(actor, 'pk', None), summary=summary[:255], changes=changes or {},
+        created_date=timezone.now(),
+    )
+    # Changes rolled back with their transaction are never logged
+    transaction.on_commit(lambda: buffer.add(event))
+
+
+def record_task(actor, action, task, changes=None):
+    record(actor, 'task', action, task.id, task.project_id, task.title, changes)
+
+
+def record_project(actor, action, project, changes=None):
+    record(actor, 'project', action, project.id, project.id, project.name, changes)
+
+
+def record_permission(actor, task, grantee, before, after):
+    # ``before``/``after`` are permission levels, None for no grant
+    if before == after:
+        return
+    action = 'created' if before is None else 'deleted' if after is None else 'updated'
+    record(
+        actor, 'permission', action, task.id, task.project_id, f'{grantee.username} on {task.title}',
+        {'user': [grantee.id, grantee.id], 'permission_type': [before, after]},
+    )
+
+
+def encode_cursor(event):
+    payload = json.dumps([event.created_date.isoformat(), event.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_date, event_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_date), int(event_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor.')
+
+
+def project_activity_page(project_id, cursor=None, limit=ACTIVITY_PAGE_SIZE):
+    """
+    ``(events, next_cursor)``: a page of ``project_id``'s activity, newest
+    first, seeking past ``cursor`` along activity_project_created_idx.
+    """
+    events = ActivityEvent.objects.filter(project_id=project_id).select_related('actor')
+    if cursor:
+        created_date, event_id = decode_cursor(cursor)
+        events = events.filter(
+            Q(created_date__lte=created_date),
+            Q(created_date__lt=created_date) | Q(id__lt=event_id),
+        )
+    rows = list(events.order_by('-created_date', '-id')[:limit + 1])
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
+
+
+def serialize_event(event):
+    return {
+        'id': event.id,
+        'kind': event.kind,
+        'action': event.action,
+        'object_id': event.object_id,
+        'summary': event.summary,
+        'changes': event.changes,
+        'actor': event.actor.username if event.actor else None,
+        'created_date': event.created_date.isoformat(),
+    }
@@ -1,4 +1,46 @@
-from django.contrib import admin
+import io
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect, render
+from django.urls import path
+from .importer import import_tasks, read_rows
 from .models import Task
 
-admin.site.register(Task)
\ No newline at end of file
+
+class TaskImportUploadForm(forms.Form):
+    file = forms.FileField()
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('jsonl', 'JSON Lines')])
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    change_list_template = 'admin/task_changelist.html'
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='user_task_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        if request.method == "POST":
+            form = TaskImportUploadForm(request.POST, request.FILES)
+            if form.is_valid():
+                # Decode the upload as a stream; rows are read and saved batch by batch
+                fileobj = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8', newline='')
+                result = import_tasks(read_rows(fileobj, form.cleaned_data['format']), request.user)
+                messages.success(request, f"Imported {result.created} tasks, rejected {result.error_count} rows.")
+                for line_number, errors in result.errors[:20]:
+                    details = '; '.join(f"{field}: {' '.join(msgs)}" for field, msgs in errors.items())
+                    messages.warning(request, f"Line {line_number}: {details}")
+                return redirect('admin:user_task_changelist')
+        else:
+            form = TaskImportUploadForm()
+        return render(request, 'admin/task_import.html', {
+            **self.admin_site.each_context(request),
+            'form': form,
+            'opts': self.model._meta,
+            'title': 'Import tasks',
+        })
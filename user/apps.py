@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .autocomplete import install_username_index
+        from .search import install_search_index
+        post_migrate.connect(install_search_index, sender=self)
+        post_migrate.connect(install_username_index, sender=self)
@@ -0,0 +1,82 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .bulk import delete_tasks, task_id_batches
+from .models import ArchivedTask, ArchivedTaskPermission, Project, Task, TaskPermission
+from .stats import task_state
+
+ARCHIVE_BATCH_SIZE = 500
+
+TASK_FIELDS = ['id', 'title', 'description', 'due_date', 'priority', 'status', 'user_id', 'project_id',
+               'created_date', 'updated_date']
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = getattr(settings, 'TASK_ARCHIVE_AFTER_DAYS', 90)
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable_tasks(cutoff):
+    # Completed tasks untouched since ``cutoff``; updated_date stands in for the completion time
+    return Task.objects.filter(status='Completed', updated_date__lt=cutoff)
+
+
+def archive_batch(task_ids, cutoff):
+    """
+    Move the tasks among ``task_ids`` that are still archivable, with their
+    permission rows, in one short transaction. Returns the number moved.
+    """
+    with transaction.atomic():
+        # Re-checked inside the transaction: a task reopened since the ID scan stays put
+        tasks = list(archivable_tasks(cutoff).filter(id__in=task_ids).only(*TASK_FIELDS))
+        if not tasks:
+            return 0
+        ArchivedTask.objects.bulk_create(
+            ArchivedTask(**{field: getattr(task, field) for field in TASK_FIELDS}) for task in tasks
+        )
+        ArchivedTaskPermission.objects.bulk_create(
+            ArchivedTaskPermission(
+                user_id=permission.user_id, task_id=permission.task_id, permission_type=permission.permission_type,
+                assigned_date=permission.assigned_date, assigned_by_id=permission.assigned_by_id,
+            )
+            for permission in TaskPermission.objects.filter(task_id__in=[task.id for task in tasks])
+        )
+        # Loaded above in this transaction; their states move the stats without a recount
+        delete_tasks(tasks, states=[task_state(task) for task in tasks])
+    return len(tasks)
+
+
+def archive_completed_tasks(days=None, batch_size=ARCHIVE_BATCH_SIZE, pause=0, progress=None):
+    """
+    Move completed tasks older than ``days`` (TASK_ARCHIVE_AFTER_DAYS by
+    default) into ArchivedTask, ``batch_size`` per transaction.
+
+    Each batch commits on its own, so the table is never locked for the whole
+    run and an interrupted run resumes where it stopped. ``pause`` seconds
+    between batches let other writers through; ``progress`` is called with
+    the running total after each batch.
+    """
+    cutoff = archive_cutoff(days)
+    moved = 0
+    for task_ids in task_id_batches(archivable_tasks(cutoff), batch_size):
+        moved += archive_batch(task_ids, cutoff)
+        if progress:
+            progress(moved)
+        if pause:
+            time.sleep(pause)
+    return moved
+
+
+def visible_archived_tasks(user):
+    # Same rules as permissions.visible_tasks, over the archive
+    if user.is_superuser:
+        return ArchivedTask.objects.all()
+    return ArchivedTask.objects.filter(
+        Q(user=user)
+        | Q(id__in=ArchivedTaskPermission.objects.filter(user=user).values('task_id'))
+        | Q(project__in=Project.assigned_users.through.objects.filter(user=user).values('project_id'))
+    )
@@ -0,0 +1,88 @@
+"""
+Async versions of the read-heavy views, served instead of the ones in
+views.py when ``settings.ASYNC_READ_VIEWS`` is on (asgi.py turns it on).
+
+Queries go through the async ORM, and the independent ones on each page are
+awaited together, so a request waiting on the database doesn't hold up the
+event loop. Rendering stays sync because templates read the lazy
+``request.user`` and the session-backed messages.
+"""
+import asyncio
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import JsonResponse
+from django.shortcuts import aget_object_or_404, render
+from . import cache as task_list_cache
+from .conditional import async_condition
+from .pagination import InvalidCursor, akeyset_page
+from .permissions import PermissionResolver, visible_projects, visible_tasks
+from .stats import alist, astats_for_projects
+from .views import (
+    PROJECTS_PER_PAGE, assemble_task_list, filter_feed, render_project_tasks, serialize_task,
+    task_counts_query, task_list_projects,
+)
+
+READ_VIEW_NAMES = ['task_list', 'project_tasks', 'task_feed']
+
+
+async def abuild_task_list(user, page_number):
+    projects = task_list_projects(user)
+    paginator = Paginator(projects, PROJECTS_PER_PAGE)
+    # Counted here so get_page() finds it cached instead of querying synchronously
+    paginator.count = await projects.acount()
+    page = paginator.get_page(page_number)
+    page_projects = await alist(page.object_list)
+    project_ids = [project.id for project in page_projects]
+    task_counts, project_stats = await asyncio.gather(
+        alist(task_counts_query(visible_tasks(user), project_ids)),
+        astats_for_projects(project_ids),
+    )
+    return assemble_task_list(user, page, page_projects, dict(task_counts), project_stats)
+
+
+@login_required
+@async_condition
+async def task_list(request):
+    user = await request.auser()
+    page_number = request.GET.get('page', '1')
+    if not page_number.isdigit():
+        page_number = '1'
+    data, hit = await task_list_cache.aget_or_build(
+        user, page_number, lambda: abuild_task_list(user, page_number)
+    )
+    response = await sync_to_async(render)(request, 'task_list.html', {
+        **data,
+        'is_admin': user.is_superuser,
+    })
+    response['X-Task-List-Cache'] = 'hit' if hit else 'miss'
+    return response
+
+
+@login_required
+@async_condition
+async def project_tasks(request, project_id):
+    user = await request.auser()
+    project = await aget_object_or_404(visible_projects(user), id=project_id)
+    tasks = visible_tasks(user).filter(project=project).select_related('user')
+    resolver = PermissionResolver(user, task_ids=tasks.values('id'))
+    tasks, _ = await asyncio.gather(alist(tasks), resolver.aload())
+    resolver.annotate(tasks)
+    return await sync_to_async(render_project_tasks)(request, project, tasks)
+
+
+@login_required
+@async_condition
+async def task_feed(request):
+    user = await request.auser()
+    tasks, limit, error = filter_feed(visible_tasks(user).select_related('project', 'user'), request.GET)
+    if error:
+        return JsonResponse({'error': error}, status=400)
+    try:
+        page, next_cursor = await akeyset_page(tasks, request.GET.get('cursor'), limit)
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'results': [serialize_task(task) for task in page],
+        'next_cursor': next_cursor,
+    })
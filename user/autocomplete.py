@@ -0,0 +1,51 @@
+"""
+Case-insensitive prefix search for the autocomplete pickers.
+
+``istartswith`` becomes ``LIKE`` (SQLite) or ``UPPER(col) LIKE`` (PostgreSQL),
+neither of which can seek an index, so a rare or missing prefix walked the
+whole table. Instead the lowered column is indexed and matched as a range,
+``q <= LOWER(col) < q'`` where ``q'`` is ``q`` with its last character bumped,
+which the index answers with a seek and the LIMIT then cuts short.
+"""
+from django.contrib.auth.models import User
+from django.db import connections
+from django.db.models import F, Index
+from django.db.models.functions import Lower
+
+# auth_user belongs to django.contrib.auth, so its index is installed after migrate
+USERNAME_INDEX = Index(Lower('username'), F('id'), name='auth_user_lower_username_idx')
+
+
+def install_username_index(using='default', **kwargs):
+    # post_migrate receiver
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        existing = connection.introspection.get_constraints(cursor, User._meta.db_table)
+    if USERNAME_INDEX.name not in existing:
+        with connection.schema_editor() as schema_editor:
+            schema_editor.add_index(User, USERNAME_INDEX)
+
+
+def prefix_upper_bound(prefix):
+    # The smallest string greater than every string starting with ``prefix``
+    last = ord(prefix[-1])
+    if last == 0x10FFFF:
+        return None
+    return prefix[:-1] + chr(last + 1)
+
+
+def prefix_search(queryset, field, query):
+    """
+    The rows of ``queryset`` whose ``field`` starts with ``query``, ignoring
+    case, in ``LOWER(field), id`` order to match the index.
+    """
+    rows = queryset.annotate(lowered=Lower(field)).order_by('lowered', 'id')
+    prefix = query.lower()
+    if not prefix:
+        return rows
+    rows = rows.filter(lowered__gte=prefix)
+    upper = prefix_upper_bound(prefix)
+    if upper is not None:
+        rows = rows.filter(lowered__lt=upper)
+    # The range is what the index seeks; startswith keeps the match exact under any collation
+    return rows.filter(lowered__startswith=prefix)
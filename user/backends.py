@@ -0,0 +1,70 @@
+import copy
+import time
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+
+MAX_CACHED_USERS = 10000
+
+# user id -> (expiry, user); per process, like the compiled templates
+_users = {}
+
+
+def cache_seconds():
+    return getattr(settings, 'AUTH_USER_CACHE_SECONDS', 30)
+
+
+def cached_user(user_id):
+    entry = _users.get(user_id)
+    if entry is None:
+        return None
+    expires, user = entry
+    if expires < time.monotonic():
+        _users.pop(user_id, None)
+        return None
+    # A copy per request: permission caches and attributes set on it stay with the request
+    return copy.copy(user)
+
+
+def remember_user(user):
+    seconds = cache_seconds()
+    if seconds <= 0:
+        return
+    if len(_users) >= MAX_CACHED_USERS:
+        _users.clear()
+    _users[user.pk] = (time.monotonic() + seconds, copy.copy(user))
+
+
+def forget_user(user_id):
+    _users.pop(user_id, None)
+
+
+def clear_user_cache():
+    _users.clear()
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that keeps the users it loads for sessions in a per-process
+    dict for AUTH_USER_CACHE_SECONDS, sparing AuthenticationMiddleware its
+    user query on most requests.
+
+    Saving or deleting a User evicts it in this process; other processes see
+    the change (a new password, a deactivation) when their entry expires, so
+    the TTL is kept short.
+    """
+
+    def get_user(self, user_id):
+        user = cached_user(user_id)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                remember_user(user)
+        return user
+
+    async def aget_user(self, user_id):
+        user = cached_user(user_id)
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is not None:
+                remember_user(user)
+        return user
@@ -0,0 +1,616 @@
+import asyncio
+import copy
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from io import BytesIO
+from types import ModuleType
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection, transaction
+from django.db.backends.signals import connection_created
+from django.template.loader import render_to_string
+from django.test import Client, override_settings
+from django.urls import include, path, reverse
+from django.utils import timezone
+from . import async_views, urls as user_urls, views
+from .backends import clear_user_cache
+from .export import chunked
+from .fragments import render_task_rows
+from .instrumentation import capture_metrics
+from .models import Task, Project, TaskPermission
+from .permissions import PERMISSION_LEVELS, visible_projects
+from .search import rebuild_search_index
+from .stats import refresh_project_stats
+
+SEED_BATCH_SIZE = 2000
+BENCHMARK_PASSWORD = 'bench-password'
+
+
+def seed_dataset(users=50, projects=20, tasks=2000, permission_density=0.5, assignments_per_project=5,
+                 seed=0, prefix='bench', batch_size=SEED_BATCH_SIZE):
+    """
+    Bulk insert a synthetic dataset: ``users`` regular users plus a
+    ``{prefix}-admin`` superuser, ``projects`` projects with
+    ``assignments_per_project`` assigned users each, ``tasks`` tasks spread over
+    them and about ``permission_density`` TaskPermission grants per task.
+    The same ``seed`` always produces the same data.
+    """
+    rng = random.Random(seed)
+    if User.objects.filter(username__startswith=f'{prefix}-').exists():
+        raise ValueError(f'Users prefixed {prefix!r} already exist; use another prefix or a fresh database.')
+
+    # One hash for everyone: PBKDF2 per user would dominate the seeding time
+    password = make_password(BENCHMARK_PASSWORD)
+    admin = User.objects.create(username=f'{prefix}-admin', password=password, is_superuser=True, is_staff=True)
+    User.objects.bulk_create(
+        (User(username=f'{prefix}-user-{i}', password=password) for i in range(users)),
+        batch_size=batch_size,
+    )
+    user_ids = list(User.objects.filter(username__startswith=f'{prefix}-user-').order_by('id').values_list('id', flat=True))
+
+    Project.objects.bulk_create(
+        (Project(name=f'{prefix} project {i}', user_id=rng.choice(user_ids)) for i in range(projects)),
+        batch_size=batch_size,
+    )
+    project_rows = list(
+        Project.objects.filter(name__startswith=f'{prefix} project ').order_by('id').values_list('id', 'user_id')
+    )
+    members = {}
+    assignments = []
+    for project_id, owner_id in project_rows:
+        assigned = rng.sample(user_ids, min(assignments_per_project, len(user_ids)))
+        members[project_id] = [owner_id, *assigned]
+        assignments.extend(Project.assigned_users.through(project_id=project_id, user_id=user_id) for user_id in assigned)
+    Project.assigned_users.through.objects.bulk_create(assignments, batch_size=batch_size, ignore_conflicts=True)
+
+    today = date.today()
+    statuses = [value for value, _ in Task.STATUS_CHOICES]
+    priorities = [value for value, _ in Task.PRIORITY_CHOICES]
+    project_ids = [project_id for project_id, _ in project_rows]
+
+    def make_task(i):
+        project_id = rng.choice(project_ids)
+        return Task(
+            title=f'{prefix} task {i}',
+            description='Synthetic benchmark task',
+            due_date=today + timedelta(days=rng.randint(-60, 60)),
+            priority=rng.choice(priorities),
+            status=rng.choice(statuses),
+            user_id=rng.choice(members[project_id]),
+            project_id=project_id,
+        )
+
+    for batch in chunked((make_task(i) for i in range(tasks)), batch_size):
+        Task.objects.bulk_create(batch)
+
+    task_ids = list(Task.objects.filter(project_id__in=project_ids).values_list('id', flat=True))
+    grant_count = int(len(task_ids) * permission_density)
+    permission_types = [value for value, _ in TaskPermission.PERMISSION_CHOICES]
+    grants = (
+        TaskPermission(
+            user_id=rng.choice(user_ids),
+            task_id=rng.choice(task_ids),
+            permission_type=rng.choice(permission_types),
+            assigned_by_id=admin.id,
+        )
+        for _ in range(grant_count)
+    )
+    for batch in chunked(grants, batch_size):
+        TaskPermission.objects.bulk_create(batch, ignore_conflicts=True)
+
+    # bulk_create skips the signals that maintain these
+    for batch in chunked(project_ids, 500):
+        refresh_project_stats(batch)
+    rebuild_search_index()
+    cache.clear()
+    clear_user_cache()
+    return {
+        'users': users + 1,
+        'projects': projects,
+        'tasks': tasks,
+        'permissions': TaskPermission.objects.filter(assigned_by=admin).count(),
+    }
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class Scenario:
+    """
+    One benchmarked request: ``request(client)`` issues it. ``cold`` clears the
+    cache first, and writes run in a rolled-back savepoint so every iteration
+    sees the same data.
+    """
+
+    def __init__(self, name, persona, request, cold=False, writes=False):
+        self.name = name
+        self.persona = persona
+        self.request = request
+        self.cold = cold
+        self.writes = writes
+
+    def run_once(self, client):
+        if self.cold:
+            cache.clear()
+        if not self.writes:
+            return self.request(client)
+        with transaction.atomic():
+            response = self.request(client)
+            transaction.set_rollback(True)
+        return response
+
+
+def build_scenarios(prefix='bench'):
+    admin = User.objects.get(username=f'{prefix}-admin')
+    # The regular persona is the first seeded user assigned to a project
+    regular = (
+        User.objects.filter(username__startswith=f'{prefix}-user-', assigned_projects__isnull=False)
+        .order_by('id').first()
+    )
+    project = Project.objects.filter(name__startswith=f'{prefix} project ').order_by('-stats__task_count', 'id').first()
+    if regular is None or project is None:
+        raise ValueError(f'No seeded {prefix!r} dataset found; run seed_benchmark_data first.')
+    task = Task.objects.filter(project=project).order_by('id').first()
+    # An editable task whose project is among the persona's TaskForm choices, so the update form validates
+    regular_task = Task.objects.filter(
+        taskpermission__user=regular,
+        taskpermission__permission_type__in=PERMISSION_LEVELS['edit'],
+        project__in=visible_projects(regular),
+    ).order_by('id').first()
+    regular_project = regular.assigned_projects.order_by('id').first()
+
+    def task_data(source, **overrides):
+        data = {
+            'title': source.title, 'description': source.description, 'due_date': source.due_date.isoformat(),
+            'priority': source.priority, 'status': source.status, 'project': source.project_id,
+        }
+        data.update(overrides)
+        return data
+
+    scenarios = []
+    for persona, persona_project, persona_task in (
+        ('superuser', project, task),
+        ('regular', regular_project, regular_task),
+    ):
+        scenarios += [
+            Scenario('task_list', persona, lambda c: c.get(reverse('task_list')), cold=True),
+            Scenario('task_list_cached', persona, lambda c: c.get(reverse('task_list'))),
+            Scenario('project_tasks', persona, lambda c, p=persona_project: c.get(reverse('project_tasks', args=[p.id])), cold=True),
+            Scenario('create_task_form', persona, lambda c: c.get(reverse('create_task'))),
+            Scenario('create_task', persona, lambda c, p=persona_project: c.post(reverse('create_task'), {
+                'title': 'benchmark created', 'description': 'x', 'due_date': date.today().isoformat(),
+                'priority': 'Medium', 'status': 'Pending', 'project': p.id,
+            }), writes=True),
+            Scenario('create_project_form', persona, lambda c: c.get(reverse('create_project'))),
+            Scenario('create_project', persona, lambda c: c.post(
+                reverse('create_project'), {'name': 'benchmark created', 'description': 'x'}), writes=True),
+        ]
+        if persona_task is not None:
+            scenarios += [
+                Scenario('update_task_form', persona, lambda c, t=persona_task: c.get(reverse('update_task', args=[t.id]))),
+                Scenario('update_task', persona, lambda c, t=persona_task: c.post(
+                    reverse('update_task', args=[t.id]), task_data(t, status='Completed')), writes=True),
+            ]
+    scenarios += [
+        Scenario('manage_task_permissions', 'superuser', lambda c: c.get(reverse('manage_task_permissions', args=[task.id]))),
+        Scenario('update_project_form', 'superuser', lambda c: c.get(reverse('update_project', args=[project.id]))),
+        Scenario('update_project', 'superuser', lambda c: c.post(reverse('update_project', args=[project.id]), {
+            'name': project.name, 'description': 'benchmark', 'assigned_users': list(project.assigned_users.values_list('id', flat=True)),
+        }), writes=True),
+    ]
+    return scenarios, {'superuser': admin, 'regular': regular}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@override_settings(REQUEST_METRICS_ENABLED=False, ALLOWED_HOSTS=['*'])
+def run_benchmarks(iterations=20, warmup=2, prefix='bench', only=None):
+    """
+    Drive each scenario ``iterations`` times through the test client and
+    return p50/p95 latency, queries per request and peak traced memory (from
+    one extra run under tracemalloc, so tracing doesn't skew the timings).
+    """
+    scenarios, personas = build_scenarios(prefix)
+    clients = {}
+    for name, user in personas.items():
+        clients[name] = Client()
+        clients[name].force_login(user)
+
+    results = []
+    with transaction.atomic():
+        for scenario in scenarios:
+            if only and scenario.name not in only:
+                continue
+            client = clients[scenario.persona]
+            for _ in range(warmup):
+                scenario.run_once(client)
+            timings, queries, statuses = [], [], set()
+            for _ in range(iterations):
+                with capture_metrics() as metrics:
+                    response = scenario.run_once(client)
+                timings.append(metrics.total_time * 1000)
+                queries.append(metrics.queries)
+                statuses.add(response.status_code)
+
+            tracemalloc.start()
+            try:
+                scenario.run_once(client)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+            results.append({
+                'scenario': scenario.name,
+                'persona': scenario.persona,
+                'status': sorted(statuses),
+                'p50_ms': round(statistics.median(timings), 2),
+                'p95_ms': round(percentile(timings, 0.95), 2),
+                'mean_ms': round(statistics.fmean(timings), 2),
+                'queries': max(queries),
+                'peak_memory_kb': round(peak / 1024, 1),
+            })
+        transaction.set_rollback(True)
+
+    return {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'iterations': iterations,
+        'dataset': {
+            'users': User.objects.filter(username__startswith=f'{prefix}-').count(),
+            'projects': Project.objects.filter(name__startswith=f'{prefix} project ').count(),
+            'tasks': Task.objects.filter(title__startswith=f'{prefix} task ').count(),
+        },
+        'results': results,
+    }
+
+
+def read_view_urlconf(read_views):
+    """
+    A copy of tasks.urls serving task_list, project_tasks and task_feed from
+    ``read_views`` (views or async_views), so both paths can run in one
+    process regardless of ASYNC_READ_VIEWS.
+    """
+    patterns = [
+        path(str(pattern.pattern), getattr(read_views, pattern.name), name=pattern.name)
+        if pattern.name in async_views.READ_VIEW_NAMES else pattern
+        for pattern in user_urls.urlpatterns
+    ]
+    urlconf = ModuleType(f'{read_views.__name__}_urlconf')
+    urlconf.urlpatterns = [path('admin/', admin.site.urls), path('', include(patterns))]
+    return urlconf
+
+
+WSGI_URLCONF = read_view_urlconf(views)
+ASGI_URLCONF = read_view_urlconf(async_views)
+
+
+def wsgi_get(handler, url, cookie):
+    request_path, _, query = url.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': request_path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_COOKIE': cookie, 'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO(), 'wsgi.errors': sys.stderr,
+    }
+    start = time.perf_counter()
+    response = handler(environ, lambda status, headers: None)
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+    return response.status_code, time.perf_counter() - start
+
+
+async def asgi_get(handler, url, cookie):
+    request_path, _, query = url.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': request_path, 'raw_path': request_path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    body_sent = False
+    status = None
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The client never disconnects; the handler cancels this once it has responded
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    start = time.perf_counter()
+    await handler(scope, receive, send)
+    return status, time.perf_counter() - start
+
+
+def summarize(timings, statuses, elapsed):
+    timings_ms = [timing * 1000 for timing in timings]
+    return {
+        'requests': len(timings),
+        'status': sorted(statuses),
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_s': round(len(timings) / elapsed, 1),
+        'p50_ms': round(statistics.median(timings_ms), 2),
+        'p95_ms': round(percentile(timings_ms, 0.95), 2),
+    }
+
+
+def run_wsgi_load(urls, cookie, threads):
+    # A gunicorn gthread worker: ``threads`` requests in flight, the rest queue
+    handler = WSGIHandler()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda url: wsgi_get(handler, url, cookie), urls))
+    elapsed = time.perf_counter() - start
+    return summarize([timing for _, timing in results], {status for status, _ in results}, elapsed)
+
+
+def run_asgi_load(urls, cookie, concurrency):
+    handler = ASGIHandler()
+
+    async def drive():
+        slots = asyncio.Semaphore(concurrency)
+
+        async def one(url):
+            async with slots:
+                return await asgi_get(handler, url, cookie)
+
+        return await asyncio.gather(*(one(url) for url in urls))
+
+    start = time.perf_counter()
+    results = asyncio.run(drive())
+    elapsed = time.perf_counter() - start
+    return summarize([timing for _, timing in results], {status for status, _ in results}, elapsed)
+
+
+@override_settings(REQUEST_METRICS_ENABLED=False, ALLOWED_HOSTS=['*'])
+def run_load_test(requests=300, concurrency=50, wsgi_threads=4, db_latency_ms=0, prefix='bench'):
+    """
+    Send ``requests`` GETs to task_list, project_tasks and task_feed as the
+    regular persona, ``concurrency`` at a time, once through the WSGI
+    handler on ``wsgi_threads`` threads and once through the ASGI handler
+    with the async read views, and report throughput and latency of each.
+
+    ``db_latency_ms`` adds a sleep to every query to stand in for the
+    network round trip to a database server; an in-process SQLite file has
+    none, which hides most of what async waiting buys.
+    """
+    _, personas = build_scenarios(prefix)
+    user = personas['regular']
+    project = user.assigned_projects.order_by('id').first()
+    paths = [reverse('task_list'), reverse('project_tasks', args=[project.id]), reverse('task_feed')]
+    urls = [paths[i % len(paths)] for i in range(requests)]
+
+    client = Client()
+    client.force_login(user)
+    cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+    def add_latency(execute, sql, params, many, context):
+        time.sleep(db_latency_ms / 1000)
+        return execute(sql, params, many, context)
+
+    def on_connection(sender, connection, **kwargs):
+        # Fires on every reconnect of the same per-thread connection object
+        if add_latency not in connection.execute_wrappers:
+            connection.execute_wrappers.append(add_latency)
+
+    if db_latency_ms:
+        connection_created.connect(on_connection)
+    try:
+        report = {}
+        with override_settings(ROOT_URLCONF=WSGI_URLCONF):
+            report['wsgi'] = run_wsgi_load(urls, cookie, wsgi_threads)
+        with override_settings(ROOT_URLCONF=ASGI_URLCONF):
+            report['asgi'] = run_asgi_load(urls, cookie, concurrency)
+    finally:
+        connection_created.disconnect(on_connection)
+        client.logout()
+    return {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'concurrency': concurrency,
+        'wsgi_threads': wsgi_threads,
+        'db_latency_ms': db_latency_ms,
+        **report,
+    }
+
+
+SESSION_MODES = [
+    # (label, SESSION_ENGINE, AUTH_USER_CACHE_SECONDS); the first is Django's stock setup
+    ('db_stock', 'django.contrib.sessions.backends.db', 0),
+    ('db', 'user.sessions.db', 30),
+    ('cached_db', 'user.sessions.cached_db', 30),
+    ('signed_cookies', 'django.contrib.sessions.backends.signed_cookies', 30),
+]
+
+
+def table_queries(metrics, table):
+    # (reads, writes) among the captured statements that touch ``table``
+    quoted = connection.ops.quote_name(table)
+    reads = writes = 0
+    for sql, count in metrics.fingerprints.items():
+        if quoted in sql:
+            if sql.upper().startswith('SELECT'):
+                reads += count
+            else:
+                writes += count
+    return reads, writes
+
+
+def session_request_profile(metrics):
+    session_reads, session_writes = table_queries(metrics, Session._meta.db_table)
+    user_reads, user_writes = table_queries(metrics, User._meta.db_table)
+    return {
+        'queries': metrics.queries,
+        'session_reads': session_reads,
+        'session_writes': session_writes,
+        'user_reads': user_reads,
+        'user_writes': user_writes,
+    }
+
+
+@override_settings(REQUEST_METRICS_ENABLED=False, ALLOWED_HOSTS=['*'])
+def run_session_benchmark(page_views=20, prefix='bench'):
+    """
+    Log the regular persona in through the login view under each of
+    SESSION_MODES, then request the (cached) task_list ``page_views`` times,
+    and report the database round trips of the login and of an average page
+    view, split into session-table and user-table reads and writes.
+    """
+    _, personas = build_scenarios(prefix)
+    username = personas['regular'].username
+    results = []
+    with transaction.atomic():
+        for label, engine, user_cache_seconds in SESSION_MODES:
+            with override_settings(SESSION_ENGINE=engine, AUTH_USER_CACHE_SECONDS=user_cache_seconds):
+                cache.clear()
+                clear_user_cache()
+                client = Client()
+                with capture_metrics() as login_metrics:
+                    response = client.post(reverse('login'), {'username': username, 'password': BENCHMARK_PASSWORD})
+                if response.status_code != 302:
+                    raise ValueError(f'Logging in as {username!r} failed; was the dataset seeded with this prefix?')
+                # Fills the task_list cache, so the measured views are mostly auth and session work
+                client.get(reverse('task_list'))
+
+                profiles, timings = [], []
+                for _ in range(page_views):
+                    with capture_metrics() as metrics:
+                        client.get(reverse('task_list'))
+                    timings.append(metrics.total_time * 1000)
+                    profiles.append(session_request_profile(metrics))
+            results.append({
+                'mode': label,
+                'login': session_request_profile(login_metrics),
+                'page_view': {
+                    **{key: round(statistics.fmean(profile[key] for profile in profiles), 2) for key in profiles[0]},
+                    'p50_ms': round(statistics.median(timings), 2),
+                },
+            })
+        transaction.set_rollback(True)
+    clear_user_cache()
+    return {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'page_views': page_views,
+        'results': results,
+    }
+
+
+RENDER_MODES = [
+    # (label, cached template loader, row cache)
+    ('uncached_loader', False, False),
+    ('cached_loader', True, False),
+    ('row_cache_cold', True, True),
+    ('row_cache_warm', True, True),
+]
+
+
+def uncached_templates():
+    # settings.TEMPLATES with each cached loader replaced by the loaders it wraps
+    templates = copy.deepcopy(settings.TEMPLATES)
+    for backend in templates:
+        loaders = []
+        for loader in backend['OPTIONS'].get('loaders', []):
+            if isinstance(loader, tuple) and loader[0] == 'django.template.loaders.cached.Loader':
+                loaders.extend(loader[1])
+            else:
+                loaders.append(loader)
+        backend['OPTIONS']['loaders'] = loaders
+    return templates
+
+
+def render_dataset(count, owners=20):
+    # Unsaved tasks as PermissionResolver leaves them, for a regular viewer
+    now = timezone.now()
+    today = date.today()
+    people = [User(id=i + 1, username=f'render-owner-{i}') for i in range(owners)]
+    project = Project(id=1, name='Render benchmark')
+    statuses = [value for value, _ in Task.STATUS_CHOICES]
+    priorities = [value for value, _ in Task.PRIORITY_CHOICES]
+    tasks = []
+    for i in range(count):
+        task = Task(
+            id=i + 1, title=f'Render task {i}', description='', due_date=today + timedelta(days=i % 60),
+            priority=priorities[i % len(priorities)], status=statuses[i % len(statuses)],
+            user=people[i % owners], project=project, updated_date=now,
+        )
+        task.has_edit_permission = i % 2 == 0
+        task.has_delete_permission = i % 3 == 0
+        tasks.append(task)
+    return project, tasks, User(id=owners + 1, username='render-viewer')
+
+
+def run_render_benchmark(tasks=10000, iterations=5):
+    """
+    Render project_tasks.html for one project of ``tasks`` tasks under each
+    of RENDER_MODES and report the p50 render time. The rows go to a private
+    local-memory cache, so no shared cache is touched; against Redis, add
+    the get_many/set_many round trips.
+    """
+    project, rows, viewer = render_dataset(tasks)
+    fragments = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'render-benchmark',
+        'OPTIONS': {'MAX_ENTRIES': tasks * 2},
+    }
+    results = []
+    for label, cached_loader, row_cache in RENDER_MODES:
+        with override_settings(
+            TEMPLATES=settings.TEMPLATES if cached_loader else uncached_templates(),
+            CACHES={**settings.CACHES, 'fragments': fragments},
+            TASK_ROW_CACHE_TIMEOUT=3600 if row_cache else 0,
+        ):
+            timings = []
+            for i in range(iterations + (label == 'row_cache_warm')):
+                if label == 'row_cache_cold':
+                    caches['fragments'].clear()
+                start = time.perf_counter()
+                html = render_to_string('project_tasks.html', {
+                    'project': project, 'tasks': rows, 'task_rows': render_task_rows(rows, viewer),
+                })
+                timings.append((time.perf_counter() - start) * 1000)
+            if label == 'row_cache_warm':
+                # The first pass filled the cache
+                timings = timings[1:]
+        results.append({
+            'mode': label,
+            'p50_ms': round(statistics.median(timings), 2),
+            'min_ms': round(min(timings), 2),
+            'html_kb': round(len(html) / 1024, 1),
+        })
+    return {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'tasks': tasks,
+        'iterations': iterations,
+        'results': results,
+    }
@@ -0,0 +1,269 @@
+import logging
+import threading
+from django.db import connections, router, transaction
+from django.utils import timezone
+from .models import ArchivedTask, ArchivedTaskPermission, Project, SyncEvent, Task, TaskPermission
+from .permissions import PermissionResolver, visible_tasks
+from .search import unindex_tasks
+from .signals import bulk_tasks_changed, project_audience, tasks_audience
+from .sync import grant_removal_events, membership_events, record_events, task_removal_events
+from . import cache as task_list_cache
+
+logger = logging.getLogger(__name__)
+
+# Permission each bulk operation needs on every task it touches
+BULK_OPERATIONS = {
+    'set_status': 'edit',
+    'set_priority': 'edit',
+    'move_project': 'edit',
+    'delete': 'delete',
+}
+
+# Upper bound on task IDs per request, keeping each IN (...) list and UPDATE bounded
+BULK_ACTION_LIMIT = 1000
+
+
+def partition_tasks(user, task_ids, required_permission):
+    """
+    Split ``task_ids`` into the tasks ``user`` may act on and the IDs that are
+    skipped (missing, invisible or lacking ``required_permission``), checking
+    the whole set with one task query and one permission query.
+    """
+    tasks = list(visible_tasks(user).filter(id__in=task_ids).only('id', 'user_id', 'project_id'))
+    resolver = PermissionResolver(user, task_ids=[task.id for task in tasks])
+    allowed = [task for task in tasks if resolver.has_permission(task, required_permission)]
+    allowed_ids = {task.id for task in allowed}
+    skipped = sorted(task_id for task_id in set(task_ids) if task_id not in allowed_ids)
+    return allowed, skipped
+
+
+def task_states(task_ids):
+    # stats.task_state of each task as stored; read inside the writer's transaction
+    rows = Task.objects.filter(id__in=task_ids).values_list('project_id', 'status', 'priority', 'due_date')
+    return list(rows)
+
+
+def changed_state(state, changes):
+    project_id, status, priority, due_date = state
+    return (
+        changes.get('project_id', project_id), changes.get('status', status),
+        changes.get('priority', priority), changes.get('due_date', due_date),
+    )
+
+
+def update_tasks(tasks, **changes):
+    # One UPDATE for the whole set; update() skips auto_now, so stamp updated_date here
+    task_ids = [task.id for task in tasks]
+    if not task_ids:
+        return 0
+    audience = tasks_audience(task_ids)
+    project_ids = {task.project_id for task in tasks}
+    if 'project_id' in changes:
+        project_ids.add(changes['project_id'])
+    with transaction.atomic():
+        states = task_states(task_ids)
+        updated = Task.objects.filter(id__in=task_ids).update(updated_date=timezone.now(), **changes)
+        if 'project_id' in changes:
+            record_events([
+                SyncEvent(kind='task', object_id=task.id, project_id=task.project_id)
+                for task in tasks if task.project_id and task.project_id != changes['project_id']
+            ])
+        # Only the project name (not status or priority) is part of the search document
+        bulk_tasks_changed(
+            project_ids=project_ids, user_ids=audience,
+            task_ids=task_ids if 'project_id' in changes else (),
+            stat_changes=[(state, changed_state(state, changes)) for state in states],
+        )
+    return updated
+
+
+# Reverse relations delete_rows assumes each model has. It skips the collector,
+# so callers delete these first; the per-row delete signals are skipped too, and
+# callers do their work (bulk_tasks_changed, record_events, unindex_tasks).
+# SyncEvent and ActivityEvent refer to tasks by plain id, not by foreign key.
+PLAIN_DELETE_DEPENDENTS = {
+    Task: {TaskPermission},
+    TaskPermission: set(),
+    ArchivedTask: {ArchivedTaskPermission},
+    ArchivedTaskPermission: set(),
+}
+
+
+def delete_rows(model, field, values):
+    """
+    ``DELETE FROM <table> WHERE <field> IN (values)`` as one plain statement:
+    no rows are loaded, no cascades followed and no signals sent. Only for
+    the models in PLAIN_DELETE_DEPENDENTS. Returns the number of rows deleted.
+    """
+    if model not in PLAIN_DELETE_DEPENDENTS:
+        raise ValueError(f'delete_rows does not know the dependents of {model.__name__}')
+    values = list(values)
+    if not values:
+        return 0
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    sql = 'DELETE FROM {} WHERE {} IN ({})'.format(
+        quote(model._meta.db_table), quote(model._meta.get_field(field).column), ', '.join(['%s'] * len(values)),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, values)
+        return cursor.rowcount
+
+
+def delete_tasks(tasks, states=None):
+    """
+    Delete ``tasks`` and their TaskPermission rows with one DELETE each.
+
+    ``QuerySet.delete()`` would load every row into the collector to send the
+    per-row signals; delete_rows skips that and bulk_tasks_changed does their
+    work for the whole set. Callers that loaded the tasks in the current
+    transaction pass their stats.task_state as ``states`` to spare a query.
+    """
+    task_ids = [task.id for task in tasks]
+    if not task_ids:
+        return 0
+    audience = tasks_audience(task_ids)
+    with transaction.atomic():
+        grants = TaskPermission.objects.filter(task_id__in=task_ids)
+        record_events(task_removal_events(tasks) + grant_removal_events(grants.values_list('task_id', 'user_id')))
+        if states is None:
+            states = task_states(task_ids)
+        delete_rows(TaskPermission, 'task', task_ids)
+        deleted = delete_rows(Task, 'id', task_ids)
+        bulk_tasks_changed(
+            project_ids={task.project_id for task in tasks}, user_ids=audience, task_ids=task_ids,
+            stat_changes=[(state, None) for state in states],
+        )
+    return deleted
+
+
+# TaskPermission rows written or deleted per statement
+PERMISSION_BATCH_SIZE = 5000
+
+
+def task_id_batches(tasks, batch_size):
+    # Keyset walk over the task IDs so no cursor stays open across the writes
+    last_id = 0
+    while True:
+        task_ids = list(
+            tasks.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not task_ids:
+            return
+        yield task_ids
+        last_id = task_ids[-1]
+
+
+def grant_permissions(tasks, user_ids, permission_type, assigned_by, batch_size=PERMISSION_BATCH_SIZE):
+    """
+    Give every user in ``user_ids`` ``permission_type`` on every task in the
+    ``tasks`` queryset, overwriting existing grants like the update_or_create
+    in manage_task_permissions does. Returns the number of rows written.
+    """
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return 0
+    written = 0
+    for task_ids in task_id_batches(tasks, max(batch_size // len(user_ids), 1)):
+        rows = [
+            TaskPermission(user_id=user_id, task_id=task_id, permission_type=permission_type, assigned_by_id=assigned_by.id)
+            for task_id in task_ids
+            for user_id in user_ids
+        ]
+        with transaction.atomic():
+            TaskPermission.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['user', 'task'],
+                update_fields=['permission_type', 'assigned_by', 'updated_date'],
+            )
+        written += len(rows)
+    # Grants only change what the grantees see
+    task_list_cache.invalidate_users(user_ids)
+    return written
+
+
+def revoke_permissions(tasks, user_ids, batch_size=PERMISSION_BATCH_SIZE):
+    # Delete the users' grants on the ``tasks`` queryset in bounded batches
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return 0
+    deleted = 0
+    for task_ids in task_id_batches(tasks, max(batch_size // len(user_ids), 1)):
+        grants = list(
+            TaskPermission.objects.filter(user_id__in=user_ids, task_id__in=task_ids).values_list('id', 'task_id', 'user_id')
+        )
+        # Events for grants that turn out to survive are dropped when read
+        record_events(grant_removal_events([(task_id, user_id) for _, task_id, user_id in grants]))
+        deleted += delete_rows(TaskPermission, 'id', [grant_id for grant_id, _, _ in grants])
+    task_list_cache.invalidate_users(user_ids)
+    return deleted
+
+
+# Tasks deleted per transaction by purge_project
+PROJECT_PURGE_BATCH_SIZE = 1000
+
+
+def purge_project(project, batch_size=PROJECT_PURGE_BATCH_SIZE, progress=None):
+    """
+    Delete ``project`` and everything under it with set-based DELETEs,
+    ``batch_size`` tasks (with their permission rows) per transaction.
+
+    ``project.delete()`` would have the collector load every task and
+    permission row and delete them in one long transaction. The live and
+    archived tasks go first here, so the final ``delete()`` only cascades
+    over the small per-project rows. Returns the number of tasks deleted;
+    ``progress`` is called with the running total after each batch.
+    """
+    # The project's own audience is invalidated by the pre_delete signal
+    audience = set()
+    deleted = 0
+    for task_ids in task_id_batches(Task.objects.filter(project_id=project.id), batch_size):
+        audience |= tasks_audience(task_ids)
+        with transaction.atomic():
+            # Project members get one event for the project from the pre_delete signal
+            grants = TaskPermission.objects.filter(task_id__in=task_ids)
+            record_events(
+                task_removal_events(Task.objects.filter(id__in=task_ids).only('id', 'user_id'), project_scoped=False)
+                + grant_removal_events(grants.values_list('task_id', 'user_id'))
+            )
+            delete_rows(TaskPermission, 'task', task_ids)
+            deleted += delete_rows(Task, 'id', task_ids)
+            unindex_tasks(task_ids)
+        if progress:
+            progress(deleted)
+    for task_ids in task_id_batches(ArchivedTask.objects.filter(project_id=project.id), batch_size):
+        with transaction.atomic():
+            delete_rows(ArchivedTaskPermission, 'task', task_ids)
+            delete_rows(ArchivedTask, 'id', task_ids)
+    project.delete()
+    task_list_cache.invalidate_users(audience)
+    return deleted
+
+
+def mark_pending_deletion(project):
+    # Hide the project from every view until purge_project gets to it
+    Project.objects.filter(id=project.id).update(pending_deletion=True)
+    project.pending_deletion = True
+    audience = project_audience({project.id})
+    record_events(membership_events(project.id, audience))
+    task_list_cache.invalidate_users(audience)
+    task_list_cache.invalidate_superusers()
+
+
+def purge_in_background(project):
+    """
+    Mark ``project`` pending deletion and purge it on a thread once the
+    current transaction commits. A purge cut short by a restart is finished
+    by ``manage.py purge_projects --pending``.
+    """
+    def run():
+        try:
+            purge_project(project)
+        except Exception:
+            logger.exception('Purging project %s failed', project.id)
+        finally:
+            connections.close_all()
+
+    mark_pending_deletion(project)
+    transaction.on_commit(lambda: threading.Thread(target=run, name=f'purge-project-{project.id}', daemon=True).start())
@@ -0,0 +1,141 @@
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.cache import cache
+from .routers import primary_reads
+
+# Superusers all see the same task_list data, so they share one version/scope
+SUPERUSER_SCOPE = 'admin'
+
+HITS_KEY = 'task_list:stats:hits'
+MISSES_KEY = 'task_list:stats:misses'
+
+
+def get_timeout():
+    return getattr(settings, 'TASK_LIST_CACHE_TIMEOUT', 300)
+
+
+def scope_for(user):
+    return SUPERUSER_SCOPE if user.is_superuser else str(user.pk)
+
+
+def version_key(scope):
+    return f'task_list:version:{scope}'
+
+
+def changed_key(scope):
+    return f'task_list:changed:{scope}'
+
+
+def initial_version():
+    # Start from the clock so a version lost to eviction never reuses an old number
+    return int(time.time() * 1000)
+
+
+def get_version(scope):
+    key = version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, initial_version(), timeout=None)
+        version = cache.get(key, 0)
+    return version
+
+
+async def aget_version(scope):
+    key = version_key(scope)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, initial_version(), timeout=None)
+        version = await cache.aget(key, 0)
+    return version
+
+
+def bump_version(scope):
+    key = version_key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Nothing cached under this scope yet
+        cache.add(key, initial_version(), timeout=None)
+    cache.set(changed_key(scope), time.time(), timeout=None)
+
+
+def last_changed(scope):
+    # When anything visible to ``scope`` last changed, or None if unknown
+    changed = cache.get(changed_key(scope))
+    if changed is None:
+        return None
+    return datetime.fromtimestamp(changed, tz=timezone.utc)
+
+
+def invalidate_users(user_ids):
+    """
+    Drop the cached task_list data of the given users.
+
+    Bumping a per-user version orphans every cached page at once; stale
+    entries simply age out of the backend.
+    """
+    for user_id in set(user_ids):
+        if user_id is not None:
+            bump_version(str(user_id))
+
+
+def invalidate_superusers():
+    bump_version(SUPERUSER_SCOPE)
+
+
+def count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+async def acount(key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, timeout=None)
+        await cache.aincr(key)
+
+
+def stats():
+    return {
+        'hits': cache.get(HITS_KEY, 0),
+        'misses': cache.get(MISSES_KEY, 0),
+    }
+
+
+def get_or_build(user, page, build):
+    """
+    Return ``(data, hit)`` for ``user``'s task_list ``page``, calling ``build``
+    on a miss.
+    """
+    scope = scope_for(user)
+    key = f'task_list:{scope}:{get_version(scope)}:{page}'
+    data = cache.get(key)
+    if data is not None:
+        count(HITS_KEY)
+        return data, True
+    count(MISSES_KEY)
+    # Entries outlive replication lag, so they are built from the primary
+    with primary_reads():
+        data = build()
+    cache.set(key, data, get_timeout())
+    return data, False
+
+
+async def aget_or_build(user, page, build):
+    # get_or_build for the async views; ``build`` is a coroutine function
+    scope = scope_for(user)
+    key = f'task_list:{scope}:{await aget_version(scope)}:{page}'
+    data = await cache.aget(key)
+    if data is not None:
+        await acount(HITS_KEY)
+        return data, True
+    await acount(MISSES_KEY)
+    with primary_reads():
+        data = await build()
+    await cache.aset(key, data, get_timeout())
+    return data, False
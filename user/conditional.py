@@ -0,0 +1,90 @@
+import hashlib
+from datetime import date
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from . import cache as task_list_cache
+from .permissions import visible_tasks
+
+
+def task_state(request):
+    """
+    Cheap validator for everything ``request.user`` can see: one aggregate over
+    their visible tasks plus the task_list cache version, which signals bump on
+    project, assignment, permission and delete changes that the aggregate alone
+    would miss. Memoized on the request for the ETag and Last-Modified checks.
+    """
+    if not hasattr(request, '_task_state'):
+        scope = task_list_cache.scope_for(request.user)
+        aggregate = visible_tasks(request.user).order_by().aggregate(
+            last_updated=Max('updated_date'), count=Count('id')
+        )
+        request._task_state = {
+            'version': task_list_cache.get_version(scope),
+            'changed': task_list_cache.last_changed(scope),
+            **aggregate,
+        }
+    return request._task_state
+
+
+def has_pending_messages(request):
+    # A 304 would swallow queued flash messages
+    return len(get_messages(request)) > 0
+
+
+def task_etag(request, *args, **kwargs):
+    if has_pending_messages(request):
+        return None
+    state = task_state(request)
+    # The date is part of the tag because overdue counts roll over at midnight
+    raw = f"{request.user.pk}:{state['version']}:{state['last_updated']}:{state['count']}:{date.today()}"
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def task_last_modified(request, *args, **kwargs):
+    if has_pending_messages(request):
+        return None
+    state = task_state(request)
+    if state['changed'] is None:
+        # Without the change timestamp a deletion could go unnoticed
+        return None
+    if state['last_updated'] is None:
+        return state['changed']
+    return max(state['changed'], state['last_updated'])
+
+
+def validators(request):
+    etag = task_etag(request)
+    last_modified = task_last_modified(request)
+    return (
+        quote_etag(etag) if etag else None,
+        int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def async_condition(view):
+    """
+    ``condition(etag_func=task_etag, last_modified_func=task_last_modified)``
+    for coroutine views. Django's decorator calls the validators inline, and
+    they query the database and the session, which isn't allowed on the
+    event loop.
+    """
+    @wraps(view)
+    async def inner(request, *args, **kwargs):
+        # request.auser() and the lazy request.user cache separately; share
+        # the user login_required already loaded instead of fetching it twice
+        request.user = await request.auser()
+        etag, last_modified = await sync_to_async(validators)(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await view(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD'):
+            if last_modified and not response.has_header('Last-Modified'):
+                response.headers['Last-Modified'] = http_date(last_modified)
+            if etag:
+                response.headers.setdefault('ETag', etag)
+        return response
+    return inner
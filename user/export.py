@@ -0,0 +1,91 @@
+import csv
+import json
+from collections import defaultdict
+from .models import TaskPermission
+from .permissions import PermissionResolver, live_tasks, visible_tasks
+
+EXPORT_FIELDS = [
+    'id', 'title', 'description', 'due_date', 'priority', 'status',
+    'project', 'owner', 'created_date', 'updated_date',
+    'permissions', 'can_edit', 'can_delete',
+]
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_rows(user=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield one dict per task visible to ``user`` (every task when ``user`` is
+    None), ``chunk_size`` rows at a time.
+
+    Tasks come through ``iterator()`` (a server-side cursor on PostgreSQL) and
+    permission rows are fetched once per chunk, so memory stays flat however
+    many tasks there are. Non-superusers only see their own grant in
+    ``permissions``.
+    """
+    tasks = live_tasks() if user is None else visible_tasks(user)
+    tasks = tasks.select_related('project', 'user').order_by('id').iterator(chunk_size=chunk_size)
+    show_all_grants = user is None or user.is_superuser
+    for chunk in chunked(tasks, chunk_size):
+        task_ids = [task.id for task in chunk]
+        grants = TaskPermission.objects.filter(task_id__in=task_ids)
+        if not show_all_grants:
+            grants = grants.filter(user=user)
+        grants_by_task = defaultdict(list)
+        for task_id, username, permission_type in grants.order_by('task_id', 'user__username').values_list(
+            'task_id', 'user__username', 'permission_type'
+        ):
+            grants_by_task[task_id].append(f'{username}:{permission_type}')
+        resolver = PermissionResolver(user, task_ids=task_ids) if user is not None else None
+        for task in chunk:
+            capabilities = resolver.capabilities(task) if resolver else None
+            yield {
+                'id': task.id,
+                'title': task.title,
+                'description': task.description,
+                'due_date': task.due_date.isoformat(),
+                'priority': task.priority,
+                'status': task.status,
+                'project': task.project.name if task.project else '',
+                'owner': task.user.username,
+                'created_date': task.created_date.isoformat(),
+                'updated_date': task.updated_date.isoformat(),
+                'permissions': ';'.join(grants_by_task[task.id]),
+                'can_edit': capabilities.edit if capabilities else True,
+                'can_delete': capabilities.delete if capabilities else True,
+            }
+
+
+class Echo:
+    # File-like object whose write() hands the line back to csv.writer's caller
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.DictWriter(Echo(), fieldnames=EXPORT_FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_lines, 'text/csv'),
+    'jsonl': (jsonl_lines, 'application/x-ndjson'),
+}
@@ -1,6 +1,42 @@
 from django import forms
 from django.contrib.auth.models import User
+from django.urls import reverse_lazy
 from .models import Task, Project, TaskPermission
+from .permissions import visible_projects
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    Select for a ModelChoiceField over a large table. Only the selected
+    option is rendered; the script in base.html fetches the rest from
+    ``url`` as the user types.
+    """
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocomplete-url'] = str(self.url)
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        # The stock widget iterates self.choices, i.e. the whole queryset
+        field = self.choices.field
+        selected = [v for v in value if str(v).isdigit()]
+        options = []
+        if not self.allow_multiple_selected and field.empty_label is not None:
+            options.append(('', field.empty_label, not selected))
+        if selected:
+            for obj in self.choices.queryset.filter(pk__in=selected):
+                option_value, label = self.choices.choice(obj)
+                options.append((option_value, label, True))
+        return [
+            (None, [self.create_option(name, option_value, label, is_selected, index, attrs=attrs)], index)
+            for index, (option_value, label, is_selected) in enumerate(options)
+        ]
+
 
 class ProjectForm(forms.ModelForm):
     # Remove the ModelMultipleChoiceField since we'll handle this differently
@@ -27,15 +63,9 @@ class TaskForm(forms.ModelForm):
             'due_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'priority': forms.Select(attrs={'class': 'form-control'}),
             'status': forms.Select(attrs={'class': 'form-control'}),
-            'project': forms.Select(attrs={'class': 'form-control'}),
+            'project': AutocompleteSelect(reverse_lazy('project_autocomplete'), attrs={'class': 'form-control'}),
         }
     
     def __init__(self, user, *args, **kwargs):
         super(TaskForm, self).__init__(*args, **kwargs)
-        if user.is_superuser:
-            self.fields['project'].queryset = Project.objects.all()
-        else:
-            self.fields['project'].queryset = (
-                Project.objects.filter(user=user) | 
-                Project.objects.filter(assigned_users=user)
-            ).distinct()
\ No newline at end of file
+        self.fields['project'].queryset = visible_projects(user)
\ No newline at end of file
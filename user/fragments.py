@@ -0,0 +1,61 @@
+"""
+Cached task rows for project_tasks.
+
+A row depends on the task and on what the viewer may do with it, so it is
+keyed on the task id, its ``updated_date`` (every save and bulk update moves
+it) and the viewer's permission level. The whole page's rows are read with
+one get_many and the misses written back with one set_many. An owner's
+username is not in the key; a rename shows up when the rows expire.
+"""
+import zlib
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+ROW_TEMPLATE = 'task_row.html'
+
+
+def row_cache():
+    return caches['fragments']
+
+
+def get_timeout():
+    return getattr(settings, 'TASK_ROW_CACHE_TIMEOUT', 3600)
+
+
+def permission_level(task, user):
+    # Everything in a row that depends on the viewer
+    if user.is_superuser:
+        return 'admin'
+    return f'edit={int(task.has_edit_permission)},delete={int(task.has_delete_permission)}'
+
+
+def row_key(task, level, template_version):
+    return f'task_row:{template_version}:{task.id}:{task.updated_date.timestamp()}:{level}'
+
+
+def render_task_rows(tasks, user):
+    """
+    The rendered ``<tr>`` of each of ``tasks`` (annotated by
+    PermissionResolver), from the cache where possible.
+    """
+    template = get_template(ROW_TEMPLATE)
+    is_admin = user.is_superuser
+    timeout = get_timeout()
+    if timeout <= 0:
+        return [template.render({'task': task, 'is_admin': is_admin}) for task in tasks]
+
+    # Rows rendered from an older task_row.html never match
+    template_version = zlib.crc32(template.template.source.encode())
+    keys = [row_key(task, permission_level(task, user), template_version) for task in tasks]
+    cached = row_cache().get_many(keys)
+    rows, missing = [], {}
+    for task, key in zip(tasks, keys):
+        row = cached.get(key)
+        if row is None:
+            row = missing[key] = template.render({'task': task, 'is_admin': is_admin})
+        rows.append(mark_safe(row))
+    if missing:
+        row_cache().set_many(missing, timeout)
+    return rows
@@ -0,0 +1,162 @@
+import csv
+import json
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from . import stats
+from .export import chunked
+from .forms import TaskForm
+from .models import Task
+from .permissions import visible_projects
+from .signals import bulk_tasks_changed
+
+IMPORT_BATCH_SIZE = 1000
+
+# Only the first errors are kept in full; the rest are just counted
+MAX_REPORTED_ERRORS = 1000
+
+# Columns that fall back to the model default when missing or blank
+DEFAULTED_FIELDS = ['description', 'due_date', 'priority', 'status']
+
+
+class TaskImportForm(TaskForm):
+    # TaskForm's field rules; the project is resolved once per batch instead of once per row
+    def __init__(self, user, *args, **kwargs):
+        super().__init__(user, *args, **kwargs)
+        del self.fields['project']
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.error_count = 0
+        self.errors = []  # (line_number, {field: [messages]})
+
+    def add_error(self, line_number, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, errors))
+
+
+def read_rows(fileobj, file_format='csv'):
+    """
+    Yield ``(line_number, row)`` from a CSV (with header) or JSON Lines file
+    without reading it into memory.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(fileobj)
+        for row in reader:
+            yield reader.line_num, row
+    elif file_format == 'jsonl':
+        for line_number, line in enumerate(fileobj, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else {'__invalid__': line}
+    else:
+        raise ValueError(f'Unsupported import format: {file_format}')
+
+
+def form_data(row):
+    data = {key: '' if value is None else str(value).strip() for key, value in row.items()}
+    for name in DEFAULTED_FIELDS:
+        if not data.get(name):
+            default = Task._meta.get_field(name).get_default()
+            data[name] = default.isoformat() if hasattr(default, 'isoformat') else default
+    return data
+
+
+def resolve_projects(user, rows):
+    # One query for every project named or numbered in the batch, limited to TaskForm's choices
+    names = {row.get('project') for row in rows if row.get('project')}
+    ids = {row['project_id'] for row in rows if row.get('project_id', '').isdigit()}
+    by_name, by_id = {}, {}
+    if names or ids:
+        projects = visible_projects(user).filter(Q(name__in=names) | Q(id__in=ids)).order_by()
+        for project_id, name in projects.values_list('id', 'name'):
+            by_id[str(project_id)] = project_id
+            by_name.setdefault(name, []).append(project_id)
+    return by_name, by_id
+
+
+def resolve_owners(user, rows):
+    # Only superusers may import tasks on someone else's behalf
+    usernames = {row.get('owner') for row in rows if row.get('owner')}
+    if not user.is_superuser or not usernames:
+        return {}
+    return dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+
+
+def build_task(user, data, projects, owners):
+    """
+    Return ``(task, errors)`` for one normalized row; ``task`` is unsaved and
+    None when ``errors`` is not empty.
+    """
+    if '__invalid__' in data:
+        return None, {'__all__': ['Line is not a JSON object.']}
+    form = TaskImportForm(user, data)
+    errors = {} if form.is_valid() else {field: list(messages) for field, messages in form.errors.items()}
+
+    by_name, by_id = projects
+    project_id = None
+    if data.get('project_id'):
+        project_id = by_id.get(data['project_id'])
+        if project_id is None:
+            errors['project'] = ['Select a valid choice. That choice is not one of the available choices.']
+    elif data.get('project'):
+        matches = by_name.get(data['project'], [])
+        if len(matches) == 1:
+            project_id = matches[0]
+        elif matches:
+            errors['project'] = [f"Project name {data['project']!r} is ambiguous; use project_id."]
+        else:
+            errors['project'] = ['Select a valid choice. That choice is not one of the available choices.']
+
+    owner_id = user.id
+    if data.get('owner') and data['owner'] != user.username:
+        owner_id = owners.get(data['owner'])
+        if owner_id is None:
+            errors['owner'] = [f"Unknown or unavailable owner {data['owner']!r}."]
+
+    if errors:
+        return None, errors
+    task = form.save(commit=False)
+    task.user_id = owner_id
+    task.project_id = project_id
+    return task, {}
+
+
+def import_tasks(rows, user, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Validate and insert ``(line_number, row)`` pairs as ``user`` would through
+    create_task, one transaction and one bulk_create per batch. Invalid rows
+    are reported and skipped; valid rows of the same batch are still saved.
+    """
+    result = ImportResult()
+    for batch in chunked(rows, batch_size):
+        batch = [(line_number, form_data(row)) for line_number, row in batch]
+        projects = resolve_projects(user, [data for _, data in batch])
+        owners = resolve_owners(user, [data for _, data in batch])
+        tasks = []
+        for line_number, data in batch:
+            task, errors = build_task(user, data, projects, owners)
+            if errors:
+                result.add_error(line_number, errors)
+            else:
+                tasks.append(task)
+        if not tasks:
+            continue
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks, batch_size=batch_size)
+            bulk_tasks_changed(
+                project_ids={task.project_id for task in tasks},
+                user_ids={task.user_id for task in tasks},
+                task_ids=[task.id for task in tasks],
+                # Deltas, not a rebuild: each batch costs the same however big the project gets
+                stat_changes=[(None, stats.task_state(task)) for task in tasks],
+            )
+        result.created += len(tasks)
+    return result
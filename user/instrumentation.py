@@ -0,0 +1,122 @@
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+# Placeholder lists of any length fingerprint the same: "IN (%s, %s)" == "IN (%s)"
+IN_LIST_RE = re.compile(r'IN \((?:%s(?:, )?)+\)')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    return IN_LIST_RE.sub('IN (...)', WHITESPACE_RE.sub(' ', sql).strip())
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.total_time = 0.0
+        self.fingerprints = Counter()
+
+    def record_query(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        # Executions beyond the first of each identical statement (the N+1 signature)
+        return sum(count - 1 for count in self.fingerprints.values() if count > 1)
+
+    def top_duplicates(self, limit=3):
+        return [(sql, count) for sql, count in self.fingerprints.most_common(limit) if count > 1]
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'duplicates': self.duplicates,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'total_ms': round(self.total_time * 1000, 2),
+        }
+
+
+@contextmanager
+def capture_metrics():
+    """
+    Record queries and template time for the enclosed code on every database
+    alias. Used by QueryMetricsMiddleware and directly by tests/benchmarks.
+    """
+    metrics = RequestMetrics()
+    # Restored by value rather than token: the async middleware enters and
+    # leaves this in two sync_to_async calls, i.e. two copies of the context
+    previous = _current_metrics.get()
+    _current_metrics.set(metrics)
+    start = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics.record_query))
+            yield metrics
+    finally:
+        metrics.total_time = time.perf_counter() - start
+        _current_metrics.set(previous)
+
+
+def budget_violations(view_name, metrics):
+    """
+    Compare ``metrics`` against ``settings.VIEW_QUERY_BUDGETS[view_name]``, a
+    dict of optional ``queries``, ``duplicates`` and ``db_ms`` ceilings.
+    """
+    budget = getattr(settings, 'VIEW_QUERY_BUDGETS', {}).get(view_name)
+    if not budget:
+        return []
+    measured = metrics.as_dict()
+    return [
+        f"{view_name}: {key} {measured[key]} exceeds budget of {limit}"
+        for key, limit in budget.items()
+        if measured[key] > limit
+    ]
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend, timing each top-level render into the
+    current request's metrics (a no-op outside capture_metrics()).
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from user.archive import ARCHIVE_BATCH_SIZE, archivable_tasks, archive_completed_tasks, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        "Move completed tasks older than TASK_ARCHIVE_AFTER_DAYS into the archive, with their permissions. "
+        "Safe to interrupt and re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            help="Archive completed tasks not updated for this many days (default: TASK_ARCHIVE_AFTER_DAYS).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+            help=f"Tasks moved per transaction (default: {ARCHIVE_BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help="Seconds to sleep between batches, to leave room for other writers.",
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Only count the tasks that would be archived.",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError("--days must not be negative.")
+        if options['dry_run']:
+            count = archivable_tasks(archive_cutoff(options['days'])).count()
+            self.stdout.write(f"{count} tasks would be archived.")
+            return
+        moved = archive_completed_tasks(
+            days=options['days'], batch_size=options['batch_size'], pause=options['pause'],
+            progress=lambda moved: self.stdout.write(f"Archived {moved} tasks..."),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} tasks."))
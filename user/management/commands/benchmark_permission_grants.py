@@ -0,0 +1,52 @@
+import json
+import time
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.core.management.base import BaseCommand, CommandError
+from user.bulk import PERMISSION_BATCH_SIZE, grant_permissions, revoke_permissions
+from user.models import Task, Project
+
+
+class Command(BaseCommand):
+    help = (
+        "Time a bulk grant, re-grant (upsert) and revoke of tasks x users permission rows "
+        "on throwaway data that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=PERMISSION_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if min(options['tasks'], options['users'], options['batch_size']) < 1:
+            raise CommandError("--tasks, --users and --batch-size must be positive.")
+        with transaction.atomic():
+            results = self.run(options['tasks'], options['users'], options['batch_size'])
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def run(self, task_count, user_count, batch_size):
+        admin = User.objects.create(username='bench-permissions-admin', is_superuser=True)
+        project = Project.objects.create(name='Permission benchmark', user=admin)
+        Task.objects.bulk_create(
+            (Task(title=f'Benchmark task {i}', user=admin, project=project) for i in range(task_count)),
+            batch_size=1000,
+        )
+        users = User.objects.bulk_create(
+            User(username=f'bench-permissions-{i}') for i in range(user_count)
+        )
+        user_ids = [user.id for user in users]
+        tasks = Task.objects.filter(project=project)
+
+        results = {'tasks': task_count, 'users': user_count, 'rows': task_count * user_count, 'batch_size': batch_size}
+        for name, run in (
+            ('grant', lambda: grant_permissions(tasks, user_ids, 'view', admin, batch_size)),
+            ('regrant', lambda: grant_permissions(tasks, user_ids, 'edit', admin, batch_size)),
+            ('revoke', lambda: revoke_permissions(tasks, user_ids, batch_size)),
+        ):
+            start = time.perf_counter()
+            count = run()
+            elapsed = time.perf_counter() - start
+            results[name] = {'rows': count, 'seconds': round(elapsed, 3), 'rows_per_second': round(count / elapsed)}
+        return results
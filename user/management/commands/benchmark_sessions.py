@@ -0,0 +1,23 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from user.benchmarks import run_session_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Count the database round trips of a login and of an authenticated page view under each session "
+        "mode, with and without the per-process user cache. Seed with seed_benchmark_data first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-views', type=int, default=20)
+        parser.add_argument('--prefix', default='bench')
+
+    def handle(self, *args, **options):
+        if options['page_views'] < 1:
+            raise CommandError("--page-views must be at least 1.")
+        try:
+            report = run_session_benchmark(page_views=options['page_views'], prefix=options['prefix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(json.dumps(report, indent=2))
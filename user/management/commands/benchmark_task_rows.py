@@ -0,0 +1,20 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from user.benchmarks import run_render_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Time rendering a project's task table with and without the cached template loader and the "
+        "per-row fragment cache. Uses unsaved tasks, so no seeding is needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000)
+        parser.add_argument('--iterations', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if options['tasks'] < 1 or options['iterations'] < 1:
+            raise CommandError("--tasks and --iterations must be at least 1.")
+        report = run_render_benchmark(tasks=options['tasks'], iterations=options['iterations'])
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,32 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from user.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_rows
+
+
+class Command(BaseCommand):
+    help = "Stream every task (or those visible to --user) as CSV or JSON Lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--user', help="Export only what this username can see in task_list.")
+        parser.add_argument('--output', help="File to write to (default: stdout).")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist.")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+
+        lines, _ = EXPORT_FORMATS[options['format']]
+        rows = export_rows(user, chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(lines(rows))
+        else:
+            for line in lines(rows):
+                self.stdout.write(line, ending='')
@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from user.importer import IMPORT_BATCH_SIZE, import_tasks, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import tasks from a CSV or JSON Lines file, validated with TaskForm's rules."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import; columns as produced by export_tasks.")
+        parser.add_argument('--user', required=True, help="Username the tasks are created as.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        with open(options['path'], newline='', encoding='utf-8') as fileobj:
+            result = import_tasks(read_rows(fileobj, options['format']), user, options['batch_size'])
+
+        for line_number, errors in result.errors:
+            for field, messages in errors.items():
+                self.stderr.write(f"Line {line_number}: {field}: {' '.join(messages)}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(f"... and {result.error_count - len(result.errors)} more rejected rows.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} tasks, rejected {result.error_count} rows."
+        ))
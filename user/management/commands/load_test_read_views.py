@@ -0,0 +1,37 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from user.benchmarks import run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent throughput of the read views served through the WSGI handler (sync views on a "
+        "thread pool) and the ASGI handler (async views). Seed with seed_benchmark_data first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--wsgi-threads', type=int, default=4,
+                            help="Threads of the simulated WSGI worker (gunicorn --threads).")
+        parser.add_argument('--db-latency-ms', type=float, default=0,
+                            help="Sleep added to every query to model a networked database.")
+        parser.add_argument('--prefix', default='bench')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1 or options['wsgi_threads'] < 1:
+            raise CommandError("--requests, --concurrency and --wsgi-threads must be at least 1.")
+        try:
+            report = run_load_test(
+                requests=options['requests'],
+                concurrency=options['concurrency'],
+                wsgi_threads=options['wsgi_threads'],
+                db_latency_ms=options['db_latency_ms'],
+                prefix=options['prefix'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        # How many times WSGI's throughput the async path reached; the figure this command is run for
+        wsgi_rate = report['wsgi']['requests_per_s']
+        report['asgi_vs_wsgi'] = round(report['asgi']['requests_per_s'] / wsgi_rate, 2) if wsgi_rate else None
+        self.stdout.write(json.dumps(report, indent=2))
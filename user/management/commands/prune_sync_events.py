@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from user.sync import prune_events
+
+
+class Command(BaseCommand):
+    help = "Delete sync events older than SYNC_EVENT_RETENTION_DAYS; sync tokens that old are refused anyway."
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"Deleted {prune_events()} sync events."))
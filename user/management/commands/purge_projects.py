@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from user.bulk import PROJECT_PURGE_BATCH_SIZE, purge_project
+from user.models import Project
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete projects with batched set-based deletes. --pending finishes purges of projects "
+        "left pending deletion, e.g. by a restart during a background delete."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int, help="Projects to delete.")
+        parser.add_argument(
+            '--pending', action='store_true',
+            help="Also delete every project marked pending deletion.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=PROJECT_PURGE_BATCH_SIZE,
+            help=f"Tasks deleted per transaction (default: {PROJECT_PURGE_BATCH_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        if not options['project_ids'] and not options['pending']:
+            raise CommandError("Give project IDs or --pending.")
+        projects = Project.objects.filter(id__in=options['project_ids'])
+        if options['pending']:
+            projects = projects | Project.objects.filter(pending_deletion=True)
+        missing = set(options['project_ids']) - set(projects.values_list('id', flat=True))
+        if missing:
+            raise CommandError(f"Unknown project IDs: {', '.join(map(str, sorted(missing)))}.")
+        for project in projects.order_by('id'):
+            deleted = purge_project(
+                project, batch_size=options['batch_size'],
+                progress=lambda count: self.stdout.write(f"Project {project.id}: {count} tasks deleted..."),
+            )
+            self.stdout.write(self.style.SUCCESS(f"Deleted project {project.id} ({project.name}) and {deleted} tasks."))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from user.models import Project
+from user.stats import find_drift, refresh_project_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-project task statistics from scratch and verify them against live aggregates."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only verify the stored statistics; exit with an error if they drifted.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Number of projects aggregated per query (default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        project_ids = list(Project.objects.order_by('id').values_list('id', flat=True))
+        batches = [project_ids[i:i + batch_size] for i in range(0, len(project_ids), batch_size)]
+
+        if not options['check']:
+            for batch in batches:
+                refresh_project_stats(batch)
+            self.stdout.write(f"Rebuilt statistics for {len(project_ids)} projects.")
+
+        drift = []
+        for batch in batches:
+            drift.extend(find_drift(batch))
+        for project_id, what, stored, live in drift:
+            self.stderr.write(f"Project {project_id}: {what} stored={stored} live={live}")
+        if drift:
+            raise CommandError(f"{len(drift)} statistics mismatches found.")
+        self.stdout.write(self.style.SUCCESS(f"Verified statistics for {len(project_ids)} projects."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from user.models import Task
+from user.search import install_search_index, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Recreate the task search index from the current tasks (after restores or raw SQL changes)."
+
+    def handle(self, *args, **options):
+        install_search_index()
+        rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {Task.objects.count()} tasks."))
@@ -0,0 +1,37 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from user.benchmarks import run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the task and project views through the test client as a superuser and a regular user "
+        "and report p50/p95 latency, queries and peak memory as JSON. Seed with seed_benchmark_data first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help="Only run this scenario (repeatable).")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1.")
+        try:
+            report = run_benchmarks(
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                prefix=options['prefix'],
+                only=options['scenarios'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,38 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from user.benchmarks import SEED_BATCH_SIZE, seed_dataset
+
+
+class Command(BaseCommand):
+    help = "Bulk insert a reproducible synthetic dataset for run_benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--projects', type=int, default=20)
+        parser.add_argument('--tasks', type=int, default=2000)
+        parser.add_argument('--permission-density', type=float, default=0.5,
+                            help="Average TaskPermission grants per task (default: 0.5).")
+        parser.add_argument('--assignments-per-project', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--batch-size', type=int, default=SEED_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['projects'], options['batch_size']) < 1 or options['tasks'] < 0:
+            raise CommandError("--users, --projects and --batch-size must be positive.")
+        try:
+            with transaction.atomic():
+                summary = seed_dataset(
+                    users=options['users'],
+                    projects=options['projects'],
+                    tasks=options['tasks'],
+                    permission_density=options['permission_density'],
+                    assignments_per_project=options['assignments_per_project'],
+                    seed=options['seed'],
+                    prefix=options['prefix'],
+                    batch_size=options['batch_size'],
+                )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(json.dumps(summary))
@@ -0,0 +1,57 @@
+import time
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from user.reminders import REMINDER_BATCH_SIZE, send_reminders
+
+
+class Command(BaseCommand):
+    help = (
+        "Email each user a digest of their overdue and soon-due open tasks, at most once per day. "
+        "Safe to re-run; with --every it keeps running as a worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Day to send for, YYYY-MM-DD (default: today).")
+        parser.add_argument(
+            '--due-soon-days', type=int,
+            help="Include tasks due within this many days (default: REMINDER_DUE_SOON_DAYS).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=REMINDER_BATCH_SIZE,
+            help=f"Tasks scanned and users mailed per batch (default: {REMINDER_BATCH_SIZE}).",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only count the tasks and digests.")
+        parser.add_argument(
+            '--every', type=float,
+            help="Run again every this many seconds until interrupted; days already sent are skipped.",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        if options['due_soon_days'] is not None and options['due_soon_days'] < 0:
+            raise CommandError("--due-soon-days must not be negative.")
+        if options['every'] is not None and options['every'] <= 0:
+            raise CommandError("--every must be positive.")
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else None
+        except ValueError:
+            raise CommandError("--date must be YYYY-MM-DD.")
+
+        while True:
+            summary = send_reminders(
+                day or timezone.localdate(), days=options['due_soon_days'], batch_size=options['batch_size'],
+                dry_run=options['dry_run'],
+            )
+            verb = "would be sent" if options['dry_run'] else "sent"
+            self.stdout.write(
+                f"{summary['tasks']} tasks due; {summary['digests']} digests {verb}, "
+                f"{summary['no_email']} recipients without an email address."
+            )
+            if not options['every']:
+                return
+            try:
+                time.sleep(options['every'])
+            except KeyboardInterrupt:
+                return
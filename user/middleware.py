@@ -0,0 +1,165 @@
+import json
+import logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+from .instrumentation import QueryBudgetExceeded, budget_violations, capture_metrics
+from .routers import replica_aliases, routing_state
+
+logger = logging.getLogger('user.metrics')
+
+# Set after a request that wrote; while present, reads stay on the primary
+PIN_COOKIE = 'db_pin'
+
+
+class QueryMetricsMiddleware:
+    """
+    Records per-request query count, DB time, template render time and
+    duplicate statements, logs them as JSON and checks the view's entry in
+    VIEW_QUERY_BUDGETS. With REQUEST_METRICS_STRICT (the test suite) a blown
+    budget raises instead of logging a warning.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            return self.get_response(request)
+        with capture_metrics() as metrics:
+            response = self.get_response(request)
+        return self.report(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            return await self.get_response(request)
+        # Connections are per thread: hook the ones on the executor thread
+        # that runs this request's ORM calls, not the event loop's
+        recorder = capture_metrics()
+        metrics = await sync_to_async(recorder.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recorder.__exit__)(None, None, None)
+        return self.report(request, response, metrics)
+
+    def report(self, request, response, metrics):
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.url_name if match else None
+        measured = metrics.as_dict()
+        # Skip building the line when INFO is off, as it is by default
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'view': view_name,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                **measured,
+                'top_duplicates': metrics.top_duplicates(),
+            }))
+        if getattr(settings, 'REQUEST_METRICS_HEADERS', False):
+            response['X-DB-Queries'] = measured['queries']
+            response['X-DB-Duplicate-Queries'] = measured['duplicates']
+            response['Server-Timing'] = (
+                f"db;dur={measured['db_ms']}, tpl;dur={measured['template_ms']}, total;dur={measured['total_ms']}"
+            )
+
+        violations = budget_violations(view_name, metrics)
+        if violations:
+            if getattr(settings, 'REQUEST_METRICS_STRICT', False):
+                raise QueryBudgetExceeded('; '.join(violations))
+            for violation in violations:
+                logger.warning(violation)
+        return response
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware that stays async under ASGI. The stock class is
+    sync-only, which makes Django run every request below it on a thread.
+    Static file lookups are in-memory, so they're fine on the event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets GET/HEAD requests to the views named in REPLICA_READ_VIEWS read from
+    a replica. A request that writes sets a cookie that keeps the client's
+    reads on the primary for REPLICA_PIN_SECONDS, so users see their own
+    changes despite replication lag.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with routing_state() as state:
+            request._db_routing = state
+            response = self.get_response(request)
+        return self.pin(response, state)
+
+    async def __acall__(self, request):
+        with routing_state() as state:
+            request._db_routing = state
+            response = await self.get_response(request)
+        return self.pin(response, state)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = getattr(request, '_db_routing', None)
+        match = request.resolver_match
+        if (
+            state is not None
+            and replica_aliases()
+            and request.method in ('GET', 'HEAD')
+            and match.url_name in getattr(settings, 'REPLICA_READ_VIEWS', [])
+            and PIN_COOKIE not in request.COOKIES
+        ):
+            state.use_replica = True
+        return None
+
+    def pin(self, response, state):
+        if state.wrote and replica_aliases():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -1,4 +1,8 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.contrib.auth.models import User
 from datetime import date
 
@@ -8,12 +12,23 @@ class Project(models.Model):
     created_date = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)  # owner
     assigned_users = models.ManyToManyField(User, related_name="assigned_projects", blank=True)
+    # Set while a background purge removes the project's rows; hidden everywhere meanwhile
+    pending_deletion = models.BooleanField(default=False)
+    updated_date = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            # task_list order
+            models.Index(fields=['name', 'id'], name='project_name_id_idx'),
+            # The project picker's case-insensitive prefix search (user.autocomplete)
+            models.Index(Lower('name'), F('id'), name='project_lower_name_idx'),
+            # Tiny: only the projects a background purge is working through
+            models.Index(fields=['id'], name='project_pending_idx', condition=models.Q(pending_deletion=True)),
+        ]
 
 class Task(models.Model):
     PRIORITY_CHOICES = [
@@ -42,6 +57,18 @@ class Task(models.Model):
         
     class Meta:
         ordering = ['due_date', 'priority']
+        indexes = [
+            # Own tasks in task_list / visible_tasks, in display order
+            models.Index(fields=['user', 'due_date', 'priority'], name='task_user_due_idx'),
+            # Per-project panels and status filters
+            models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+            # Keyset order of the task feed
+            models.Index(fields=['due_date', 'priority', 'id'], name='task_due_priority_id_idx'),
+            # Changes since a sync token, in keyset order
+            models.Index(fields=['updated_date', 'id'], name='task_updated_id_idx'),
+            # The reminder scan over open tasks, in keyset order
+            models.Index(fields=['due_date', 'id'], condition=~models.Q(status='Completed'), name='task_open_due_id_idx'),
+        ]
 
 class TaskPermission(models.Model):
     PERMISSION_CHOICES = [
@@ -59,6 +86,146 @@ class TaskPermission(models.Model):
         on_delete=models.CASCADE, 
         related_name='permissions_granted'
     )
+    updated_date = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'task']
+        indexes = [
+            # PermissionResolver and create_task look up grants by user and level
+            models.Index(fields=['user', 'permission_type'], name='taskperm_user_type_idx'),
+            # A user's grants changed since a sync token
+            models.Index(fields=['user', 'updated_date'], name='taskperm_user_updated_idx'),
+        ]
+
+class ProjectStats(models.Model):
+    # Task counts per project, kept up to date by user.stats on every task write
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    task_count = models.IntegerField(default=0)
+    pending_count = models.IntegerField(default=0)
+    in_progress_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+    low_count = models.IntegerField(default=0)
+    medium_count = models.IntegerField(default=0)
+    high_count = models.IntegerField(default=0)
+    updated_date = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.project}"
+
+class ProjectDueCount(models.Model):
+    # Open (not completed) tasks per project and due date; overdue = sum over due_date < today
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='due_counts')
+    due_date = models.DateField()
+    open_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['project', 'due_date']
+
+class ArchivedTask(models.Model):
+    # Completed tasks moved out of Task by user.archive; keeps the original id
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    due_date = models.DateField()
+    priority = models.CharField(max_length=10, choices=Task.PRIORITY_CHOICES)
+    status = models.CharField(max_length=15, choices=Task.STATUS_CHOICES)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_tasks')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='archived_tasks', null=True, blank=True)
+    created_date = models.DateTimeField()
+    updated_date = models.DateTimeField()
+    archived_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.title
+
+    class Meta:
+        ordering = ['-updated_date', '-id']
+        indexes = [
+            models.Index(fields=['user', '-updated_date'], name='archtask_user_updated_idx'),
+            models.Index(fields=['project', '-updated_date'], name='archtask_project_updated_idx'),
+        ]
+
+class ArchivedTaskPermission(models.Model):
+    # TaskPermission rows of archived tasks, moved along with them
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    task = models.ForeignKey(ArchivedTask, on_delete=models.CASCADE, related_name='permissions')
+    permission_type = models.CharField(max_length=10, choices=TaskPermission.PERMISSION_CHOICES)
+    assigned_date = models.DateTimeField()
+    assigned_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        unique_together = ['user', 'task']
+
+class SyncEvent(models.Model):
+    """
+    What the updated_date columns can't show the sync endpoint: a deleted
+    row, or a user losing (or gaining) sight of one. ``user`` is the user
+    concerned; without one the event concerns everyone who can see
+    ``project_id``. Readers check events against current visibility, so
+    writers record them whenever visibility *may* have changed.
+    """
+    KIND_CHOICES = [
+        ('task', 'Task'),
+        ('project', 'Project'),
+        ('permission', 'Permission'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()  # Task id for 'task' and 'permission', Project id for 'project'
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    project_id = models.BigIntegerField(null=True, blank=True)  # Not a foreign key: outlives the project
+    removed = models.BooleanField(default=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_date'], name='syncevent_user_created_idx'),
+            models.Index(fields=['project_id', 'created_date'], name='syncevent_project_created_idx'),
+            models.Index(fields=['created_date', 'id'], name='syncevent_created_id_idx'),
+        ]
+
+class ReminderDigest(models.Model):
+    # A user's due-date digest for ``day`` (user.reminders); claimed by ``run_id`` before it is sent
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reminder_digests')
+    day = models.DateField()
+    run_id = models.UUIDField()
+    overdue_count = models.IntegerField(default=0)
+    due_soon_count = models.IntegerField(default=0)
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['day', 'user']
+        indexes = [
+            models.Index(fields=['run_id'], name='reminder_run_idx'),
+        ]
+
+class ActivityEvent(models.Model):
+    """
+    One audited change to a task, project or permission, written in batches
+    by user.activity. ``changes`` maps each changed field to [old, new].
+    """
+    KIND_CHOICES = [
+        ('task', 'Task'),
+        ('project', 'Project'),
+        ('permission', 'Permission'),
+    ]
+    ACTION_CHOICES = [
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('deleted', 'Deleted'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    object_id = models.BigIntegerField()  # Task id for 'task' and 'permission', Project id for 'project'
+    project_id = models.BigIntegerField(null=True, blank=True)  # Not a foreign key: outlives the project
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    summary = models.CharField(max_length=255, blank=True)
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_date = models.DateTimeField(default=timezone.now)  # When it happened, not when it was flushed
 
     class Meta:
-        unique_together = ['user', 'task']
\ No newline at end of file
+        indexes = [
+            # Per-project feed, newest first in keyset order
+            models.Index(fields=['project_id', 'created_date', 'id'], name='activity_project_created_idx'),
+        ]
@@ -0,0 +1,134 @@
+from collections import namedtuple
+from django.db.models import Q
+from .models import Task, Project, TaskPermission
+
+PERMISSION_LEVELS = {
+    'view': ['view', 'edit', 'delete'],
+    'edit': ['edit', 'delete'],
+    'delete': ['delete'],
+}
+
+TaskCapabilities = namedtuple('TaskCapabilities', ['view', 'edit', 'delete'])
+
+FULL_ACCESS = TaskCapabilities(True, True, True)
+
+
+class PermissionResolver:
+    """
+    Resolves task capabilities for one user from a constant number of queries.
+
+    The user's TaskPermission rows (optionally limited to ``task_ids``) are
+    loaded once and answered from memory afterwards, so checking a thousand
+    tasks costs the same as checking one.
+    """
+
+    def __init__(self, user, task_ids=None):
+        self.user = user
+        self.task_ids = task_ids
+        self._permissions = None
+        self._editable_project_ids = None
+
+    @property
+    def permissions(self):
+        # task_id -> permission_type
+        if self._permissions is None:
+            if self.user.is_superuser:
+                self._permissions = {}
+            else:
+                self._permissions = dict(self.permission_rows())
+        return self._permissions
+
+    def permission_rows(self):
+        rows = TaskPermission.objects.filter(user=self.user)
+        if self.task_ids is not None:
+            rows = rows.filter(task_id__in=self.task_ids)
+        return rows.values_list('task_id', 'permission_type')
+
+    async def aload(self):
+        # Async ORM counterpart of the permissions property; the sync checks then answer from memory
+        if self._permissions is None:
+            if self.user.is_superuser:
+                self._permissions = {}
+            else:
+                self._permissions = {task_id: permission_type async for task_id, permission_type in self.permission_rows()}
+        return self
+
+    @property
+    def editable_project_ids(self):
+        # Projects in which the user holds edit or delete rights on at least one task
+        if self._editable_project_ids is None:
+            self._editable_project_ids = set(
+                TaskPermission.objects.filter(
+                    user=self.user,
+                    permission_type__in=PERMISSION_LEVELS['edit'],
+                    task__project__isnull=False,
+                ).values_list('task__project_id', flat=True)
+            )
+        return self._editable_project_ids
+
+    def capabilities(self, task):
+        if self.user.is_superuser:
+            return FULL_ACCESS
+        permission_type = self.permissions.get(task.id)
+        if permission_type is None:
+            # Owners can always see their own tasks; everything else needs a grant
+            return TaskCapabilities(task.user_id == self.user.id, False, False)
+        return TaskCapabilities(
+            permission_type in PERMISSION_LEVELS['view'],
+            permission_type in PERMISSION_LEVELS['edit'],
+            permission_type in PERMISSION_LEVELS['delete'],
+        )
+
+    def has_permission(self, task, required_permission='view'):
+        if required_permission not in PERMISSION_LEVELS:
+            return False
+        return getattr(self.capabilities(task), required_permission)
+
+    def capability_map(self, tasks):
+        return {task.id: self.capabilities(task) for task in tasks}
+
+    def annotate(self, tasks):
+        # Sets the has_*_permission flags read by task_list.html
+        for task in tasks:
+            capabilities = self.capabilities(task)
+            task.has_edit_permission = capabilities.edit
+            task.has_delete_permission = capabilities.delete
+        return tasks
+
+    def can_add_to_project(self, project):
+        if self.user.is_superuser or project.user_id == self.user.id:
+            return True
+        return project.id in self.editable_project_ids
+
+
+def live_tasks():
+    # Every task except those of projects pending deletion; tasks without a project stay
+    return Task.objects.exclude(project_id__in=Project.objects.filter(pending_deletion=True).values('id'))
+
+
+def visible_tasks(user):
+    """
+    Tasks shown to ``user`` in task_list: their own, those shared with them
+    through a TaskPermission, and those in projects they are assigned to.
+    Tasks of projects pending deletion are hidden, like the projects.
+
+    Built from subqueries rather than joins so no ``distinct()`` is needed.
+    """
+    if user.is_superuser:
+        return live_tasks()
+    return live_tasks().filter(
+        Q(user=user)
+        | Q(id__in=TaskPermission.objects.filter(user=user).values('task_id'))
+        | Q(project__in=Project.assigned_users.through.objects.filter(user=user).values('project_id'))
+    )
+
+
+def visible_projects(user):
+    # Projects the user owns or is assigned to, minus those being deleted
+    projects = Project.objects.filter(pending_deletion=False)
+    if user.is_superuser:
+        return projects
+    return projects.filter(
+        Q(user=user)
+        | Q(id__in=Project.assigned_users.through.objects.filter(user=user).values('project_id'))
+    )
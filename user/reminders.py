@@ -0,0 +1,159 @@
+"""
+Daily due-date digests: one email per user listing the open tasks they can
+see as owner, grantee or assigned project member that are overdue or due
+within REMINDER_DUE_SOON_DAYS.
+
+The scan walks open tasks by (due_date, id) under task_open_due_id_idx, a
+batch at a time, and finds each batch's grantees and project members in two
+queries, so a run costs time in proportion to the matching tasks, not to the
+users. Digests are claimed in ReminderDigest (one row per user and day)
+before they are sent, so re-runs and concurrent workers skip them.
+"""
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.template.loader import render_to_string
+from .export import chunked
+from .models import Project, ReminderDigest, TaskPermission
+from .permissions import live_tasks
+
+REMINDER_BATCH_SIZE = 500
+# Tasks listed per section of a digest; the rest are only counted
+DIGEST_MAX_TASKS = 50
+
+DUE_TASK_FIELDS = ['id', 'title', 'due_date', 'priority', 'status', 'user_id', 'project_id', 'project__name']
+
+
+def due_soon_days():
+    return getattr(settings, 'REMINDER_DUE_SOON_DAYS', 2)
+
+
+def open_tasks_due_by(horizon):
+    return live_tasks().exclude(status='Completed').filter(due_date__lte=horizon)
+
+
+def due_task_batches(horizon, batch_size=REMINDER_BATCH_SIZE):
+    # Keyset over (due_date, id); each batch is a list of dicts with DUE_TASK_FIELDS
+    tasks = open_tasks_due_by(horizon).order_by('due_date', 'id').values(*DUE_TASK_FIELDS)
+    after = None
+    while True:
+        batch = tasks
+        if after:
+            batch = batch.filter(Q(due_date__gt=after[0]) | Q(due_date=after[0], id__gt=after[1]))
+        batch = list(batch[:batch_size])
+        if not batch:
+            return
+        yield batch
+        after = (batch[-1]['due_date'], batch[-1]['id'])
+
+
+def batch_recipients(tasks):
+    # task id -> ids of everyone the task's reminder goes to
+    recipients = {task['id']: {task['user_id']} for task in tasks}
+    for task_id, user_id in TaskPermission.objects.filter(task_id__in=list(recipients)).values_list('task_id', 'user_id'):
+        recipients[task_id].add(user_id)
+    members = defaultdict(set)
+    project_ids = {task['project_id'] for task in tasks if task['project_id'] is not None}
+    assignments = Project.assigned_users.through.objects.filter(project_id__in=project_ids)
+    for project_id, user_id in assignments.values_list('project_id', 'user_id'):
+        members[project_id].add(user_id)
+    for task in tasks:
+        recipients[task['id']] |= members.get(task['project_id'], set())
+    return recipients
+
+
+class Digest:
+    def __init__(self):
+        self.overdue, self.due_soon = [], []
+        self.overdue_count = self.due_soon_count = 0
+
+    def add(self, task, overdue):
+        if overdue:
+            self.overdue_count += 1
+            if len(self.overdue) < DIGEST_MAX_TASKS:
+                self.overdue.append(task)
+        else:
+            self.due_soon_count += 1
+            if len(self.due_soon) < DIGEST_MAX_TASKS:
+                self.due_soon.append(task)
+
+    @property
+    def overdue_unlisted(self):
+        return self.overdue_count - len(self.overdue)
+
+    @property
+    def due_soon_unlisted(self):
+        return self.due_soon_count - len(self.due_soon)
+
+
+def collect_digests(today, days=None, batch_size=REMINDER_BATCH_SIZE):
+    """
+    ``(digests, task_count)``: a Digest per recipient id for the open tasks
+    due by ``today`` + ``days``, skipping users whose digest for ``today``
+    is already claimed.
+    """
+    horizon = today + timedelta(days=due_soon_days() if days is None else days)
+    sent = set(ReminderDigest.objects.filter(day=today).values_list('user_id', flat=True))
+    digests = defaultdict(Digest)
+    task_count = 0
+    for tasks in due_task_batches(horizon, batch_size):
+        task_count += len(tasks)
+        recipients = batch_recipients(tasks)
+        for task in tasks:
+            for user_id in recipients[task['id']] - sent:
+                digests[user_id].add(task, task['due_date'] < today)
+    return digests, task_count
+
+
+def digest_message(user, digest, today):
+    subject = f'{digest.overdue_count} overdue, {digest.due_soon_count} due soon'
+    body = render_to_string('reminder_digest.txt', {'user': user, 'digest': digest, 'today': today})
+    return EmailMessage(f'Task reminders: {subject}', body, to=[user.email])
+
+
+def claim_digests(users, digests, today):
+    # Rows that another run claimed first are ignored; returns the ids this run got
+    run_id = uuid.uuid4()
+    ReminderDigest.objects.bulk_create([
+        ReminderDigest(
+            user=user, day=today, run_id=run_id,
+            overdue_count=digests[user.id].overdue_count, due_soon_count=digests[user.id].due_soon_count,
+        )
+        for user in users
+    ], ignore_conflicts=True)
+    return run_id, set(ReminderDigest.objects.filter(run_id=run_id).values_list('user_id', flat=True))
+
+
+def send_reminders(today, days=None, batch_size=REMINDER_BATCH_SIZE, dry_run=False, connection=None):
+    """
+    Email today's due-date digests through ``connection`` (the configured
+    EMAIL_BACKEND by default). Returns counts of the matching tasks, the
+    digests sent and the recipients skipped for lacking an email address.
+    """
+    digests, task_count = collect_digests(today, days, batch_size)
+    summary = {'tasks': task_count, 'digests': 0, 'no_email': 0}
+    if dry_run:
+        summary['digests'] = len(digests)
+        return summary
+    connection = connection or get_connection()
+    for user_ids in chunked(sorted(digests), batch_size):
+        users = list(User.objects.filter(id__in=user_ids, is_active=True).order_by('id'))
+        summary['no_email'] += sum(1 for user in users if not user.email)
+        users = [user for user in users if user.email]
+        if not users:
+            continue
+        run_id, claimed = claim_digests(users, digests, today)
+        try:
+            sent = connection.send_messages([
+                digest_message(user, digests[user.id], today) for user in users if user.id in claimed
+            ])
+        except Exception:
+            # Release the claims so the next run retries these users
+            ReminderDigest.objects.filter(run_id=run_id).delete()
+            raise
+        summary['digests'] += sent or 0
+    return summary
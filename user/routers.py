@@ -0,0 +1,68 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+
+_current_state = ContextVar('db_routing', default=None)
+
+
+class RoutingState:
+    # Per-request routing flags, shared by the middleware and the router
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+
+
+@contextmanager
+def routing_state():
+    state = RoutingState()
+    previous = _current_state.get()
+    _current_state.set(state)
+    try:
+        yield state
+    finally:
+        _current_state.set(previous)
+
+
+@contextmanager
+def primary_reads():
+    # Read from the primary for the enclosed code even in a replica-routed request
+    state = _current_state.get()
+    if state is None or not state.use_replica:
+        yield
+        return
+    state.use_replica = False
+    try:
+        yield
+    finally:
+        state.use_replica = True
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes go to the primary. Reads go to a replica only while the current
+    request has opted in, which ReplicaRoutingMiddleware does for the GET
+    views in REPLICA_READ_VIEWS. Everything else reads from the primary,
+    including write requests, management commands and the shell.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _current_state.get()
+        replicas = replica_aliases()
+        if state is None or not state.use_replica or not replicas:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _current_state.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
@@ -0,0 +1,270 @@
+import functools
+import re
+import sqlite3
+from django.db import connections, router
+from django.db.models import Case, Q, Value, When
+from .export import chunked
+from .models import Task, Project
+
+# Side table holding one search document per task (title, description, project name)
+SEARCH_TABLE = 'user_task_search'
+
+TERM_RE = re.compile(r'\w+')
+MAX_TERMS = 10
+
+REINDEX_BATCH_SIZE = 500
+
+
+def search_terms(query):
+    # Words only: whatever else the user typed never reaches a query parser
+    return TERM_RE.findall(query.lower())[:MAX_TERMS]
+
+
+class SearchBackend:
+    """
+    Fallback for databases without a supported full-text index: ``icontains``
+    on each field, ranked by how many terms appear in the title. Backends
+    receive the visible tasks as a queryset so ranking and paging happen
+    after the visibility filter.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def install(self):
+        pass
+
+    def reindex(self, task_ids):
+        pass
+
+    def unindex(self, task_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def matching(self, tasks, terms):
+        for term in terms:
+            tasks = tasks.filter(
+                Q(title__icontains=term) | Q(description__icontains=term) | Q(project__name__icontains=term)
+            )
+        return tasks
+
+    def count(self, tasks, terms):
+        return self.matching(tasks, terms).count()
+
+    def ranked_ids(self, tasks, terms, offset, limit):
+        rank = sum((Case(When(title__icontains=term, then=Value(1)), default=Value(0)) for term in terms), Value(0))
+        rows = self.matching(tasks, terms).annotate(rank=rank).order_by('-rank', 'id').values_list('id', 'rank')
+        return list(rows[offset:offset + limit])
+
+
+class SqliteSearchBackend(SearchBackend):
+    # FTS5 table keyed by task id (rowid); bm25 weights: title, description, project
+    RANK = f'-bm25({SEARCH_TABLE}, 10.0, 1.0, 5.0)'
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+                f"USING fts5(title, description, project, tokenize='porter unicode61')"
+            )
+
+    def documents_sql(self, where=''):
+        return (
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, description, project) "
+            f"SELECT task.id, task.title, task.description, COALESCE(project.name, '') "
+            f"FROM {Task._meta.db_table} task "
+            f"LEFT JOIN {Project._meta.db_table} project ON project.id = task.project_id {where}"
+        )
+
+    def reindex(self, task_ids):
+        for batch in chunked(task_ids, REINDEX_BATCH_SIZE):
+            placeholders = ', '.join(['%s'] * len(batch))
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", batch)
+                cursor.execute(self.documents_sql(f"WHERE task.id IN ({placeholders})"), batch)
+
+    def unindex(self, task_ids):
+        for batch in chunked(task_ids, REINDEX_BATCH_SIZE):
+            placeholders = ', '.join(['%s'] * len(batch))
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", batch)
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+            cursor.execute(self.documents_sql())
+
+    def match(self, tasks, terms):
+        visible_sql, visible_params = tasks.values('id').query.sql_with_params()
+        # Quoted prefix terms, implicitly ANDed: "deploy"* "api"*
+        expression = ' '.join(f'"{term}"*' for term in terms)
+        where = f"{SEARCH_TABLE} MATCH %s AND rowid IN ({visible_sql})"
+        return where, [expression, *visible_params]
+
+    def count(self, tasks, terms):
+        where, params = self.match(tasks, terms)
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE {where}", params)
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, tasks, terms, offset, limit):
+        where, params = self.match(tasks, terms)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, {self.RANK} AS rank FROM {SEARCH_TABLE} WHERE {where} "
+                f"ORDER BY rank DESC, rowid LIMIT %s OFFSET %s",
+                [*params, limit, offset],
+            )
+            return cursor.fetchall()
+
+
+class PostgresSearchBackend(SearchBackend):
+    # tsvector per task under a GIN index; title weighs most, then project name, then description
+    CONFIG = 'english'
+
+    def install(self):
+        # No foreign key to the task table: flush truncates that table alone,
+        # which a reference from this unmanaged one would refuse. Deletes
+        # unindex their tasks instead, as on SQLite.
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (task_id bigint PRIMARY KEY, document tsvector NOT NULL)"
+            )
+            # Tables installed before carried one
+            cursor.execute(f"ALTER TABLE {SEARCH_TABLE} DROP CONSTRAINT IF EXISTS {SEARCH_TABLE}_task_id_fkey")
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_gin ON {SEARCH_TABLE} USING gin (document)"
+            )
+
+    def documents_sql(self, where=''):
+        return (
+            f"INSERT INTO {SEARCH_TABLE} (task_id, document) "
+            f"SELECT task.id, "
+            f"setweight(to_tsvector('{self.CONFIG}', task.title), 'A') || "
+            f"setweight(to_tsvector('{self.CONFIG}', COALESCE(project.name, '')), 'B') || "
+            f"setweight(to_tsvector('{self.CONFIG}', task.description), 'C') "
+            f"FROM {Task._meta.db_table} task "
+            f"LEFT JOIN {Project._meta.db_table} project ON project.id = task.project_id {where}"
+        )
+
+    def reindex(self, task_ids):
+        for batch in chunked(task_ids, REINDEX_BATCH_SIZE):
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE task_id = ANY(%s)", [batch])
+                cursor.execute(self.documents_sql("WHERE task.id = ANY(%s)"), [batch])
+
+    def unindex(self, task_ids):
+        for batch in chunked(task_ids, REINDEX_BATCH_SIZE):
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE task_id = ANY(%s)", [batch])
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {SEARCH_TABLE}")
+            cursor.execute(self.documents_sql())
+
+    def match(self, tasks, terms):
+        visible_sql, visible_params = tasks.values('id').query.sql_with_params()
+        # Prefix terms, ANDed: deploy:* & api:*
+        expression = ' & '.join(f'{term}:*' for term in terms)
+        where = f"document @@ to_tsquery('{self.CONFIG}', %s) AND task_id IN ({visible_sql})"
+        return where, [expression, *visible_params]
+
+    def count(self, tasks, terms):
+        where, params = self.match(tasks, terms)
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE {where}", params)
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, tasks, terms, offset, limit):
+        where, params = self.match(tasks, terms)
+        expression = params[0]
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT task_id, ts_rank(document, to_tsquery('{self.CONFIG}', %s)) AS rank "
+                f"FROM {SEARCH_TABLE} WHERE {where} ORDER BY rank DESC, task_id LIMIT %s OFFSET %s",
+                [expression, *params, limit, offset],
+            )
+            return cursor.fetchall()
+
+
+@functools.cache
+def sqlite_has_fts5():
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE probe USING fts5(body)')
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def get_backend(using):
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend(connection)
+    if connection.vendor == 'sqlite' and sqlite_has_fts5():
+        return SqliteSearchBackend(connection)
+    return SearchBackend(connection)
+
+
+def install_search_index(using='default', **kwargs):
+    # post_migrate receiver: the index table lives outside the migrations
+    get_backend(using).install()
+
+
+def reindex_tasks(task_ids):
+    """
+    Bring the search documents of ``task_ids`` in line with their rows;
+    documents of tasks that no longer exist are dropped.
+    """
+    task_ids = [task_id for task_id in task_ids if task_id is not None]
+    if task_ids:
+        get_backend(router.db_for_write(Task)).reindex(task_ids)
+
+
+def unindex_tasks(task_ids):
+    # Cheaper than reindex_tasks for rows known to be deleted
+    task_ids = [task_id for task_id in task_ids if task_id is not None]
+    if task_ids:
+        get_backend(router.db_for_write(Task)).unindex(task_ids)
+
+
+def rebuild_search_index():
+    get_backend(router.db_for_write(Task)).rebuild()
+
+
+class SearchResults:
+    """
+    The tasks among ``tasks`` matching ``query``, best first. Supports
+    ``count()`` and slicing, so a Paginator can page it; each sliced task
+    carries its ``search_rank``.
+    """
+
+    def __init__(self, tasks, query):
+        self.tasks = tasks.order_by()
+        self.terms = search_terms(query)
+        self.backend = get_backend(self.tasks.db)
+
+    def count(self):
+        if not self.terms:
+            return 0
+        return self.backend.count(self.tasks, self.terms)
+
+    def __getitem__(self, key):
+        start, stop = key.start or 0, key.stop
+        if not self.terms or stop <= start:
+            return []
+        ranked = self.backend.ranked_ids(self.tasks, self.terms, start, stop - start)
+        by_id = Task.objects.using(self.tasks.db).select_related('project', 'user').in_bulk(
+            [task_id for task_id, _ in ranked]
+        )
+        results = []
+        for task_id, rank in ranked:
+            task = by_id.get(task_id)
+            if task is None:
+                # Deleted since the ranking query
+                continue
+            task.search_rank = rank
+            results.append(task)
+        return results
@@ -0,0 +1,20 @@
+"""
+Session stores for SESSION_ENGINE = 'user.sessions.db' / 'user.sessions.cached_db'.
+
+They differ from Django's only in cycle_key(), which login() calls. Django's
+writes the session under the new key right away, and SessionMiddleware
+writes it again with the auth keys at the end of the response. These drop
+the key instead, so the middleware creates the new session once, with the
+final data.
+"""
+
+
+class DeferredCycleMixin:
+    def cycle_key(self):
+        data = self._session
+        key = self.session_key
+        self._session_key = None
+        self._session_cache = data
+        self.modified = True
+        if key:
+            self.delete(key)
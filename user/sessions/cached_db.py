@@ -0,0 +1,6 @@
+from django.contrib.sessions.backends import cached_db
+from . import DeferredCycleMixin
+
+
+class SessionStore(DeferredCycleMixin, cached_db.SessionStore):
+    pass
@@ -0,0 +1,6 @@
+from django.contrib.sessions.backends import db
+from . import DeferredCycleMixin
+
+
+class SessionStore(DeferredCycleMixin, db.SessionStore):
+    pass
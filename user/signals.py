@@ -0,0 +1,177 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.contrib.auth.models import User
+from django.dispatch import receiver
+from . import cache as task_list_cache
+from . import stats
+from .backends import forget_user
+from .search import reindex_tasks, unindex_tasks
+from .models import Task, Project, ProjectStats, SyncEvent, TaskPermission
+from .sync import grant_removal_events, membership_events, record_events, task_removal_events
+
+ProjectAssignment = Project.assigned_users.through
+
+
+def project_audience(project_ids):
+    # Owners and assigned users of the given projects
+    project_ids = {project_id for project_id in project_ids if project_id is not None}
+    if not project_ids:
+        return set()
+    owners = Project.objects.filter(id__in=project_ids).values_list('user_id', flat=True)
+    assigned = ProjectAssignment.objects.filter(project_id__in=project_ids).values_list('user_id', flat=True)
+    return set(owners) | set(assigned)
+
+
+def tasks_audience(task_ids):
+    # Owners and grantees of the given tasks, in two queries however many there are
+    owners = Task.objects.filter(id__in=task_ids).values_list('user_id', flat=True)
+    grantees = TaskPermission.objects.filter(task_id__in=task_ids).values_list('user_id', flat=True)
+    return set(owners) | set(grantees)
+
+
+def task_audience(task, project_ids):
+    audience = {task.user_id}
+    audience |= set(TaskPermission.objects.filter(task_id=task.pk).values_list('user_id', flat=True))
+    return audience | project_audience(project_ids)
+
+
+@receiver(pre_save, sender=Task)
+def remember_task_state(sender, instance, **kwargs):
+    # The stored row before this save: a moved task changes both projects' counts
+    instance._previous_state = None
+    if instance.pk:
+        instance._previous_state = (
+            Task.objects.filter(pk=instance.pk)
+            .values_list('project_id', 'status', 'priority', 'due_date')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, **kwargs):
+    previous_state = getattr(instance, '_previous_state', None)
+    stats.apply_change(previous_state, stats.task_state(instance))
+    reindex_tasks([instance.pk])
+    if previous_state and previous_state[0] and previous_state[0] != instance.project_id:
+        # Members of the old project may have lost sight of it
+        record_events([SyncEvent(kind='task', object_id=instance.pk, project_id=previous_state[0])])
+    project_ids = {instance.project_id, previous_state[0] if previous_state else None}
+    task_list_cache.invalidate_users(task_audience(instance, project_ids))
+    task_list_cache.invalidate_superusers()
+
+
+@receiver(pre_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    # pre_delete: the permission rows and project still exist to tell us who saw it
+    instance._grantee_ids = set(TaskPermission.objects.filter(task_id=instance.pk).values_list('user_id', flat=True))
+    task_list_cache.invalidate_users(
+        instance._grantee_ids | {instance.user_id} | project_audience({instance.project_id})
+    )
+    task_list_cache.invalidate_superusers()
+
+
+@receiver(post_delete, sender=Task)
+def task_removed(sender, instance, **kwargs):
+    stats.apply_change(stats.task_state(instance), None)
+    unindex_tasks([instance.pk])
+    grants = [(instance.pk, user_id) for user_id in getattr(instance, '_grantee_ids', ())]
+    record_events(task_removal_events([instance]) + grant_removal_events(grants))
+
+
+@receiver(pre_save, sender=Project)
+def remember_project_state(sender, instance, **kwargs):
+    instance._previous_owner_id = instance._previous_name = None
+    if instance.pk:
+        instance._previous_owner_id, instance._previous_name = (
+            Project.objects.filter(pk=instance.pk).values_list('user_id', 'name').first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, created, **kwargs):
+    if created:
+        ProjectStats.objects.create(project=instance)
+    elif getattr(instance, '_previous_name', None) not in (None, instance.name):
+        # The project name is part of each of its tasks' search documents
+        reindex_tasks(Task.objects.filter(project=instance).values_list('id', flat=True))
+    audience = project_audience({instance.pk})
+    audience.add(getattr(instance, '_previous_owner_id', None))
+    task_list_cache.invalidate_users(audience)
+    task_list_cache.invalidate_superusers()
+
+
+@receiver(pre_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    audience = project_audience({instance.pk})
+    record_events(membership_events(instance.pk, audience))
+    task_list_cache.invalidate_users(audience)
+    task_list_cache.invalidate_superusers()
+
+
+@receiver(m2m_changed, sender=ProjectAssignment)
+def project_assignment_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    removed = action != 'post_add'
+    if reverse:
+        # user.assigned_projects.add(...): instance is the user, pk_set holds projects
+        project_ids = set(pk_set or ()) if action != 'pre_clear' else set(
+            instance.assigned_projects.values_list('id', flat=True)
+        )
+        user_ids = {instance.pk} | set(
+            Project.objects.filter(id__in=project_ids).values_list('user_id', flat=True)
+        )
+        record_events([
+            event for project_id in project_ids for event in membership_events(project_id, {instance.pk}, removed)
+        ])
+    else:
+        if action == 'pre_clear':
+            user_ids = set(instance.assigned_users.values_list('id', flat=True))
+        else:
+            user_ids = set(pk_set or ())
+        # The owner keeps seeing the project (and gets a harmless event on removal)
+        record_events(membership_events(instance.pk, user_ids, removed))
+        user_ids.add(instance.user_id)
+    task_list_cache.invalidate_users(user_ids)
+    task_list_cache.invalidate_superusers()
+
+
+@receiver(post_save, sender=TaskPermission)
+@receiver(post_delete, sender=TaskPermission)
+def task_permission_changed(sender, instance, **kwargs):
+    # Grants only change what the grantee sees
+    task_list_cache.invalidate_users({instance.user_id})
+
+
+@receiver(post_delete, sender=TaskPermission)
+def task_permission_removed(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Task):
+        # Cascade from a task delete: task_removed records the grants in one go
+        return
+    record_events(grant_removal_events([(instance.task_id, instance.user_id)]))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Drop this process's cached copy (user.backends); logins save last_login and land here too
+    forget_user(instance.pk)
+
+
+def bulk_tasks_changed(project_ids=(), user_ids=(), task_ids=(), stat_changes=None):
+    """
+    Counterpart of the Task signals for set-based writes (bulk_create, update,
+    queryset delete) that bypass them: rebuild the touched projects' stats,
+    reindex ``task_ids`` for search and invalidate everyone who can see them.
+
+    When the caller knows each task's ``(old_state, new_state)`` it passes
+    them as ``stat_changes`` and the stats are moved by those deltas instead
+    of being rebuilt.
+    """
+    reindex_tasks(task_ids)
+    project_ids = {project_id for project_id in project_ids if project_id is not None}
+    if stat_changes is not None:
+        stats.apply_changes(stat_changes)
+    elif project_ids:
+        stats.refresh_project_stats(project_ids)
+    task_list_cache.invalidate_users(set(user_ids) | project_audience(project_ids))
+    task_list_cache.invalidate_superusers()
@@ -0,0 +1,251 @@
+import asyncio
+from collections import Counter, defaultdict
+from datetime import date
+from django.db import transaction
+from django.db.models import Case, Count, F, Sum, When
+from .models import Task, Project, ProjectStats, ProjectDueCount
+
+STATUS_FIELDS = {
+    'Pending': 'pending_count',
+    'In Progress': 'in_progress_count',
+    'Completed': 'completed_count',
+}
+PRIORITY_FIELDS = {
+    'Low': 'low_count',
+    'Medium': 'medium_count',
+    'High': 'high_count',
+}
+COUNT_FIELDS = ['task_count', *STATUS_FIELDS.values(), *PRIORITY_FIELDS.values()]
+
+# Tasks in this status never count as overdue
+CLOSED_STATUS = 'Completed'
+
+
+def task_state(task):
+    # The fields ProjectStats depends on, in the shape apply_change expects
+    return (task.project_id, task.status, task.priority, task.due_date)
+
+
+def change_deltas(changes):
+    # Net deltas of many (old_state, new_state) pairs
+    field_deltas = defaultdict(Counter)  # project_id -> field -> delta
+    due_deltas = Counter()  # (project_id, due_date) -> delta
+    for old_state, new_state in changes:
+        for state, sign in ((old_state, -1), (new_state, 1)):
+            if state is None or state[0] is None:
+                continue
+            project_id, status, priority, due_date = state
+            fields = field_deltas[project_id]
+            fields['task_count'] += sign
+            if status in STATUS_FIELDS:
+                fields[STATUS_FIELDS[status]] += sign
+            if priority in PRIORITY_FIELDS:
+                fields[PRIORITY_FIELDS[priority]] += sign
+            if status != CLOSED_STATUS:
+                due_deltas[(project_id, due_date)] += sign
+    return field_deltas, due_deltas
+
+
+def state_deltas(old_state, new_state):
+    return change_deltas([(old_state, new_state)])
+
+
+def apply_change(old_state, new_state):
+    """
+    Move one task's contribution from ``old_state`` to ``new_state`` (either
+    may be None for a create or delete) with F() increments, so concurrent
+    writers never overwrite each other's counts.
+    """
+    if old_state == new_state:
+        return
+    apply_changes([(old_state, new_state)])
+
+
+# (project, due date) counters moved per UPDATE; keeps each CASE and IN list bounded
+DUE_UPDATE_BATCH_SIZE = 300
+
+
+def delta_case(field, conditions):
+    # ``field`` moved by each (filter kwargs, delta) of ``conditions``; other rows keep their value
+    return Case(
+        *[When(then=F(field) + delta, **condition) for condition, delta in conditions],
+        default=F(field),
+    )
+
+
+def apply_changes(changes):
+    """
+    apply_change for many tasks at once, e.g. a bulk_create batch: a constant
+    number of statements for the touched projects (more only past
+    DUE_UPDATE_BATCH_SIZE due dates), whatever the number of tasks.
+    """
+    field_deltas, due_deltas = change_deltas(changes)
+    field_deltas = {
+        project_id: {field: delta for field, delta in fields.items() if delta}
+        for project_id, fields in field_deltas.items()
+    }
+    field_deltas = {project_id: fields for project_id, fields in field_deltas.items() if fields}
+    missing = set()
+    if field_deltas:
+        fields = {field for deltas in field_deltas.values() for field in deltas}
+        updated = ProjectStats.objects.filter(project_id__in=list(field_deltas)).update(**{
+            field: delta_case(field, [
+                ({'project_id': project_id}, deltas[field])
+                for project_id, deltas in field_deltas.items() if field in deltas
+            ])
+            for field in fields
+        })
+        if updated < len(field_deltas):
+            # No row yet (project predates the table): rebuild it from the live rows.
+            # Decrements skip this so a cascading project delete never recreates one.
+            grown = {project_id for project_id, deltas in field_deltas.items() if any(d > 0 for d in deltas.values())}
+            missing = grown - set(ProjectStats.objects.filter(project_id__in=grown).values_list('project_id', flat=True))
+    due_deltas = [
+        (key, delta) for key, delta in due_deltas.items() if delta and key[0] not in missing
+    ]
+    for start in range(0, len(due_deltas), DUE_UPDATE_BATCH_SIZE):
+        batch = due_deltas[start:start + DUE_UPDATE_BATCH_SIZE]
+        created = [
+            ProjectDueCount(project_id=project_id, due_date=due_date)
+            for (project_id, due_date), delta in batch if delta > 0
+        ]
+        if created:
+            ProjectDueCount.objects.bulk_create(created, ignore_conflicts=True)
+        # Filtered on both columns separately (a superset); the CASE leaves the other rows as they were
+        ProjectDueCount.objects.filter(
+            project_id__in={project_id for (project_id, _), _ in batch},
+            due_date__in={due_date for (_, due_date), _ in batch},
+        ).update(open_count=delta_case('open_count', [
+            ({'project_id': project_id, 'due_date': due_date}, delta) for (project_id, due_date), delta in batch
+        ]))
+    if missing:
+        refresh_project_stats(missing)
+
+
+def live_stats(project_ids):
+    """
+    Aggregate ProjectStats/ProjectDueCount values straight from Task for the
+    given projects: ``({project_id: {field: count}}, {project_id: {due_date: open}})``.
+    """
+    counts = {project_id: dict.fromkeys(COUNT_FIELDS, 0) for project_id in project_ids}
+    due = {project_id: {} for project_id in project_ids}
+    rows = (
+        Task.objects.filter(project_id__in=project_ids)
+        .order_by()
+        .values_list('project_id', 'status', 'priority')
+        .annotate(count=Count('id'))
+    )
+    for project_id, status, priority, count in rows:
+        fields = counts[project_id]
+        fields['task_count'] += count
+        if status in STATUS_FIELDS:
+            fields[STATUS_FIELDS[status]] += count
+        if priority in PRIORITY_FIELDS:
+            fields[PRIORITY_FIELDS[priority]] += count
+    rows = (
+        Task.objects.filter(project_id__in=project_ids)
+        .exclude(status=CLOSED_STATUS)
+        .order_by()
+        .values_list('project_id', 'due_date')
+        .annotate(count=Count('id'))
+    )
+    for project_id, due_date, count in rows:
+        due[project_id][due_date] = count
+    return counts, due
+
+
+def refresh_project_stats(project_ids):
+    # Replace the stored rows of the given projects with live aggregates
+    project_ids = list(Project.objects.filter(id__in=project_ids).values_list('id', flat=True))
+    counts, due = live_stats(project_ids)
+    with transaction.atomic():
+        ProjectStats.objects.filter(project_id__in=project_ids).delete()
+        ProjectDueCount.objects.filter(project_id__in=project_ids).delete()
+        ProjectStats.objects.bulk_create(
+            ProjectStats(project_id=project_id, **fields) for project_id, fields in counts.items()
+        )
+        ProjectDueCount.objects.bulk_create(
+            ProjectDueCount(project_id=project_id, due_date=due_date, open_count=count)
+            for project_id, dates in due.items()
+            for due_date, count in dates.items()
+        )
+    return len(project_ids)
+
+
+def find_drift(project_ids):
+    """
+    Compare the stored rows of the given projects with live aggregates and
+    return ``(project_id, what, stored, live)`` for every mismatch.
+    """
+    counts, due = live_stats(project_ids)
+    stored = {
+        row['project_id']: row
+        for row in ProjectStats.objects.filter(project_id__in=project_ids).values('project_id', *COUNT_FIELDS)
+    }
+    stored_due = defaultdict(dict)
+    rows = ProjectDueCount.objects.filter(project_id__in=project_ids).exclude(open_count=0)
+    for project_id, due_date, count in rows.values_list('project_id', 'due_date', 'open_count'):
+        stored_due[project_id][due_date] = count
+    drift = []
+    for project_id in project_ids:
+        row = stored.get(project_id)
+        if row is None:
+            drift.append((project_id, 'row', None, counts[project_id]))
+            continue
+        for field in COUNT_FIELDS:
+            if row[field] != counts[project_id][field]:
+                drift.append((project_id, field, row[field], counts[project_id][field]))
+        if stored_due[project_id] != due[project_id]:
+            drift.append((project_id, 'due_counts', stored_due[project_id], due[project_id]))
+    return drift
+
+
+def stats_queries(project_ids, today=None):
+    # (ProjectStats rows, overdue sums) behind stats_for_projects
+    today = today or date.today()
+    overdue = (
+        ProjectDueCount.objects.filter(project_id__in=project_ids, due_date__lt=today)
+        .order_by()
+        .values('project_id')
+        .annotate(overdue=Sum('open_count'))
+        .values_list('project_id', 'overdue')
+    )
+    rows = ProjectStats.objects.filter(project_id__in=project_ids).values('project_id', *COUNT_FIELDS)
+    return rows, overdue
+
+
+def merge_stats(rows, overdue):
+    stats = {}
+    for row in rows:
+        stats[row['project_id']] = {
+            'total': row['task_count'],
+            'pending': row['pending_count'],
+            'in_progress': row['in_progress_count'],
+            'completed': row['completed_count'],
+            'low': row['low_count'],
+            'medium': row['medium_count'],
+            'high': row['high_count'],
+            'overdue': overdue.get(row['project_id'], 0),
+        }
+    return stats
+
+
+def stats_for_projects(project_ids, today=None):
+    """
+    Header figures for task_list: ``{project_id: {'total', 'pending', 'in_progress',
+    'completed', 'low', 'medium', 'high', 'overdue'}}``. Two indexed lookups no
+    matter how many tasks the projects hold.
+    """
+    rows, overdue = stats_queries(project_ids, today)
+    return merge_stats(rows, dict(overdue))
+
+
+async def astats_for_projects(project_ids, today=None):
+    # stats_for_projects with both lookups in flight at once
+    rows, overdue = stats_queries(project_ids, today)
+    rows, overdue = await asyncio.gather(alist(rows), alist(overdue))
+    return merge_stats(rows, dict(overdue))
+
+
+async def alist(queryset):
+    return [row async for row in queryset]
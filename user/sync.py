@@ -0,0 +1,228 @@
+"""
+Delta sync: the projects, tasks and grants that changed for a user since a
+server-issued sync token, plus what they can no longer see.
+
+A sync round fixes an upper bound (``until``) on its first page and walks
+five streams in order (projects, tasks, the user's own grants, removals and
+re-sent tasks), each by keyset over (timestamp, id), so large deltas come in
+bounded pages. The last page's token starts the next round at ``until``.
+Clients apply ``removed`` before the upserts of the same page; a removed
+project takes its tasks with it, and any of them still visible (owned or
+granted) are re-sent by the last stream, after every removal.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from .models import SyncEvent, TaskPermission
+from .permissions import visible_projects, visible_tasks
+
+SYNC_PAGE_SIZE = 200
+SYNC_MAX_PAGE_SIZE = 1000
+
+TOKEN_SALT = 'user.sync'
+
+PHASES = ['projects', 'tasks', 'permissions', 'removals', 'resent']
+
+SyncPage = namedtuple('SyncPage', ['projects', 'tasks', 'permissions', 'removed', 'token', 'has_more'])
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+class ExpiredSyncToken(InvalidSyncToken):
+    # Older than the retained events: the client has to start over with a full sync
+    pass
+
+
+def record_events(events):
+    if events:
+        SyncEvent.objects.bulk_create(events)
+
+
+def task_removal_events(tasks, project_scoped=True):
+    # ``tasks`` need id, user_id and project_id; members of the project and the owner may lose sight of each
+    events = []
+    for task in tasks:
+        if project_scoped and task.project_id:
+            events.append(SyncEvent(kind='task', object_id=task.id, project_id=task.project_id))
+        events.append(SyncEvent(kind='task', object_id=task.id, user_id=task.user_id))
+    return events
+
+
+def grant_removal_events(grants):
+    # ``grants`` are (task_id, user_id) pairs of deleted TaskPermission rows
+    events = []
+    for task_id, user_id in grants:
+        events.append(SyncEvent(kind='permission', object_id=task_id, user_id=user_id))
+        events.append(SyncEvent(kind='task', object_id=task_id, user_id=user_id))
+    return events
+
+
+def membership_events(project_id, user_ids, removed=True):
+    return [
+        SyncEvent(kind='project', object_id=project_id, user_id=user_id, removed=removed)
+        for user_id in user_ids if user_id is not None
+    ]
+
+
+def retention():
+    return timedelta(days=getattr(settings, 'SYNC_EVENT_RETENTION_DAYS', 30))
+
+
+def prune_events():
+    # Tokens older than the retention window are refused, so their events can go
+    # Nothing references SyncEvent and it has no signals, so this is a single DELETE
+    deleted, _ = SyncEvent.objects.filter(created_date__lt=timezone.now() - retention()).delete()
+    return deleted
+
+
+def encode_token(state):
+    return signing.dumps(state, salt=TOKEN_SALT, compress=True)
+
+
+def decode_token(token):
+    try:
+        state = signing.loads(token, salt=TOKEN_SALT)
+        since = datetime.fromisoformat(state['since']) if state['since'] else None
+        until = datetime.fromisoformat(state['until']) if state['until'] else None
+        phase = int(state['phase'])
+        after = (datetime.fromisoformat(state['after'][0]), int(state['after'][1])) if state['after'] else None
+    except (signing.BadSignature, KeyError, TypeError, ValueError, IndexError):
+        raise InvalidSyncToken('Invalid sync token.')
+    if not 0 <= phase < len(PHASES):
+        raise InvalidSyncToken('Invalid sync token.')
+    if since and since < timezone.now() - retention():
+        raise ExpiredSyncToken('Sync token expired; start a full sync without a token.')
+    return since, until, phase, after
+
+
+def in_window(field, since, until):
+    window = Q(**{f'{field}__lte': until})
+    if since:
+        window &= Q(**{f'{field}__gt': since})
+    return window
+
+
+def visible_events(user):
+    if user.is_superuser:
+        # Superusers see every task and project, but only their own grants
+        return SyncEvent.objects.exclude(Q(kind='permission') & ~Q(user=user))
+    return SyncEvent.objects.filter(
+        Q(user=user) | Q(user__isnull=True, project_id__in=visible_projects(user).values('id'))
+    )
+
+
+def gained_projects(user, since, until):
+    # Projects the user was assigned to during the window; their rows may be older than ``since``
+    return SyncEvent.objects.filter(
+        in_window('created_date', since, until), kind='project', removed=False, user=user,
+    ).values('object_id')
+
+
+def project_changes(user, since, until):
+    projects = visible_projects(user).select_related('user').filter(updated_date__lte=until)
+    if since:
+        projects = projects.filter(Q(updated_date__gt=since) | Q(id__in=gained_projects(user, since, until)))
+    return projects, 'updated_date'
+
+
+def task_changes(user, since, until):
+    tasks = visible_tasks(user).select_related('project', 'user').filter(updated_date__lte=until)
+    if since:
+        granted = TaskPermission.objects.filter(in_window('updated_date', since, until), user=user)
+        tasks = tasks.filter(
+            Q(updated_date__gt=since)
+            | Q(project__in=gained_projects(user, since, until))
+            | Q(id__in=granted.values('task_id'))
+        )
+    return tasks, 'updated_date'
+
+
+def permission_changes(user, since, until):
+    return TaskPermission.objects.filter(in_window('updated_date', since, until), user=user), 'updated_date'
+
+
+def removal_changes(user, since, until):
+    if not since:
+        # A full sync starts from nothing, so there is nothing to remove
+        return SyncEvent.objects.none(), 'created_date'
+    events = visible_events(user).filter(in_window('created_date', since, until), removed=True)
+    # Drop the events whose object the user can (again) see
+    events = events.exclude(kind='task', object_id__in=visible_tasks(user).values('id'))
+    events = events.exclude(kind='project', object_id__in=visible_projects(user).values('id'))
+    events = events.exclude(kind='permission', object_id__in=TaskPermission.objects.filter(user=user).values('task_id'))
+    return events, 'created_date'
+
+
+def lost_projects(user, since, until):
+    # Projects the user lost sight of during the window and has not regained
+    events = visible_events(user).filter(in_window('created_date', since, until), kind='project', removed=True)
+    return events.exclude(object_id__in=visible_projects(user).values('id')).values('object_id')
+
+
+def resent_changes(user, since, until):
+    # Tasks in a lost project the user still sees through ownership or a grant
+    tasks = visible_tasks(user).select_related('project', 'user').filter(updated_date__lte=until)
+    if not since:
+        return tasks.none(), 'updated_date'
+    return tasks.filter(project_id__in=lost_projects(user, since, until)), 'updated_date'
+
+
+STREAMS = [project_changes, task_changes, permission_changes, removal_changes, resent_changes]
+
+
+def keyset(rows, field, after):
+    rows = rows.order_by(field, 'id')
+    if after:
+        timestamp, row_id = after
+        rows = rows.filter(Q(**{f'{field}__gt': timestamp}) | Q(**{field: timestamp, 'id__gt': row_id}))
+    return rows
+
+
+def sync_page(user, token=None, limit=SYNC_PAGE_SIZE):
+    """
+    The page of changes after ``token`` (None for a full sync), at most
+    ``limit`` rows across the streams. Raises InvalidSyncToken.
+    """
+    if token:
+        since, until, phase, after = decode_token(token)
+    else:
+        since, until, phase, after = None, None, 0, None
+    if until is None:
+        # First page of a round; the grace period lets in-flight transactions that stamped a row commit
+        until = timezone.now() - timedelta(seconds=getattr(settings, 'SYNC_COMMIT_GRACE_SECONDS', 2))
+
+    found = {name: [] for name in PHASES}
+    remaining = limit
+    while phase < len(PHASES) and remaining > 0:
+        rows, field = STREAMS[phase](user, since, until)
+        rows = list(keyset(rows, field, after)[:remaining + 1])
+        if len(rows) > remaining:
+            rows = rows[:remaining]
+            found[PHASES[phase]].extend(rows)
+            after = (getattr(rows[-1], field), rows[-1].id)
+            break
+        found[PHASES[phase]].extend(rows)
+        remaining -= len(rows)
+        phase, after = phase + 1, None
+
+    removed = {'projects': [], 'tasks': [], 'permissions': []}
+    for event in found['removals']:
+        ids = removed[f'{event.kind}s']
+        if event.object_id not in ids:
+            ids.append(event.object_id)
+    tasks = found['tasks'] + found['resent']
+
+    has_more = phase < len(PHASES)
+    if has_more:
+        state = {
+            'since': since.isoformat() if since else None, 'until': until.isoformat(), 'phase': phase,
+            'after': [after[0].isoformat(), after[1]] if after else None,
+        }
+    else:
+        state = {'since': until.isoformat(), 'until': None, 'phase': 0, 'after': None}
+    return SyncPage(found['projects'], tasks, found['permissions'], removed, encode_token(state), has_more)
@@ -1,3 +1,1764 @@
-from django.test import TestCase
+import csv
+import json
+import re
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from io import StringIO
+from unittest import skipUnless
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core import mail
+from django.core.management.base import CommandError
+from django.db import connection, router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from .models import (
+    ActivityEvent, ArchivedTask, ArchivedTaskPermission, Task, Project, ProjectStats, ReminderDigest, TaskPermission,
+)
+from . import activity
+from .autocomplete import prefix_search
+from .archive import archive_batch, archive_completed_tasks, archive_cutoff
+from .backends import cached_user, clear_user_cache
+from .benchmarks import (
+    ASGI_URLCONF, run_benchmarks, run_load_test, run_render_benchmark, run_session_benchmark, seed_dataset,
+)
+from .bulk import (
+    PLAIN_DELETE_DEPENDENTS, delete_rows, delete_tasks, grant_permissions, mark_pending_deletion, purge_project,
+    update_tasks,
+)
+from .forms import TaskForm
+from .importer import import_tasks, read_rows
+from .instrumentation import QueryBudgetExceeded, capture_metrics, fingerprint
+from .middleware import PIN_COOKIE, ReplicaRoutingMiddleware
+from .pagination import TASK_KEYSET_ORDERING, encode_cursor, keyset_queryset
+from .reminders import collect_digests, send_reminders
+from . import cache as task_list_cache
+from .permissions import PERMISSION_LEVELS, PermissionResolver, visible_tasks
+from .routers import routing_state
+from .search import SEARCH_TABLE, SearchBackend, SearchResults, sqlite_has_fts5
+from .sync import encode_token
+from .stats import find_drift, stats_for_projects
+from .views import PROJECTS_PER_PAGE, check_task_permission
 
-# Create your tests here.
+
+@override_settings(REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_STRICT=True, ACTIVITY_FLUSH_THREAD=False)
+class BaseTestCase(TestCase):
+    # Every request made by the suite must stay within VIEW_QUERY_BUDGETS. Activity events are
+    # flushed by the tests themselves: a flusher thread would write on its own connection
+
+    def setUp(self):
+        # Cached task_list pages and users would otherwise leak between tests that reuse ids
+        cache.clear()
+        caches['fragments'].clear()
+        clear_user_cache()
+
+    def tearDown(self):
+        # Left over, activity events would be flushed at exit into a dropped test database
+        activity.buffer.events.clear()
+
+
+class PermissionResolverTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.owner = User.objects.create_user('owner', password='password')
+        cls.member = User.objects.create_user('member', password='password')
+        cls.project = Project.objects.create(name='Alpha', user=cls.owner)
+        cls.project.assigned_users.add(cls.member)
+
+    def make_task(self, title, user=None, project=None):
+        return Task.objects.create(
+            title=title,
+            user=user or self.owner,
+            project=project or self.project,
+            due_date=date.today(),
+        )
+
+    def grant(self, user, task, permission_type):
+        return TaskPermission.objects.create(
+            user=user, task=task, permission_type=permission_type, assigned_by=self.admin
+        )
+
+    def test_matches_baseline_permission_table(self):
+        plain = self.make_task('plain')
+        viewable = self.make_task('viewable')
+        editable = self.make_task('editable')
+        deletable = self.make_task('deletable')
+        self.grant(self.member, viewable, 'view')
+        self.grant(self.member, editable, 'edit')
+        self.grant(self.member, deletable, 'delete')
+        self.grant(self.owner, editable, 'edit')
+
+        # (view, edit, delete) under the original per-task check_task_permission
+        expected = {
+            (self.admin, plain): (True, True, True),
+            (self.admin, deletable): (True, True, True),
+            # Owners see their own tasks and need a grant for anything more
+            (self.owner, plain): (True, False, False),
+            (self.owner, viewable): (True, False, False),
+            (self.owner, editable): (True, True, False),
+            (self.owner, deletable): (True, False, False),
+            (self.member, plain): (False, False, False),
+            (self.member, viewable): (True, False, False),
+            (self.member, editable): (True, True, False),
+            (self.member, deletable): (True, True, True),
+        }
+        for (user, task), allowed in expected.items():
+            resolver = PermissionResolver(user)
+            for required, result in zip(('view', 'edit', 'delete'), allowed):
+                label = (user.username, task.title, required)
+                self.assertIs(resolver.has_permission(task, required), result, label)
+                self.assertIs(check_task_permission(user, task, required), result, label)
+
+    def test_owner_without_grant_can_only_view(self):
+        task = self.make_task('owned')
+        capabilities = PermissionResolver(self.owner).capabilities(task)
+        self.assertEqual(tuple(capabilities), (True, False, False))
+
+    def test_can_add_to_project(self):
+        task = self.make_task('editable')
+        self.assertTrue(PermissionResolver(self.owner).can_add_to_project(self.project))
+        self.assertTrue(PermissionResolver(self.admin).can_add_to_project(self.project))
+        self.assertFalse(PermissionResolver(self.member).can_add_to_project(self.project))
+        self.grant(self.member, task, 'edit')
+        self.assertTrue(PermissionResolver(self.member).can_add_to_project(self.project))
+
+    @override_settings(AUTH_USER_CACHE_SECONDS=0)  # Both counts include the user query
+    def test_task_list_query_count_is_flat(self):
+        self.client.force_login(self.member)
+        urls = [reverse('task_list'), reverse('project_tasks', args=[self.project.id])]
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                for url in urls:
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        for i in range(3):
+            self.grant(self.member, self.make_task(f'small {i}'), 'edit')
+        small = count_queries()
+        for i in range(30):
+            self.grant(self.member, self.make_task(f'large {i}'), 'delete')
+        self.assertEqual(count_queries(), small)
+
+
+class TaskListGroupingTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.alice = User.objects.create_user('alice', password='password')
+        cls.bob = User.objects.create_user('bob', password='password')
+
+    def make_project(self, name, assigned=()):
+        project = Project.objects.create(name=name, user=self.alice)
+        project.assigned_users.set(assigned)
+        Task.objects.create(title=f'{name} task', user=self.alice, project=project)
+        return project
+
+    def test_superuser_gets_one_row_per_assigned_user(self):
+        shared = self.make_project('Shared', assigned=[self.alice, self.bob])
+        solo = self.make_project('Solo')
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('task_list'))
+        rows = [(p['id'], p['assigned_to'], p['task_count']) for p in response.context['display_projects']]
+        self.assertEqual(rows, [
+            (shared.id, 'alice', 1),
+            (shared.id, 'bob', 1),
+            (solo.id, 'alice', 1),
+        ])
+
+    @override_settings(AUTH_USER_CACHE_SECONDS=0)  # Both counts include the user query
+    def test_superuser_query_count_is_flat_across_projects(self):
+        self.client.force_login(self.admin)
+        self.make_project('First', assigned=[self.bob])
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('task_list'))
+        for i in range(10):
+            self.make_project(f'Project {i}', assigned=[self.bob] if i % 2 else [])
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(reverse('task_list'))
+        self.assertEqual(len(large), len(small))
+
+    def test_projects_are_paginated(self):
+        for i in range(PROJECTS_PER_PAGE + 1):
+            self.make_project(f'Project {i:02d}')
+        self.client.force_login(self.alice)
+        first = self.client.get(reverse('task_list'))
+        second = self.client.get(reverse('task_list'), {'page': 2})
+        self.assertEqual(len(first.context['display_projects']), PROJECTS_PER_PAGE)
+        self.assertEqual([p['name'] for p in second.context['display_projects']], ['Project 20'])
+
+    def test_project_tasks_respects_visibility(self):
+        project = self.make_project('Private')
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('project_tasks', args=[project.id]))
+        self.assertContains(response, 'Private task')
+        self.client.force_login(self.bob)
+        response = self.client.get(reverse('project_tasks', args=[project.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+    def test_empty_panel_links_to_create_task_for_the_project(self):
+        project = Project.objects.create(name='Empty', user=self.alice)
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('project_tasks', args=[project.id]))
+        self.assertContains(response, f'href="{reverse("create_task", args=[project.id])}"')
+        form = self.client.get(reverse('create_task', args=[project.id])).context['form']
+        self.assertEqual(form.initial['project'], project)
+
+class TaskFeedTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', password='password')
+        cls.bob = User.objects.create_user('bob', password='password')
+        cls.project = Project.objects.create(name='Feed', user=cls.alice)
+        for i in range(7):
+            Task.objects.create(
+                title=f'task {i}',
+                user=cls.alice,
+                project=cls.project,
+                due_date=date(2025, 1, 1 + i % 3),
+                priority=['Low', 'Medium', 'High'][i % 3],
+                status='Completed' if i % 2 else 'Pending',
+            )
+        Task.objects.create(title='hidden', user=cls.bob)
+
+    def fetch_all(self, **params):
+        ids, cursor = [], None
+        while True:
+            if cursor:
+                params['cursor'] = cursor
+            data = self.client.get(reverse('task_feed'), {'limit': 2, **params}).json()
+            ids.extend(task['id'] for task in data['results'])
+            cursor = data['next_cursor']
+            if not cursor:
+                return ids
+
+    def test_pages_follow_keyset_order(self):
+        self.client.force_login(self.alice)
+        expected = list(
+            Task.objects.filter(user=self.alice).order_by('due_date', 'priority', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual(self.fetch_all(), expected)
+
+    def test_filters(self):
+        self.client.force_login(self.alice)
+        expected = list(
+            Task.objects.filter(user=self.alice, status='Completed')
+            .order_by('due_date', 'priority', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual(self.fetch_all(status='Completed'), expected)
+        response = self.client.get(reverse('task_feed'), {'priority': 'Urgent'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_cursor(self):
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('task_feed'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class QueryPlanTests(BaseTestCase):
+    """
+    EXPLAIN the hot task_list / create_task / TaskForm queries and fail if any
+    of them falls back to a full table scan.
+    """
+
+    FULL_SCAN_PATTERNS = {
+        # "SCAN user_task" is a table scan; "SCAN user_task USING INDEX ..." walks an index
+        'sqlite': re.compile(r'\bSCAN \w+\b(?! USING)'),
+        'postgresql': re.compile(r'\bSeq Scan\b'),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('planner', password='password')
+        cls.project = Project.objects.create(name='Plans', user=cls.user)
+        cls.task = Task.objects.create(title='plan', user=cls.user, project=cls.project)
+
+    def hot_queries(self):
+        user, project = self.user, self.project
+        return {
+            'own tasks': Task.objects.filter(user=user),
+            'project panel': visible_tasks(user).filter(project=project),
+            'project counts': visible_tasks(user).filter(project_id__in=[project.id]).order_by().values('project_id'),
+            'project status': Task.objects.filter(project=project, status='Pending'),
+            'due date cursor': keyset_queryset(Task.objects.all(), encode_cursor(self.task))[:50],
+            'visible cursor': keyset_queryset(visible_tasks(user), encode_cursor(self.task))[:50],
+            'permission grants': TaskPermission.objects.filter(user=user, permission_type__in=PERMISSION_LEVELS['edit']),
+            'task form projects': TaskForm(user).fields['project'].queryset,
+        }
+
+    def test_hot_queries_use_indexes(self):
+        pattern = self.FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            self.skipTest(f'No plan check for {connection.vendor}')
+        if connection.vendor == 'postgresql':
+            # Tiny test tables always favour a seq scan; only allow it when no index applies
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        for name, queryset in self.hot_queries().items():
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertIsNone(pattern.search(plan), f'{name} does a full table scan:\n{plan}')
+
+
+    def test_picker_prefix_search_seeks_its_index(self):
+        # Walking the index in order would pass the full-scan check yet read every row on a miss
+        seek = {
+            'sqlite': r'SEARCH \w+ USING INDEX {}',
+            'postgresql': r'Index (Only )?Scan using {}',
+        }.get(connection.vendor)
+        if seek is None:
+            self.skipTest(f'No plan check for {connection.vendor}')
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        searches = {
+            'project_lower_name_idx': prefix_search(Project.objects.all(), 'name', 'pla')[:20],
+            'auth_user_lower_username_idx': prefix_search(User.objects.filter(is_active=True), 'username', 'pla')[:20],
+        }
+        for index, queryset in searches.items():
+            with self.subTest(index):
+                plan = queryset.explain()
+                self.assertRegex(plan, seek.format(index))
+
+
+class TaskListCacheTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.alice = User.objects.create_user('alice', password='password')
+        cls.bob = User.objects.create_user('bob', password='password')
+        cls.carol = User.objects.create_user('carol', password='password')
+        cls.project = Project.objects.create(name='Cached', user=cls.alice)
+        cls.project.assigned_users.add(cls.bob)
+
+    def get(self, user):
+        self.client.force_login(user)
+        response = self.client.get(reverse('task_list'))
+        return response['X-Task-List-Cache'], response.context['display_projects']
+
+    def test_second_hit_is_served_from_cache(self):
+        self.assertEqual(self.get(self.alice)[0], 'miss')
+        with self.assertNumQueries(2):  # session and the conditional GET validator; the user is cached
+            response = self.client.get(reverse('task_list'))
+        self.assertEqual(response['X-Task-List-Cache'], 'hit')
+        self.assertEqual(task_list_cache.stats(), {'hits': 1, 'misses': 1})
+
+    def test_task_change_invalidates_only_affected_users(self):
+        for user in (self.alice, self.bob, self.carol, self.admin):
+            self.get(user)
+        Task.objects.create(title='new', user=self.alice, project=self.project)
+        self.assertEqual(self.get(self.alice)[0], 'miss')
+        status, projects = self.get(self.bob)
+        self.assertEqual((status, projects[0]['task_count']), ('miss', 1))
+        self.assertEqual(self.get(self.admin)[0], 'miss')
+        self.assertEqual(self.get(self.carol)[0], 'hit')
+
+    def test_assignment_and_permission_changes_invalidate(self):
+        task = Task.objects.create(title='private', user=self.alice)
+        self.get(self.carol)
+        self.project.assigned_users.add(self.carol)
+        status, projects = self.get(self.carol)
+        self.assertEqual((status, len(projects)), ('miss', 1))
+        self.get(self.carol)
+        TaskPermission.objects.create(user=self.carol, task=task, permission_type='view', assigned_by=self.admin)
+        self.assertEqual(self.get(self.carol)[0], 'miss')
+        self.project.assigned_users.clear()
+        status, projects = self.get(self.carol)
+        self.assertEqual((status, projects), ('miss', []))
+
+
+class ConditionalGetTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', password='password')
+        cls.project = Project.objects.create(name='Conditional', user=cls.alice)
+        cls.task = Task.objects.create(title='etag', user=cls.alice, project=cls.project)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.alice)
+
+    def test_unchanged_list_answers_304_without_rendering(self):
+        for url in (reverse('task_list'), reverse('project_tasks', args=[self.project.id]), reverse('task_feed')):
+            with self.subTest(url):
+                etag = self.client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertLessEqual(len(queries), 3)
+
+    def test_changes_produce_a_new_etag(self):
+        url = reverse('task_list')
+        etag = self.client.get(url)['ETag']
+        self.task.status = 'Completed'
+        self.task.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        etag = self.client.get(url)['ETag']
+        Task.objects.create(title='other', user=self.alice, project=self.project).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since(self):
+        url = reverse('task_list')
+        self.task.save()
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+
+class ProjectStatsTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', password='password')
+        cls.first = Project.objects.create(name='First', user=cls.alice)
+        cls.second = Project.objects.create(name='Second', user=cls.alice)
+
+    def assertNoDrift(self):
+        self.assertEqual(find_drift([self.first.id, self.second.id]), [])
+
+    def test_counts_follow_creates_updates_moves_and_deletes(self):
+        yesterday = date.today() - timedelta(days=1)
+        task = Task.objects.create(title='a', user=self.alice, project=self.first, due_date=yesterday, priority='High')
+        Task.objects.create(title='b', user=self.alice, project=self.first)
+        self.assertEqual(stats_for_projects([self.first.id])[self.first.id]['overdue'], 1)
+        self.assertNoDrift()
+
+        self.client.force_login(self.alice)
+        TaskPermission.objects.create(user=self.alice, task=task, permission_type='edit', assigned_by=self.alice)
+        self.client.post(reverse('update_task', args=[task.id]), {
+            'title': 'a', 'description': 'x', 'due_date': yesterday, 'priority': 'High',
+            'status': 'Completed', 'project': self.first.id,
+        })
+        first = stats_for_projects([self.first.id])[self.first.id]
+        self.assertEqual((first['completed'], first['pending'], first['overdue']), (1, 1, 0))
+        self.assertNoDrift()
+
+        task.project = self.second
+        task.save()
+        self.assertEqual(stats_for_projects([self.second.id])[self.second.id]['high'], 1)
+        self.assertNoDrift()
+
+        task.delete()
+        self.assertEqual(stats_for_projects([self.second.id])[self.second.id]['total'], 0)
+        self.assertNoDrift()
+
+    def test_missing_row_is_rebuilt_on_next_write(self):
+        Task.objects.create(title='a', user=self.alice, project=self.first)
+        ProjectStats.objects.filter(project=self.first).delete()
+        Task.objects.create(title='b', user=self.alice, project=self.first)
+        self.assertEqual(stats_for_projects([self.first.id])[self.first.id]['total'], 2)
+        self.assertNoDrift()
+
+    def test_rebuild_command_repairs_and_check_detects_drift(self):
+        Task.objects.create(title='a', user=self.alice, project=self.first)
+        ProjectStats.objects.filter(project=self.first).update(task_count=42)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_project_stats', '--check', stdout=StringIO(), stderr=StringIO())
+        call_command('rebuild_project_stats', stdout=StringIO())
+        self.assertNoDrift()
+
+
+class ExportTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', password='password')
+        cls.bob = User.objects.create_user('bob', password='password')
+        cls.project = Project.objects.create(name='Export', user=cls.alice)
+        cls.shared = Task.objects.create(title='shared', user=cls.alice, project=cls.project)
+        Task.objects.create(title='private', user=cls.alice)
+        TaskPermission.objects.create(user=cls.bob, task=cls.shared, permission_type='edit', assigned_by=cls.alice)
+
+    def test_csv_stream_respects_visibility(self):
+        self.client.force_login(self.bob)
+        response = self.client.get(reverse('export_tasks'))
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([(row['title'], row['permissions'], row['can_edit']) for row in rows], [
+            ('shared', 'bob:edit', 'True'),
+        ])
+
+    def test_jsonl_command_exports_everything(self):
+        out = StringIO()
+        call_command('export_tasks', '--format', 'jsonl', '--chunk-size', '1', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([(row['title'], row['permissions']) for row in rows], [
+            ('shared', 'bob:edit'),
+            ('private', ''),
+        ])
+
+
+class ImportTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.alice = User.objects.create_user('alice', password='password')
+        cls.project = Project.objects.create(name='Import', user=cls.alice)
+        cls.other = Project.objects.create(name='Other', user=cls.admin)
+
+    def test_valid_rows_are_inserted_and_errors_reported(self):
+        data = StringIO(
+            'title,due_date,priority,status,project\n'
+            'first,2025-01-01,High,Pending,Import\n'
+            ',2025-01-01,High,Pending,Import\n'
+            'second,not-a-date,Low,Pending,Import\n'
+            'third,,Urgent,Pending,\n'
+            'fourth,,,,Other\n'
+            'fifth,,,,\n'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            result = import_tasks(read_rows(data), self.alice, batch_size=100)
+        self.assertEqual(result.created, 2)
+        self.assertEqual([(line, sorted(errors)) for line, errors in result.errors], [
+            (3, ['title']), (4, ['due_date']), (5, ['priority']), (6, ['project']),
+        ])
+        first = Task.objects.get(title='first')
+        self.assertEqual((first.project, first.user, first.priority), (self.project, self.alice, 'High'))
+        self.assertEqual(Task.objects.get(title='fifth').description, 'No description provided')
+        self.assertEqual(stats_for_projects([self.project.id])[self.project.id]['total'], 1)
+        self.assertLess(len(queries), 25)
+
+    def test_batches_move_stats_without_recounting(self):
+        Task.objects.create(title='existing', user=self.alice, project=self.project, status='Completed')
+        rows = [
+            (line, {'title': f'row {line}', 'project': 'Import', 'due_date': f'2025-01-0{line % 3 + 1}',
+                    'priority': 'High' if line % 2 else 'Low', 'status': 'Pending'})
+            for line in range(2, 12)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            result = import_tasks(rows, self.alice, batch_size=4)
+        self.assertEqual(result.created, 10)
+        self.assertEqual(find_drift([self.project.id]), [])
+        self.assertFalse([query['sql'] for query in queries if 'COUNT(' in query['sql']])
+        figures = stats_for_projects([self.project.id])[self.project.id]
+        self.assertEqual((figures['total'], figures['pending'], figures['high']), (11, 10, 5))
+
+    def test_command_reads_jsonl_and_assigns_owners(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = f'{directory.name}/tasks.jsonl'
+        with open(path, 'w') as f:
+            f.write(json.dumps({'title': 'mine', 'project': 'Import', 'owner': 'alice'}) + '\n')
+            f.write('not json\n')
+        out, err = StringIO(), StringIO()
+        call_command('import_tasks', path, '--user', 'admin', '--format', 'jsonl', stdout=out, stderr=err)
+        self.assertIn('Imported 1 tasks, rejected 1 rows.', out.getvalue())
+        self.assertEqual(Task.objects.get(title='mine').user, self.alice)
+
+    def test_admin_upload(self):
+        self.client.force_login(self.admin)
+        upload = SimpleUploadedFile('tasks.csv', b'title,project\nuploaded,Other\n')
+        response = self.client.post(reverse('admin:user_task_import'), {'file': upload, 'format': 'csv'})
+        self.assertRedirects(response, reverse('admin:user_task_changelist'))
+        self.assertEqual(Task.objects.get(title='uploaded').project, self.other)
+
+
+class BulkTaskActionTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.alice = User.objects.create_user('alice', password='password')
+        cls.project = Project.objects.create(name='Sprint', user=cls.admin)
+        cls.target = Project.objects.create(name='Next', user=cls.alice)
+
+    def make_tasks(self, count, permission_type=None):
+        tasks = [Task.objects.create(title=f't{i}', user=self.admin, project=self.project) for i in range(count)]
+        if permission_type:
+            for task in tasks:
+                TaskPermission.objects.create(user=self.alice, task=task, permission_type=permission_type, assigned_by=self.admin)
+        return tasks
+
+    def post(self, operation, tasks, value=''):
+        return self.client.post(
+            reverse('bulk_task_action'),
+            {'operation': operation, 'value': value, 'task_ids': [task.id for task in tasks]},
+            HTTP_ACCEPT='application/json',
+        ).json()
+
+    def test_status_change_skips_tasks_without_permission(self):
+        editable = self.make_tasks(2, 'edit')
+        viewable = self.make_tasks(1, 'view')
+        hidden = self.make_tasks(1)
+        self.client.force_login(self.alice)
+        result = self.post('set_status', editable + viewable + hidden, 'Completed')
+        self.assertEqual(result['changed'], [task.id for task in editable])
+        self.assertEqual(result['skipped'], sorted(task.id for task in viewable + hidden))
+        self.assertEqual(
+            list(Task.objects.filter(status='Completed').order_by('id').values_list('id', flat=True)),
+            [task.id for task in editable],
+        )
+        self.assertEqual(stats_for_projects([self.project.id])[self.project.id]['completed'], 2)
+
+    @override_settings(AUTH_USER_CACHE_SECONDS=0)  # Both counts include the user query
+    def test_query_count_does_not_grow_with_selection(self):
+        self.client.force_login(self.alice)
+        small, large = self.make_tasks(2, 'edit'), self.make_tasks(20, 'edit')
+        with CaptureQueriesContext(connection) as small_queries:
+            self.post('set_priority', small, 'High')
+        with CaptureQueriesContext(connection) as large_queries:
+            self.post('set_priority', large, 'High')
+        self.assertEqual(len(large_queries), len(small_queries))
+
+    def test_stats_move_by_deltas_without_recounting(self):
+        tasks = self.make_tasks(4, 'delete')
+        for i, task in enumerate(tasks):
+            task.due_date, task.priority = date(2025, 1, 1 + i % 2), 'Low'
+            task.save()
+        self.client.force_login(self.alice)
+        with CaptureQueriesContext(connection) as queries:
+            self.post('set_status', tasks[:3], 'Completed')
+            self.post('set_priority', tasks, 'High')
+            self.post('move_project', tasks[:2], str(self.target.id))
+            self.post('delete', tasks[1:3])
+        self.assertFalse([query['sql'] for query in queries if 'COUNT(' in query['sql']])
+        self.assertEqual(find_drift([self.project.id, self.target.id]), [])
+        self.assertEqual(stats_for_projects([self.target.id])[self.target.id]['completed'], 1)
+
+    def test_move_and_delete(self):
+        tasks = self.make_tasks(3, 'delete')
+        self.client.force_login(self.alice)
+        self.assertEqual(len(self.post('move_project', tasks[:1], str(self.target.id))['changed']), 1)
+        self.assertEqual(Task.objects.get(id=tasks[0].id).project, self.target)
+        result = self.post('delete', tasks)
+        self.assertEqual(result['skipped'], [])
+        self.assertFalse(Task.objects.filter(id__in=[task.id for task in tasks]).exists())
+        self.assertFalse(TaskPermission.objects.filter(task_id__in=[task.id for task in tasks]).exists())
+        self.assertEqual(find_drift([self.project.id, self.target.id]), [])
+
+    def test_task_list_form_offers_move_to_project(self):
+        tasks = self.make_tasks(1, 'edit')
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('task_list'))
+        self.assertContains(response, '<option value="move_project">')
+        self.assertContains(response, f'data-autocomplete-url="{reverse("project_autocomplete")}"')
+        response = self.client.post(reverse('bulk_task_action'), {
+            'operation': 'move_project', 'value': str(self.target.id), 'task_ids': [tasks[0].id],
+        })
+        self.assertRedirects(response, reverse('task_list'))
+        self.assertEqual(Task.objects.get(id=tasks[0].id).project, self.target)
+
+    def test_plain_deletes_know_every_dependent(self):
+        # A new relation to one of these models must be handled by delete_rows' callers first
+        for model, dependents in PLAIN_DELETE_DEPENDENTS.items():
+            related = {field.related_model for field in model._meta.get_fields() if field.auto_created and not field.concrete}
+            self.assertEqual(related, dependents, model.__name__)
+        with self.assertRaises(ValueError):
+            delete_rows(Project, 'id', [self.project.id])
+
+    def test_invalid_values_are_rejected(self):
+        self.client.force_login(self.alice)
+        tasks = self.make_tasks(1, 'edit')
+        self.assertIn('error', self.post('set_status', tasks, 'Done'))
+        self.assertIn('error', self.post('move_project', tasks, '999999'))
+
+
+class BulkPermissionTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.alice = User.objects.create_user('alice', password='password')
+        cls.bob = User.objects.create_user('bob', password='password')
+        cls.project = Project.objects.create(name='Team', user=cls.admin)
+        cls.tasks = [Task.objects.create(title=f't{i}', user=cls.admin, project=cls.project) for i in range(5)]
+        Task.objects.create(title='elsewhere', user=cls.admin)
+
+    def post(self, **data):
+        self.client.force_login(self.admin)
+        return self.client.post(reverse('bulk_task_permissions'), data, HTTP_ACCEPT='application/json')
+
+    def test_grant_upserts_across_project(self):
+        TaskPermission.objects.create(user=self.alice, task=self.tasks[0], permission_type='view', assigned_by=self.alice)
+        response = self.post(action='grant', permission_type='edit', project=self.project.id,
+                             user_ids=[self.alice.id, self.bob.id])
+        self.assertEqual(response.json(), {'action': 'grant', 'count': 10})
+        self.assertEqual(TaskPermission.objects.count(), 10)
+        self.assertEqual(set(TaskPermission.objects.values_list('permission_type', 'assigned_by')), {('edit', self.admin.id)})
+
+    def test_small_batches_and_revoke(self):
+        grant_permissions(Task.objects.filter(project=self.project), [self.alice.id, self.bob.id], 'view', self.admin, batch_size=3)
+        self.assertEqual(TaskPermission.objects.count(), 10)
+        response = self.post(action='revoke', project=self.project.id, user_ids=[self.bob.id],
+                             task_ids=[task.id for task in self.tasks[:2]])
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(TaskPermission.objects.filter(user=self.bob).count(), 3)
+
+    def test_grant_invalidates_grantee_task_list(self):
+        self.client.force_login(self.alice)
+        self.client.get(reverse('task_list'))
+        self.post(action='grant', permission_type='view', project=self.project.id, user_ids=[self.alice.id])
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(reverse('task_list'))['X-Task-List-Cache'], 'miss')
+
+    def test_regular_users_are_refused(self):
+        self.client.force_login(self.alice)
+        response = self.client.post(reverse('bulk_task_permissions'), {'action': 'grant'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(TaskPermission.objects.exists())
+
+    def test_benchmark_command_rolls_back(self):
+        out = StringIO()
+        call_command('benchmark_permission_grants', '--tasks', '20', '--users', '5', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['grant']['rows'], 100)
+        self.assertFalse(Task.objects.filter(title__startswith='Benchmark task').exists())
+
+
+class ViewBudgetTests(BaseTestCase):
+    """
+    Drive every view in user/urls.py once with representative data; the strict
+    QueryMetricsMiddleware fails the test when a view exceeds its budget.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.alice = User.objects.create_user('alice', password='password')
+        cls.bob = User.objects.create_user('bob', password='password')
+        cls.projects = []
+        for i in range(3):
+            project = Project.objects.create(name=f'Budget {i}', user=cls.alice)
+            project.assigned_users.set([cls.alice, cls.bob])
+            cls.projects.append(project)
+            for j in range(5):
+                task = Task.objects.create(title=f'Budget task {i}-{j}', user=cls.alice, project=project)
+                TaskPermission.objects.create(user=cls.bob, task=task, permission_type='delete', assigned_by=cls.admin)
+
+    def test_every_url_has_a_budget(self):
+        from .urls import urlpatterns
+        from django.conf import settings
+        missing = {pattern.name for pattern in urlpatterns} - set(settings.VIEW_QUERY_BUDGETS)
+        self.assertEqual(missing, set())
+
+    def get_ok(self, url):
+        # A budget only means something on the path that does the real work
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def test_read_views(self):
+        self.get_ok(reverse('landing_page'))
+        self.get_ok(reverse('login'))
+        self.get_ok(reverse('register'))
+        for user in (self.admin, self.alice, self.bob):
+            self.client.force_login(user)
+            response = self.get_ok(reverse('task_list'))
+            # Superusers get a row per assigned user
+            self.assertEqual(len(response.context['display_projects']), 6 if user.is_superuser else 3)
+            response = self.get_ok(reverse('project_tasks', args=[self.projects[0].id]))
+            self.assertEqual(len(response.context['task_rows']), 5)
+            self.assertEqual(len(self.get_ok(reverse('task_feed')).json()['results']), 15)
+            self.get_ok(reverse('archived_tasks'))
+            self.get_ok(reverse('create_task'))
+            self.get_ok(reverse('create_task', args=[self.projects[0].id]))
+        self.client.force_login(self.admin)
+        self.get_ok(reverse('create_project'))
+        self.get_ok(reverse('update_project', args=[self.projects[0].id]))
+        self.get_ok(reverse('manage_task_permissions', args=[Task.objects.first().id]))
+        self.get_ok(reverse('bulk_task_permissions'))
+
+    def test_write_views(self):
+        response = self.client.post(reverse('register'), {'username': 'carol', 'password1': 'S3cure-pass!', 'password2': 'S3cure-pass!'})
+        self.assertRedirects(response, reverse('task_list'), fetch_redirect_response=False)
+        self.assertTrue(User.objects.filter(username='carol').exists())
+        response = self.client.post(reverse('login'), {'username': 'alice', 'password': 'password'})
+        self.assertRedirects(response, reverse('task_list'), fetch_redirect_response=False)
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.alice.id)
+
+        task = Task.objects.filter(user=self.alice).first()
+        self.client.force_login(self.bob)
+        response = self.client.post(reverse('create_task'), {
+            'title': 'new', 'description': 'x', 'due_date': '2025-01-01', 'priority': 'Low',
+            'status': 'Pending', 'project': self.projects[0].id,
+        })
+        self.assertRedirects(response, reverse('task_list'), fetch_redirect_response=False)
+        self.assertTrue(Task.objects.filter(title='new', user=self.bob, project=self.projects[0]).exists())
+        response = self.client.post(reverse('update_task', args=[task.id]), {
+            'title': 'renamed', 'description': 'x', 'due_date': '2025-01-01', 'priority': 'High',
+            'status': 'Completed', 'project': self.projects[1].id,
+        })
+        self.assertRedirects(response, reverse('task_list'), fetch_redirect_response=False)
+        task.refresh_from_db()
+        self.assertEqual((task.title, task.status, task.project), ('renamed', 'Completed', self.projects[1]))
+        response = self.client.get(reverse('delete_task', args=[task.id]))
+        self.assertRedirects(response, reverse('task_list'), fetch_redirect_response=False)
+        self.assertFalse(Task.objects.filter(id=task.id).exists())
+
+        self.client.force_login(self.admin)
+        other = Task.objects.filter(user=self.alice).first()
+        response = self.client.post(reverse('manage_task_permissions', args=[other.id]), {'permission_type': 'edit'})
+        self.assertRedirects(response, reverse('task_list'), fetch_redirect_response=False)
+        self.assertEqual(TaskPermission.objects.get(user=self.alice, task=other).permission_type, 'edit')
+        response = self.client.post(reverse('set_task_permission', args=[other.id]), {'permission_type': ''})
+        self.assertRedirects(response, reverse('task_list'), fetch_redirect_response=False)
+        self.assertFalse(TaskPermission.objects.filter(user=self.alice, task=other).exists())
+        response = self.client.post(reverse('create_project'), {
+            'name': 'Created', 'description': 'x', 'assigned_users': [self.alice.id, self.bob.id],
+        })
+        self.assertRedirects(response, reverse('task_list'), fetch_redirect_response=False)
+        created = Project.objects.get(name='Created')
+        self.assertEqual(set(created.assigned_users.all()), {self.alice, self.bob})
+        response = self.client.post(reverse('update_project', args=[self.projects[1].id]), {
+            'name': 'Renamed', 'description': 'x', 'assigned_users': [self.bob.id],
+        })
+        self.assertRedirects(response, reverse('task_list'), fetch_redirect_response=False)
+        self.projects[1].refresh_from_db()
+        self.assertEqual(self.projects[1].name, 'Renamed')
+        # The owner stays assigned
+        self.assertEqual(set(self.projects[1].assigned_users.all()), {self.alice, self.bob})
+
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('delete_project', args=[self.projects[2].id]))
+        self.assertRedirects(response, reverse('task_list'), fetch_redirect_response=False)
+        self.assertFalse(Project.objects.filter(id=self.projects[2].id).exists())
+        response = self.client.get(reverse('logout'))
+        self.assertRedirects(response, reverse('landing_page'), fetch_redirect_response=False)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    @override_settings(REQUEST_METRICS_HEADERS=True)
+    def test_metrics_headers(self):
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('task_list'))
+        self.assertGreater(int(response['X-DB-Queries']), 0)
+        self.assertEqual(response['X-DB-Duplicate-Queries'], '0')
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+
+    def test_metrics_line_is_logged_at_info(self):
+        self.client.force_login(self.alice)
+        with self.assertLogs('user.metrics', 'INFO') as logs:
+            self.client.get(reverse('task_list'))
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['view'], line['status']), ('task_list', 200))
+
+    @override_settings(VIEW_QUERY_BUDGETS={'task_list': {'queries': 1}})
+    def test_blown_budget_fails_in_strict_mode(self):
+        self.client.force_login(self.alice)
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('task_list'))
+
+    def test_fingerprints_ignore_in_list_length(self):
+        self.assertEqual(
+            fingerprint('SELECT 1 FROM t WHERE id IN (%s, %s, %s)'),
+            fingerprint('SELECT  1 FROM t\n WHERE id IN (%s)'),
+        )
+
+
+class BenchmarkTests(BaseTestCase):
+    def test_seed_is_reproducible_and_runner_reports_every_scenario(self):
+        summary = seed_dataset(users=5, projects=3, tasks=40, permission_density=1, seed=7)
+        self.assertEqual((summary['users'], summary['projects'], summary['tasks']), (6, 3, 40))
+        self.assertEqual(find_drift(list(Project.objects.values_list('id', flat=True))), [])
+        titles = list(Task.objects.order_by('id').values_list('title', 'priority', 'status')[:5])
+        with self.assertRaises(ValueError):
+            seed_dataset(seed=7)
+
+        report = run_benchmarks(iterations=2, warmup=0)
+        self.assertEqual(report['dataset']['tasks'], 40)
+        personas = {(row['scenario'], row['persona']) for row in report['results']}
+        self.assertIn(('task_list', 'superuser'), personas)
+        self.assertIn(('task_list', 'regular'), personas)
+        for row in report['results']:
+            self.assertTrue(all(status < 400 for status in row['status']), row)
+            self.assertLessEqual(row['p50_ms'], row['p95_ms'])
+        # Writes were rolled back
+        self.assertEqual(list(Task.objects.order_by('id').values_list('title', 'priority', 'status')[:5]), titles)
+        self.assertEqual(Task.objects.count(), 40)
+
+    def test_session_benchmark_reports_each_mode(self):
+        seed_dataset(users=3, projects=2, tasks=10, seed=1)
+        report = run_session_benchmark(page_views=2)
+        results = {row['mode']: row for row in report['results']}
+        self.assertEqual((results['db_stock']['login']['session_writes'], results['db']['login']['session_writes']), (2, 1))
+        self.assertEqual(results['db_stock']['page_view']['user_reads'], 1)
+        self.assertEqual(results['db']['page_view']['user_reads'], 0)
+        self.assertEqual(results['signed_cookies']['page_view']['session_reads'], 0)
+        self.assertEqual(results['signed_cookies']['login']['session_writes'], 0)
+
+
+class TaskRowCacheTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.owner = User.objects.create_user('owner', password='password')
+        cls.member = User.objects.create_user('member', password='password')
+        cls.project = Project.objects.create(name='Rows', user=cls.owner)
+        cls.project.assigned_users.add(cls.member)
+        cls.tasks = [Task.objects.create(title=f'row {i}', user=cls.owner, project=cls.project) for i in range(3)]
+
+    def rows(self, user):
+        self.client.force_login(user)
+        response = self.client.get(reverse('project_tasks', args=[self.project.id]))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_unchanged_rows_come_from_the_cache(self):
+        first = self.rows(self.member)
+        self.assertEqual([t.name for t in first.templates].count('task_row.html'), 3)
+        second = self.rows(self.member)
+        self.assertNotIn('task_row.html', [t.name for t in second.templates])
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(len(second.context['task_rows']), 3)
+
+        task = self.tasks[0]
+        task.title = 'renamed row'
+        task.save()
+        self.assertContains(self.rows(self.member), 'renamed row')
+
+    def test_rows_follow_the_viewer_permissions(self):
+        edit_link = f'href="{reverse("update_task", args=[self.tasks[1].id])}"'
+        self.assertNotContains(self.rows(self.member), edit_link)
+        TaskPermission.objects.create(user=self.member, task=self.tasks[1], permission_type='edit', assigned_by=self.admin)
+        self.assertContains(self.rows(self.member), edit_link)
+        response = self.rows(self.admin)
+        self.assertContains(response, reverse('manage_task_permissions', args=[self.tasks[1].id]))
+        self.assertNotContains(self.rows(self.member), 'Manage Permissions')
+
+    @override_settings(TASK_ROW_CACHE_TIMEOUT=0)
+    def test_row_cache_can_be_turned_off(self):
+        self.assertContains(self.rows(self.member), 'row 2')
+        self.assertFalse(caches['fragments']._cache)
+
+    def test_render_benchmark_reports_each_mode(self):
+        report = run_render_benchmark(tasks=30, iterations=1)
+        results = {row['mode']: row for row in report['results']}
+        self.assertEqual(set(results), {'uncached_loader', 'cached_loader', 'row_cache_cold', 'row_cache_warm'})
+        self.assertEqual(len({row['html_kb'] for row in results.values()}), 1)
+
+
+class ReminderTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        cls.member = User.objects.create_user('member', 'member@example.com', 'password')
+        cls.grantee = User.objects.create_user('grantee', 'grantee@example.com', 'password')
+        cls.silent = User.objects.create_user('silent', password='password')
+        cls.project = Project.objects.create(name='Launch', user=cls.owner)
+        cls.project.assigned_users.add(cls.member, cls.silent)
+        cls.today = date(2026, 3, 10)
+        day = timedelta(days=1)
+        cls.overdue = Task.objects.create(title='Overdue', user=cls.owner, project=cls.project, due_date=cls.today - day)
+        cls.soon = Task.objects.create(title='Soon', user=cls.owner, project=cls.project, due_date=cls.today + day,
+                                       status='In Progress')
+        Task.objects.create(title='Later', user=cls.owner, project=cls.project, due_date=cls.today + 10 * day)
+        Task.objects.create(title='Done', user=cls.owner, project=cls.project, due_date=cls.today - day, status='Completed')
+        cls.loose = Task.objects.create(title='Loose', user=cls.admin, due_date=cls.today)
+        TaskPermission.objects.create(user=cls.grantee, task=cls.loose, permission_type='view', assigned_by=cls.admin)
+
+    def outbox(self):
+        return {message.to[0]: message for message in mail.outbox}
+
+    def test_one_digest_per_recipient_per_day(self):
+        summary = send_reminders(self.today)
+        self.assertEqual(summary, {'tasks': 3, 'digests': 4, 'no_email': 1})
+        outbox = self.outbox()
+        self.assertEqual(set(outbox), {'owner@example.com', 'member@example.com', 'grantee@example.com', 'admin@example.com'})
+        self.assertEqual(outbox['owner@example.com'].subject, 'Task reminders: 1 overdue, 1 due soon')
+        body = outbox['member@example.com'].body
+        self.assertIn('Overdue (1):\n- Overdue', body)
+        self.assertIn('- Soon (due Mar 11, 2026, Medium, In Progress, Launch)', body)
+        self.assertNotIn('Later', body)
+        self.assertNotIn('Done', body)
+        self.assertIn('Loose', outbox['grantee@example.com'].body)
+        self.assertNotIn('Loose', body)
+
+        # Re-runs the same day send nothing; the next day starts over
+        mail.outbox.clear()
+        self.assertEqual(send_reminders(self.today)['digests'], 0)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(ReminderDigest.objects.filter(day=self.today).count(), 4)
+        self.assertEqual(send_reminders(self.today + timedelta(days=1))['digests'], 4)
+
+    def test_failed_send_releases_the_claims(self):
+        class Broken:
+            def send_messages(self, messages):
+                raise OSError('outbox unavailable')
+
+        with self.assertRaises(OSError):
+            send_reminders(self.today, connection=Broken())
+        self.assertFalse(ReminderDigest.objects.exists())
+        self.assertEqual(send_reminders(self.today)['digests'], 4)
+
+    def test_queries_do_not_grow_with_recipients(self):
+        with CaptureQueriesContext(connection) as few:
+            collect_digests(self.today, batch_size=2)
+        for i in range(20):
+            self.project.assigned_users.add(User.objects.create_user(f'extra{i}'))
+        with CaptureQueriesContext(connection) as many:
+            digests, task_count = collect_digests(self.today, batch_size=2)
+        self.assertEqual(len(many), len(few))
+        self.assertEqual((task_count, len(digests)), (3, 25))
+
+    def test_command(self):
+        out = StringIO()
+        call_command('send_reminders', '--date', self.today.isoformat(), '--dry-run', stdout=out)
+        self.assertIn('3 tasks due; 5 digests would be sent', out.getvalue())
+        self.assertEqual(mail.outbox, [])
+        call_command('send_reminders', '--date', self.today.isoformat(), stdout=out)
+        self.assertEqual(len(mail.outbox), 4)
+        with self.assertRaises(CommandError):
+            call_command('send_reminders', '--date', 'tomorrow')
+
+
+class ActivityLogTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.owner = User.objects.create_user('owner', password='password')
+        cls.outsider = User.objects.create_user('outsider', password='password')
+        cls.project = Project.objects.create(name='Audited', user=cls.owner)
+        cls.project.assigned_users.add(cls.owner)
+
+    def task_data(self, **overrides):
+        data = {'title': 'Audit me', 'description': 'x', 'due_date': '2026-05-01', 'priority': 'Medium',
+                'status': 'Pending', 'project': self.project.id}
+        data.update(overrides)
+        return data
+
+    def test_task_changes_are_buffered_then_written_with_diffs(self):
+        self.client.force_login(self.owner)
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('create_task'), self.task_data())
+            task = Task.objects.get(title='Audit me')
+            self.client.force_login(self.admin)
+            self.client.post(reverse('update_task', args=[task.id]), self.task_data(status='Completed'))
+            self.client.post(reverse('update_task', args=[task.id]), self.task_data(status='Completed'))
+            self.client.post(reverse('delete_task', args=[task.id]))
+        # Nothing was written during the requests; the unchanged save recorded nothing
+        self.assertFalse([q for q in queries if 'user_activityevent' in q['sql']])
+        self.assertEqual(len(activity.buffer), 3)
+
+        self.assertEqual(activity.flush(), 3)
+        events = list(ActivityEvent.objects.order_by('id').values_list('kind', 'action', 'object_id', 'changes', 'actor'))
+        self.assertEqual(events, [
+            ('task', 'created', task.id, {}, self.owner.id),
+            ('task', 'updated', task.id, {'status': ['Pending', 'Completed']}, self.admin.id),
+            ('task', 'deleted', task.id, {}, self.admin.id),
+        ])
+
+    def test_project_and_permission_changes(self):
+        member = User.objects.create_user('member', password='password')
+        task = Task.objects.create(title='Guarded', user=self.owner, project=self.project)
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('update_project', args=[self.project.id]), {
+                'name': 'Audited v2', 'description': '', 'assigned_users': [member.id],
+            })
+            self.client.post(reverse('manage_task_permissions', args=[task.id]), {'permission_type': 'edit'})
+            self.client.post(reverse('manage_task_permissions', args=[task.id]), {'permission_type': 'delete'})
+            self.client.post(reverse('manage_task_permissions', args=[task.id]), {'permission_type': ''})
+        activity.flush()
+        events = list(ActivityEvent.objects.order_by('id').values_list('kind', 'action', 'changes'))
+        self.assertEqual(events[0], ('project', 'updated', {
+            'name': ['Audited', 'Audited v2'], 'assigned_users': [[self.owner.id], sorted([member.id, self.owner.id])],
+        }))
+        self.assertEqual([(action, changes['permission_type']) for _, action, changes in events[1:]], [
+            ('created', [None, 'edit']), ('updated', ['edit', 'delete']), ('deleted', ['delete', None]),
+        ])
+
+    def test_owner_update_records_reassignment_as_ids(self):
+        project = Project.objects.create(name='Handed over', user=self.owner)
+        project.assigned_users.add(self.outsider)
+        self.client.force_login(self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('update_project', args=[project.id]), {'name': 'Handed over', 'description': ''})
+        self.assertRedirects(response, reverse('task_list'), fetch_redirect_response=False)
+        activity.flush()
+        self.assertEqual(
+            ActivityEvent.objects.get(kind='project').changes,
+            {'assigned_users': [[self.outsider.id], [self.owner.id]]},
+        )
+
+    def test_rolled_back_changes_are_not_logged(self):
+        task = Task.objects.create(title='Kept', user=self.owner, project=self.project)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                activity.record_task(self.owner, 'deleted', task)
+                transaction.set_rollback(True)
+        self.assertEqual(len(activity.buffer), 0)
+
+    @override_settings(ACTIVITY_FLUSH_SIZE=2, ACTIVITY_MAX_PENDING=3)
+    def test_size_threshold_and_memory_bound(self):
+        task = Task.objects.create(title='Busy', user=self.owner, project=self.project)
+        with self.captureOnCommitCallbacks(execute=True):
+            activity.record_task(self.owner, 'updated', task, {'priority': ['Low', 'High']})
+        self.assertEqual(ActivityEvent.objects.count(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            activity.record_task(self.owner, 'updated', task, {'priority': ['High', 'Low']})
+        self.assertEqual(ActivityEvent.objects.count(), 2)
+
+        buffer = activity.ActivityBuffer()
+        with override_settings(ACTIVITY_FLUSH_SIZE=100), self.assertLogs('user.activity', 'ERROR'):
+            for i in range(5):
+                buffer.add(ActivityEvent(kind='task', action='updated', object_id=i))
+        self.assertEqual(([event.object_id for event in buffer.events], buffer.dropped), ([2, 3, 4], 2))
+
+    def test_one_bad_event_does_not_hold_up_the_rest(self):
+        gone = User.objects.create_user('gone', password='password')
+        buffer = activity.ActivityBuffer()
+        for kind in ('task', None, 'project'):
+            buffer.add(ActivityEvent(kind=kind, action='created', object_id=1, actor_id=gone.id))
+        gone.delete()
+        with self.assertLogs('user.activity', 'ERROR'):
+            self.assertEqual(buffer.flush(), 2)
+        # The deleted actor's events are kept without one; the one breaking NOT NULL is dropped
+        self.assertEqual(list(ActivityEvent.objects.order_by('id').values_list('kind', 'actor')), [('task', None), ('project', None)])
+        self.assertEqual((len(buffer), buffer.dropped), (0, 1))
+
+    @override_settings(ACTIVITY_FLUSH_SECONDS=1)
+    def test_flusher_thread_is_optional_and_stops(self):
+        buffer = activity.ActivityBuffer()
+        flushed = threading.Event()
+        buffer.flush = lambda: flushed.set() or 0
+        buffer.add(ActivityEvent(kind='task', action='created', object_id=1))
+        self.assertIsNone(buffer.flusher)
+        with override_settings(ACTIVITY_FLUSH_THREAD=True):
+            buffer.add(ActivityEvent(kind='task', action='created', object_id=2))
+            flusher = buffer.flusher
+            self.assertTrue(flushed.wait(5))
+            buffer.stop()
+        self.assertFalse(flusher.is_alive())
+        self.assertIsNone(buffer.flusher)
+
+    def test_feed_pages_newest_first_for_project_viewers(self):
+        tasks = [Task.objects.create(title=f'feed {i}', user=self.owner, project=self.project) for i in range(5)]
+        with self.captureOnCommitCallbacks(execute=True):
+            for task in tasks:
+                activity.record_task(self.owner, 'created', task)
+        activity.flush()
+
+        self.client.force_login(self.owner)
+        url = reverse('project_activity', args=[self.project.id])
+        first = self.client.get(url, {'limit': 3}).json()
+        second = self.client.get(url, {'limit': 3, 'cursor': first['next_cursor']}).json()
+        self.assertIsNone(second['next_cursor'])
+        ids = [event['object_id'] for event in first['results'] + second['results']]
+        self.assertEqual(ids, [task.id for task in reversed(tasks)])
+        self.assertEqual(first['results'][0]['actor'], 'owner')
+        self.assertEqual(self.client.get(url, {'cursor': 'nope'}).status_code, 400)
+
+        self.client.force_login(self.outsider)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class SessionAuthTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('member', password='password')
+
+    def session_writes(self, metrics):
+        table = connection.ops.quote_name('django_session')
+        return sum(count for sql, count in metrics.fingerprints.items()
+                   if table in sql and not sql.startswith('SELECT'))
+
+    def test_login_writes_the_session_once_under_a_new_key(self):
+        session = self.client.session
+        session['theme'] = 'dark'
+        session.save()
+        old_key = session.session_key
+
+        with capture_metrics() as metrics:
+            response = self.client.post(reverse('login'), {'username': 'member', 'password': 'password'})
+        self.assertEqual(response.status_code, 302)
+        # Insert of the new session and delete of the old one; no early save under the new key
+        self.assertEqual(self.session_writes(metrics), 2)
+        session = self.client.session
+        self.assertNotEqual(session.session_key, old_key)
+        self.assertEqual(session['theme'], 'dark')
+        self.assertEqual(session['_auth_user_id'], str(self.user.id))
+        self.assertFalse(type(session)().exists(old_key))
+
+        self.client.logout()
+        with capture_metrics() as metrics:
+            response = self.client.post(reverse('register'), {
+                'username': 'newcomer', 'password1': 'a-long-Passw0rd', 'password2': 'a-long-Passw0rd',
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.session_writes(metrics), 1)
+        self.assertEqual(self.client.session['_auth_user_id'], str(User.objects.get(username='newcomer').id))
+
+    def test_user_cache_skips_the_user_query_until_the_user_changes(self):
+        self.client.post(reverse('login'), {'username': 'member', 'password': 'password'})
+        self.client.get(reverse('task_list'))
+        self.assertIsNotNone(cached_user(self.user.id))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse('task_list')).status_code, 200)
+        self.assertFalse([q for q in queries if '"auth_user"' in q['sql']])
+
+        # A password change evicts the copy, and the old session stops working at once
+        self.user.set_password('changed')
+        self.user.save()
+        self.assertIsNone(cached_user(self.user.id))
+        self.assertEqual(self.client.get(reverse('task_list')).status_code, 302)
+
+    @override_settings(AUTH_USER_CACHE_SECONDS=0)
+    def test_user_cache_can_be_turned_off(self):
+        self.client.post(reverse('login'), {'username': 'member', 'password': 'password'})
+        self.client.get(reverse('task_list'))
+        self.assertIsNone(cached_user(self.user.id))
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_sessions(self):
+        response = self.client.post(reverse('login'), {'username': 'member', 'password': 'password'})
+        self.assertEqual(response.status_code, 302)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('task_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in queries if '"django_session"' in q['sql']])
+        self.client.get(reverse('logout'))
+        self.assertEqual(self.client.get(reverse('task_list')).status_code, 302)
+
+
+@override_settings(ROOT_URLCONF=ASGI_URLCONF)
+class AsyncReadViewTests(BaseTestCase):
+    # The async read views, through the ASGI request handler
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.owner = User.objects.create_user('owner', password='password')
+        cls.member = User.objects.create_user('member', password='password')
+        cls.project = Project.objects.create(name='Async', user=cls.owner)
+        cls.project.assigned_users.add(cls.member)
+        cls.hidden = Project.objects.create(name='Hidden', user=cls.owner)
+        cls.tasks = [
+            Task.objects.create(title=f'task {i}', user=cls.owner, project=cls.project,
+                                due_date=date.today() + timedelta(days=i % 3))
+            for i in range(5)
+        ]
+        Task.objects.create(title='hidden', user=cls.owner, project=cls.hidden)
+        TaskPermission.objects.create(user=cls.member, task=cls.tasks[0], permission_type='edit', assigned_by=cls.admin)
+
+    async def test_views_show_what_the_user_can_see(self):
+        await self.async_client.aforce_login(self.member)
+        response = await self.async_client.get(reverse('task_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['name'] for p in response.context['display_projects']], ['Async'])
+        self.assertEqual(response.context['display_projects'][0]['task_count'], 5)
+        self.assertEqual(response.context['display_projects'][0]['stats']['total'], 5)
+
+        response = await self.async_client.get(reverse('project_tasks', args=[self.project.id]))
+        editable = {task.id for task in response.context['tasks'] if task.has_edit_permission}
+        self.assertEqual(editable, {self.tasks[0].id})
+        response = await self.async_client.get(reverse('project_tasks', args=[self.hidden.id]))
+        self.assertEqual(response.status_code, 404)
+
+        response = await self.async_client.get(reverse('task_feed'), {'limit': 3})
+        first = response.json()
+        response = await self.async_client.get(reverse('task_feed'), {'limit': 3, 'cursor': first['next_cursor']})
+        ids = [row['id'] for row in first['results'] + response.json()['results']]
+        expected = [task.id async for task in visible_tasks(self.member).order_by(*TASK_KEYSET_ORDERING)]
+        self.assertEqual(ids, expected)
+        response = await self.async_client.get(reverse('task_feed'), {'status': 'Nope'})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_conditional_get_and_login_required(self):
+        response = await self.async_client.get(reverse('task_list'))
+        self.assertEqual(response.status_code, 302)
+        await self.async_client.aforce_login(self.member)
+        for url in (reverse('task_list'), reverse('project_tasks', args=[self.project.id]), reverse('task_feed')):
+            with self.subTest(url):
+                etag = (await self.async_client.get(url))['ETag']
+                response = await self.async_client.get(url, headers={'if-none-match': etag})
+                self.assertEqual(response.status_code, 304)
+
+    @override_settings(REQUEST_METRICS_HEADERS=True)
+    async def test_metrics_are_recorded_in_async_mode(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(reverse('task_list'))
+        self.assertEqual(response['X-Task-List-Cache'], 'miss')
+        self.assertGreater(int(response['X-DB-Queries']), 0)
+        self.assertEqual(int(response['X-DB-Duplicate-Queries']), 0)
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_STRICT=True)
+class LoadTestTests(TransactionTestCase):
+    # Committed data: the load test's worker threads use their own connections
+
+    def setUp(self):
+        cache.clear()
+
+    def test_both_paths_serve_every_request(self):
+        seed_dataset(users=5, projects=3, tasks=40, permission_density=1, seed=3)
+        # Same concurrency on both sides; which one is faster is the command's
+        # output to read, not something a shared CI box can assert
+        report = run_load_test(requests=30, concurrency=5, wsgi_threads=5, db_latency_ms=5)
+        for handler in ('wsgi', 'asgi'):
+            self.assertEqual(report[handler]['requests'], 30)
+            self.assertEqual(report[handler]['status'], [200])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(BaseTestCase):
+    # Routing decisions only: no 'replica' alias exists in the test run
+
+    def route(self, method, url, cookies=None, write=False):
+        """
+        Run a stub view for ``url`` through ReplicaRoutingMiddleware and
+        return ``(read alias, response)``.
+        """
+        seen = {}
+
+        def view(request):
+            middleware.process_view(request, None, (), {})
+            seen['read'] = Task.objects.all().db
+            if write:
+                router.db_for_write(Task)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        request = getattr(RequestFactory(), method)(url)
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = resolve(url)
+        response = middleware(request)
+        return seen['read'], response
+
+    def test_only_listed_get_views_read_from_the_replica(self):
+        self.assertEqual(self.route('get', reverse('task_list'))[0], 'replica')
+        self.assertEqual(self.route('get', reverse('create_task'))[0], 'replica')
+        self.assertEqual(self.route('post', reverse('create_task'))[0], 'default')
+        # Deletes happen on GET, so they're not listed
+        self.assertEqual(self.route('get', reverse('delete_task', args=[1]))[0], 'default')
+        # Management commands, the shell and tests run outside any request
+        self.assertEqual(Task.objects.all().db, 'default')
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        _, response = self.route('get', reverse('task_list'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        _, response = self.route('post', reverse('create_task'), write=True)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+        read, _ = self.route('get', reverse('task_list'), cookies={PIN_COOKIE: '1'})
+        self.assertEqual(read, 'default')
+
+    def test_cached_task_list_pages_are_built_from_the_primary(self):
+        with routing_state() as state:
+            state.use_replica = True
+            data, _ = task_list_cache.get_or_build(User(pk=1), '1', lambda: Task.objects.all().db)
+            self.assertEqual(data, 'default')
+            self.assertEqual(Task.objects.all().db, 'replica')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_the_primary(self):
+        read, response = self.route('post', reverse('create_task'), write=True)
+        self.assertEqual(read, 'default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.route('get', reverse('task_list'))[0], 'default')
+
+
+class SearchTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='password')
+        cls.member = User.objects.create_user('member', password='password')
+        cls.project = Project.objects.create(name='Website relaunch', user=cls.owner)
+        cls.project.assigned_users.add(cls.member)
+        cls.private = Project.objects.create(name='Private', user=cls.owner)
+        cls.in_title = Task.objects.create(title='Deploy the invoices service', user=cls.owner, project=cls.project)
+        cls.in_description = Task.objects.create(
+            title='Cleanup', description='old invoices are piling up', user=cls.owner, project=cls.project
+        )
+        cls.hidden = Task.objects.create(title='Invoices audit', user=cls.owner, project=cls.private)
+
+    def search(self, user, query):
+        return SearchResults(visible_tasks(user), query)
+
+    def test_ranked_and_limited_to_visible_tasks(self):
+        results = self.search(self.member, 'invoice')
+        self.assertEqual(results.count(), 2)
+        self.assertEqual([task.id for task in results[0:10]], [self.in_title.id, self.in_description.id])
+        self.assertEqual(self.search(self.owner, 'invoice').count(), 3)
+        # Project names are searchable too; quotes and query syntax are just noise
+        self.assertEqual(self.search(self.member, 'relaunch').count(), 2)
+        self.assertEqual(self.search(self.member, '"relaunch*) -:(').count(), 2)
+        self.assertEqual(self.search(self.member, '  ').count(), 0)
+
+    def test_index_follows_saves_renames_and_bulk_writes(self):
+        self.in_description.title = 'Archive receipts'
+        self.in_description.save()
+        self.assertEqual([task.id for task in self.search(self.member, 'receipts')[0:10]], [self.in_description.id])
+        self.project.name = 'Storefront'
+        self.project.save()
+        self.assertEqual(self.search(self.member, 'storefront').count(), 2)
+        self.assertEqual(self.search(self.member, 'relaunch').count(), 0)
+        update_tasks([self.in_title], project_id=self.private.id)
+        self.assertEqual(self.search(self.owner, 'storefront').count(), 1)
+        delete_tasks([self.in_description])
+        self.assertEqual(self.search(self.owner, 'receipts').count(), 0)
+        self.hidden.delete()
+        self.assertEqual(self.search(self.owner, 'audit').count(), 0)
+
+    @skipUnless(sqlite_has_fts5(), 'needs the FTS5 index table')
+    def test_deleted_projects_leave_no_documents(self):
+        # Nothing cascades inside the index table; each delete path unindexes
+        def documents():
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE}')
+                return cursor.fetchone()[0]
+
+        self.assertEqual(documents(), 3)
+        self.private.delete()
+        self.assertEqual(documents(), 2)
+        purge_project(self.project)
+        self.assertEqual(documents(), 0)
+
+    def test_fallback_backend_matches_the_same_tasks(self):
+        backend = SearchBackend(connection)
+        tasks = visible_tasks(self.member).order_by()
+        self.assertEqual(backend.count(tasks, ['invoices']), 2)
+        self.assertEqual(backend.ranked_ids(tasks, ['invoices'], 0, 10)[0][0], self.in_title.id)
+
+    def test_endpoint_pages_results(self):
+        Task.objects.bulk_create(
+            Task(title=f'Invoice batch {i}', user=self.owner, project=self.project) for i in range(25)
+        )
+        self.assertEqual(self.search(self.owner, 'batch').count(), 0)
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.client.force_login(self.member)
+        data = self.client.get(reverse('task_search'), {'q': 'invoice', 'format': 'json'}).json()
+        self.assertEqual((data['count'], data['num_pages'], len(data['results'])), (27, 2, 20))
+        self.assertGreaterEqual(data['results'][0]['rank'], data['results'][-1]['rank'])
+        response = self.client.get(reverse('task_search'), {'q': 'invoice', 'page': 2})
+        self.assertEqual(len(response.context['tasks']), 7)
+        self.assertContains(response, 'Page 2 of 2')
+
+
+class ArchiveTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.owner = User.objects.create_user('owner', password='password')
+        cls.grantee = User.objects.create_user('grantee', password='password')
+        cls.project = Project.objects.create(name='Archive', user=cls.owner)
+        cls.old_done = [
+            Task.objects.create(title=f'Old done {i}', status='Completed', user=cls.owner, project=cls.project)
+            for i in range(5)
+        ]
+        cls.old_open = Task.objects.create(title='Old open', user=cls.owner, project=cls.project)
+        cls.recent_done = Task.objects.create(title='Recent done', status='Completed', user=cls.owner, project=cls.project)
+        TaskPermission.objects.create(user=cls.grantee, task=cls.old_done[0], permission_type='edit', assigned_by=cls.admin)
+        Task.objects.exclude(id=cls.recent_done.id).update(updated_date=archive_cutoff(100))
+
+    def test_moves_old_completed_tasks_with_their_permissions(self):
+        batches = []
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(archive_completed_tasks(days=90, batch_size=2, progress=batches.append), 5)
+        self.assertEqual(batches, [2, 4, 5])
+        # Each batch moves the stats by its own rows rather than recounting the project
+        self.assertFalse([query['sql'] for query in queries if 'COUNT(' in query['sql']])
+        self.assertEqual(find_drift([self.project.id]), [])
+        self.assertEqual(
+            set(Task.objects.values_list('title', flat=True)), {'Old open', 'Recent done'}
+        )
+        archived = ArchivedTask.objects.get(id=self.old_done[0].id)
+        self.assertEqual((archived.title, archived.status, archived.project_id), ('Old done 0', 'Completed', self.project.id))
+        permission = ArchivedTaskPermission.objects.get()
+        self.assertEqual((permission.user, permission.task_id), (self.grantee, archived.id))
+        self.assertFalse(TaskPermission.objects.exists())
+        self.assertEqual(ProjectStats.objects.get(project=self.project).completed_count, 1)
+        # Nothing left to do on a re-run
+        self.assertEqual(archive_completed_tasks(days=90), 0)
+
+    def test_batch_skips_tasks_changed_since_the_scan(self):
+        Task.objects.filter(id=self.old_done[1].id).update(status='Pending')
+        self.assertEqual(archive_batch([task.id for task in self.old_done[:2]], archive_cutoff(90)), 1)
+        self.assertTrue(Task.objects.filter(id=self.old_done[1].id).exists())
+
+    def test_archive_view_and_live_views(self):
+        call_command('archive_tasks', '--days', '90', stdout=StringIO())
+        self.client.force_login(self.grantee)
+        response = self.client.get(reverse('archived_tasks'))
+        self.assertEqual([task.title for task in response.context['tasks']], ['Old done 0'])
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('archived_tasks'), {'project': self.project.id})
+        self.assertEqual(response.context['page_obj'].paginator.count, 5)
+        feed = self.client.get(reverse('task_feed')).json()
+        self.assertEqual({task['title'] for task in feed['results']}, {'Old open', 'Recent done'})
+
+    def test_dry_run_moves_nothing(self):
+        out = StringIO()
+        call_command('archive_tasks', '--days', '90', '--dry-run', stdout=out)
+        self.assertIn('5 tasks would be archived', out.getvalue())
+        self.assertEqual(Task.objects.count(), 7)
+
+
+class ProjectPurgeTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='password')
+        cls.member = User.objects.create_user('member', password='password')
+        cls.project = Project.objects.create(name='Doomed', user=cls.owner)
+        cls.project.assigned_users.add(cls.member)
+        cls.other = Project.objects.create(name='Kept', user=cls.owner)
+        for i in range(7):
+            task = Task.objects.create(title=f'Doomed {i}', user=cls.owner, project=cls.project)
+            TaskPermission.objects.create(user=cls.member, task=task, permission_type='view', assigned_by=cls.owner)
+        cls.kept = Task.objects.create(title='Kept task', user=cls.owner, project=cls.other)
+        ArchivedTask.objects.create(
+            id=10_000, title='Old', description='', due_date=date.today(), priority='Low', status='Completed',
+            user=cls.owner, project=cls.project, created_date=archive_cutoff(200), updated_date=archive_cutoff(200),
+        )
+
+    def test_purge_deletes_everything_in_batches(self):
+        batches = []
+        self.assertEqual(purge_project(self.project, batch_size=3, progress=batches.append), 7)
+        self.assertEqual(batches, [3, 6, 7])
+        self.assertFalse(Project.objects.filter(id=self.project.id).exists())
+        self.assertEqual(list(Task.objects.all()), [self.kept])
+        self.assertFalse(TaskPermission.objects.exists())
+        self.assertFalse(ArchivedTask.objects.exists())
+        self.assertFalse(ProjectStats.objects.filter(project_id=self.project.id).exists())
+        self.assertEqual(SearchResults(Task.objects.all(), 'doomed').count(), 0)
+
+    def test_query_count_does_not_grow_with_the_project(self):
+        def purge_queries(task_count):
+            project = Project.objects.create(name=f'Sized {task_count}', user=self.owner)
+            tasks = Task.objects.bulk_create(
+                Task(title=f'Sized {i}', user=self.owner, project=project) for i in range(task_count)
+            )
+            TaskPermission.objects.bulk_create(
+                TaskPermission(user=self.member, task=task, assigned_by=self.owner) for task in tasks
+            )
+            with CaptureQueriesContext(connection) as queries:
+                purge_project(project)
+            return len(queries)
+
+        # Sizes within one batch and one SQLite bulk insert
+        self.assertEqual(purge_queries(2), purge_queries(40))
+
+    def test_pending_project_is_hidden_until_purged(self):
+        self.client.force_login(self.member)
+        self.client.get(reverse('task_list'))
+        mark_pending_deletion(self.project)
+        response = self.client.get(reverse('task_list'))
+        self.assertEqual(response['X-Task-List-Cache'], 'miss')
+        self.assertEqual([project['name'] for project in response.context['display_projects']], [])
+        self.assertEqual(self.client.get(reverse('project_tasks', args=[self.project.id])).status_code, 404)
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(reverse('delete_project', args=[self.project.id])).status_code, 404)
+        # Its tasks are gone from every task path too, not just the project views
+        doomed = Task.objects.filter(project=self.project).first()
+        self.assertEqual(self.client.get(reverse('update_task', args=[doomed.id])).status_code, 404)
+        self.assertEqual(
+            [task['title'] for task in self.client.get(reverse('task_feed')).json()['results']], ['Kept task'],
+        )
+        self.assertEqual(list(visible_tasks(self.member)), [])
+        self.assertEqual(collect_digests(date.today(), days=30)[1], 1)
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse('bulk_task_permissions'),
+            {'project': self.project.id, 'user_ids': [admin.id], 'permission_type': 'edit'},
+            HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.json()['count'], 0)
+        call_command('purge_projects', '--pending', stdout=StringIO())
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_view_deletes_small_projects_inline(self):
+        self.client.force_login(self.owner)
+        self.client.get(reverse('delete_project', args=[self.project.id]))
+        self.assertFalse(Project.objects.filter(id=self.project.id).exists())
+
+    @override_settings(PROJECT_PURGE_BACKGROUND_TASKS=5)
+    def test_view_hands_large_projects_to_a_thread(self):
+        self.client.force_login(self.owner)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.get(reverse('delete_project', args=[self.project.id]))
+        self.assertEqual(len(callbacks), 1)
+        self.assertTrue(Project.objects.get(id=self.project.id).pending_deletion)
+
+
+class BackgroundPurgeTests(TransactionTestCase):
+    # Committed data: the purge thread uses its own connection
+
+    @override_settings(PROJECT_PURGE_BACKGROUND_TASKS=1)
+    def test_background_purge_finishes(self):
+        owner = User.objects.create_user('owner', password='password')
+        project = Project.objects.create(name='Doomed', user=owner)
+        Task.objects.bulk_create(Task(title=f'Task {i}', user=owner, project=project) for i in range(20))
+        self.client.force_login(owner)
+        self.client.get(reverse('delete_project', args=[project.id]))
+        deadline = time.monotonic() + 10
+        while Project.objects.filter(id=project.id).exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertFalse(Project.objects.filter(id=project.id).exists())
+        self.assertFalse(Task.objects.exists())
+
+
+class AutocompleteTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.owner = User.objects.create_user('owner', password='password')
+        User.objects.bulk_create(User(username=f'picker{i:02}') for i in range(30))
+        cls.projects = Project.objects.bulk_create(
+            Project(name=f'{prefix} {i:02}', user=cls.owner) for prefix in ('Apollo', 'Gemini') for i in range(30)
+        )
+        cls.hidden = Project.objects.create(name='Apollo hidden', user=cls.admin)
+        cls.task = Task.objects.create(title='Picked', user=cls.owner, project=cls.projects[42])
+        TaskPermission.objects.create(user=cls.owner, task=cls.task, permission_type='edit', assigned_by=cls.admin)
+
+    def results(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        return [result['text'] for result in response.json()['results']]
+
+    def test_project_prefix_search_is_limited_and_scoped(self):
+        self.client.force_login(self.owner)
+        self.assertEqual(self.results('project_autocomplete', q='apollo'), [f'Apollo {i:02}' for i in range(20)])
+        self.assertEqual(self.results('project_autocomplete', q='gemini 1', limit=3), ['Gemini 10', 'Gemini 11', 'Gemini 12'])
+        self.assertEqual(self.results('project_autocomplete', q='pollo'), [])
+        self.assertEqual(len(self.results('project_autocomplete', limit=500)), 50)
+        self.assertEqual(self.client.get(reverse('project_autocomplete'), {'limit': 'x'}).status_code, 400)
+        self.client.force_login(self.admin)
+        self.assertIn('Apollo hidden', self.results('project_autocomplete', q='apollo h'))
+
+    def test_user_search_is_admin_only(self):
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(reverse('user_autocomplete')).status_code, 302)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.results('user_autocomplete', q='PICKER2', limit=3), ['picker20', 'picker21', 'picker22'])
+
+    def test_forms_render_only_the_selected_values(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('update_task', args=[self.task.id]))
+        options = re.findall(r'<option value="(\d*)"( selected)?>', response.content.decode())
+        self.assertEqual(options, [('', ''), (str(self.projects[42].id), ' selected')])
+        self.assertContains(response, f'data-autocomplete-url="{reverse("project_autocomplete")}"')
+        response = self.client.post(reverse('update_task', args=[self.task.id]), {
+            'title': 'Picked', 'description': 'x', 'due_date': date.today(), 'priority': 'Low', 'status': 'Pending',
+            'project': self.hidden.id,
+        })
+        self.assertFormError(response.context['form'], 'project', 'Select a valid choice. That choice is not one of the available choices.')
+
+        self.client.force_login(self.admin)
+        self.projects[0].assigned_users.add(self.owner)
+        response = self.client.get(reverse('update_project', args=[self.projects[0].id]))
+        self.assertEqual(re.findall(r'<option value="\d+" selected>(\w+)</option>', response.content.decode()), ['owner'])
+        response = self.client.get(reverse('bulk_task_permissions'))
+        self.assertNotContains(response, 'picker00')
+
+
+@override_settings(SYNC_COMMIT_GRACE_SECONDS=0)
+class SyncTests(BaseTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.owner = User.objects.create_user('owner', password='password')
+        cls.member = User.objects.create_user('member', password='password')
+        cls.grantee = User.objects.create_user('grantee', password='password')
+        cls.project = Project.objects.create(name='Shared', user=cls.owner)
+        cls.project.assigned_users.add(cls.member)
+        cls.other = Project.objects.create(name='Other', user=cls.owner)
+        cls.tasks = [Task.objects.create(title=f'Shared {i}', user=cls.owner, project=cls.project) for i in range(4)]
+        cls.own = Task.objects.create(title='Member owned', user=cls.member, project=cls.project)
+        cls.private = Task.objects.create(title='Private', user=cls.owner, project=cls.other)
+        cls.grant = TaskPermission.objects.create(user=cls.grantee, task=cls.private, permission_type='edit', assigned_by=cls.admin)
+
+    def sync(self, user, token=None, limit=None):
+        # Follow the tokens through a whole round; returns the merged pages and the next round's token
+        self.client.force_login(user)
+        merged = {'projects': set(), 'tasks': set(), 'permissions': set(), 'removed': {'projects': set(), 'tasks': set(), 'permissions': set()}}
+        pages = 0
+        while True:
+            params = {'token': token} if token else {}
+            if limit:
+                params['limit'] = limit
+            data = self.client.get(reverse('task_sync'), params).json()
+            pages += 1
+            merged['projects'] |= {project['name'] for project in data['projects']}
+            merged['tasks'] |= {task['title'] for task in data['tasks']}
+            merged['permissions'] |= {(permission['task'], permission['permission_type']) for permission in data['permissions']}
+            for kind, ids in data['removed'].items():
+                merged['removed'][kind] |= set(ids)
+            token = data['sync_token']
+            if not data['has_more']:
+                return merged, token, pages
+
+    def test_full_sync_pages_through_what_the_user_sees(self):
+        merged, _, pages = self.sync(self.member, limit=2)
+        self.assertEqual(merged['projects'], {'Shared'})
+        self.assertEqual(merged['tasks'], {'Shared 0', 'Shared 1', 'Shared 2', 'Shared 3', 'Member owned'})
+        self.assertEqual(pages, 4)
+        self.assertEqual(self.sync(self.member)[0], merged)
+        merged, _, _ = self.sync(self.grantee)
+        self.assertEqual((merged['projects'], merged['tasks']), (set(), {'Private'}))
+        self.assertEqual(merged['permissions'], {(self.private.id, 'edit')})
+
+    def test_incremental_sync_returns_changes_and_removals(self):
+        _, token, _ = self.sync(self.member)
+        self.tasks[0].title = 'Renamed'
+        self.tasks[0].save()
+        Task.objects.create(title='Fresh', user=self.owner, project=self.project)
+        deleted_id = self.tasks[1].id
+        self.tasks[1].delete()
+        update_tasks([self.tasks[2]], project_id=self.other.id)
+        merged, token, _ = self.sync(self.member, token)
+        self.assertEqual(merged['tasks'], {'Renamed', 'Fresh'})
+        self.assertEqual(merged['removed']['tasks'], {deleted_id, self.tasks[2].id})
+        # Nothing new: an empty round
+        merged, _, _ = self.sync(self.member, token)
+        self.assertEqual((merged['tasks'], merged['removed']['tasks']), (set(), set()))
+
+    def test_visibility_changes(self):
+        _, member_token, _ = self.sync(self.member)
+        _, grantee_token, _ = self.sync(self.grantee)
+        self.project.assigned_users.remove(self.member)
+        self.other.assigned_users.add(self.member)
+        self.grant.delete()
+        merged, _, _ = self.sync(self.member, member_token)
+        self.assertEqual(merged['removed']['projects'], {self.project.id})
+        # Gained project with its old tasks; the member's own task in the lost project is re-sent
+        self.assertEqual(merged['projects'], {'Other'})
+        self.assertEqual(merged['tasks'], {'Private', 'Member owned'})
+        merged, _, _ = self.sync(self.grantee, grantee_token)
+        self.assertEqual(merged['removed']['tasks'], {self.private.id})
+        self.assertEqual(merged['removed']['permissions'], {self.private.id})
+
+    def test_tasks_kept_from_a_lost_project_come_in_bounded_pages(self):
+        for i in range(5):
+            Task.objects.create(title=f'Kept {i}', user=self.member, project=self.project)
+        _, token, _ = self.sync(self.member)
+        self.project.assigned_users.remove(self.member)
+        self.client.force_login(self.member)
+        seen, project_removed = [], False
+        while True:
+            data = self.client.get(reverse('task_sync'), {'token': token, 'limit': 2}).json()
+            self.assertLessEqual(len(data['tasks']) + len(data['removed']['projects']), 2)
+            project_removed = project_removed or bool(data['removed']['projects'])
+            # The project's removal reaches the client before any of its re-sent tasks
+            self.assertTrue(project_removed or not data['tasks'])
+            seen += [task['title'] for task in data['tasks']]
+            token = data['sync_token']
+            if not data['has_more']:
+                break
+        self.assertEqual(sorted(seen), ['Kept 0', 'Kept 1', 'Kept 2', 'Kept 3', 'Kept 4', 'Member owned'])
+
+    def test_revoked_grant_on_a_task_still_visible_is_not_a_removal(self):
+        TaskPermission.objects.create(user=self.member, task=self.tasks[0], permission_type='edit', assigned_by=self.admin)
+        _, token, _ = self.sync(self.member)
+        TaskPermission.objects.filter(user=self.member).delete()
+        merged, _, _ = self.sync(self.member, token)
+        self.assertEqual(merged['removed'], {'projects': set(), 'tasks': set(), 'permissions': {self.tasks[0].id}})
+
+    def test_deleted_project_reaches_members_and_grantees(self):
+        TaskPermission.objects.create(user=self.grantee, task=self.tasks[0], permission_type='view', assigned_by=self.admin)
+        _, member_token, _ = self.sync(self.member)
+        _, grantee_token, _ = self.sync(self.grantee)
+        project_id = self.project.id
+        purge_project(self.project)
+        merged, _, _ = self.sync(self.member, member_token)
+        self.assertEqual(merged['removed']['projects'], {project_id})
+        merged, _, _ = self.sync(self.grantee, grantee_token)
+        self.assertEqual(merged['removed']['tasks'], {self.tasks[0].id})
+
+    def test_bad_tokens(self):
+        self.client.force_login(self.member)
+        self.assertEqual(self.client.get(reverse('task_sync'), {'token': 'nope'}).status_code, 400)
+        expired = encode_token({'since': archive_cutoff(60).isoformat(), 'until': None, 'phase': 0, 'after': None})
+        self.assertEqual(self.client.get(reverse('task_sync'), {'token': expired}).status_code, 410)
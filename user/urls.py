@@ -1,12 +1,17 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# task_list, project_tasks and task_feed have async versions for ASGI deployments
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
 
 urlpatterns = [
     path('', views.landing_page, name='landing_page'),
     path('register/', views.register, name='register'),
     path('login/', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
-    path('tasks/', views.task_list, name='task_list'),  # Single route for both users and admins
+    path('tasks/', read_views.task_list, name='task_list'),  # Single route for both users and admins
+    path('tasks/project/<int:project_id>/', read_views.project_tasks, name='project_tasks'),  # Lazily loaded accordion panel
     
     # Project URLs
     path('projects/create/', views.create_project, name='create_project'),
@@ -18,8 +23,22 @@ urlpatterns = [
     path('tasks/create/<int:project_id>/', views.create_task, name='create_task'),
     path('tasks/<int:task_id>/update/', views.update_task, name='update_task'),
     path('tasks/<int:task_id>/delete/', views.delete_task, name='delete_task'),
+    path('tasks/bulk/', views.bulk_task_action, name='bulk_task_action'),
     path('tasks/<int:task_id>/set_permission/', views.set_task_permission, name='set_task_permission'),
     
+    # JSON feed polled by integrations
+    path('api/tasks/', read_views.task_feed, name='task_feed'),
+    path('api/sync/', views.task_sync, name='task_sync'),
+    path('api/projects/<int:project_id>/activity/', views.project_activity, name='project_activity'),
+    path('tasks/export/', views.export_tasks, name='export_tasks'),
+    path('tasks/search/', views.search_tasks, name='task_search'),
+    path('tasks/archive/', views.archived_tasks, name='archived_tasks'),
+
+    # Pickers in the project, task and bulk permission forms
+    path('autocomplete/projects/', views.project_autocomplete, name='project_autocomplete'),
+    path('autocomplete/users/', views.user_autocomplete, name='user_autocomplete'),
+
     # Permission management
     path('tasks/<int:task_id>/permissions/', views.manage_task_permissions, name='manage_task_permissions'),
+    path('tasks/permissions/bulk/', views.bulk_task_permissions, name='bulk_task_permissions'),
 ]
\ No newline at end of file
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
@@ -5,27 +6,33 @@ from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib import messages
 from django.contrib.auth.models import User
 from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_POST
 from django.urls import reverse
+from django.core.paginator import Paginator
+from django.db.models import Count
 from .models import Task, Project, TaskPermission
 from .forms import TaskForm, ProjectForm
+from .permissions import PERMISSION_LEVELS, PermissionResolver, live_tasks, visible_tasks, visible_projects
+from .pagination import InvalidCursor, keyset_page
+from . import cache as task_list_cache
+from .conditional import task_etag, task_last_modified
+from .stats import stats_for_projects
+from .export import EXPORT_FORMATS, export_rows
+from .search import SearchResults
+from . import activity
+from .archive import visible_archived_tasks
+from .fragments import render_task_rows
+from .autocomplete import prefix_search
+from .sync import SYNC_MAX_PAGE_SIZE, SYNC_PAGE_SIZE, ExpiredSyncToken, InvalidSyncToken, sync_page
+from .bulk import (
+    BULK_ACTION_LIMIT, BULK_OPERATIONS, delete_tasks, grant_permissions, partition_tasks, purge_in_background,
+    purge_project, revoke_permissions, update_tasks,
+)
 from datetime import date
 
 def check_task_permission(user, task, required_permission='view'):
-    if user.is_superuser:
-        return True
-    try:
-        permission = TaskPermission.objects.get(user=user, task=task)
-        if required_permission == 'view':
-            return permission.permission_type in ['view', 'edit', 'delete']
-        elif required_permission == 'edit':
-            return permission.permission_type in ['edit', 'delete']
-        elif required_permission == 'delete':
-            return permission.permission_type == 'delete'
-    except TaskPermission.DoesNotExist:
-        if task.user == user and required_permission == 'view':
-            return True
-        return False
-    return False
+    return PermissionResolver(user, task_ids=[task.id]).has_permission(task, required_permission)
 
 def is_admin(user):
     return user.is_superuser
@@ -38,7 +45,8 @@ def register(request):
         form = UserCreationForm(request.POST)
         if form.is_valid():
             user = form.save()
-            login(request, user)
+            # Two backends are configured; new sessions go to the cached one
+            login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
             messages.success(request, 'Registration successful!')
             return redirect('task_list')
     else:
@@ -62,84 +70,363 @@ def user_logout(request):
     messages.info(request, 'You have been logged out.')
     return redirect('landing_page')
 
+PROJECTS_PER_PAGE = 20
+
+def task_counts_query(tasks, project_ids):
+    # order_by() drops Task.Meta.ordering so it doesn't leak into the GROUP BY
+    return (
+        tasks.filter(project_id__in=project_ids)
+        .order_by()
+        .values('project_id')
+        .annotate(count=Count('id'))
+        .values_list('project_id', 'count')
+    )
+
+def count_tasks_by_project(tasks, project_ids):
+    return dict(task_counts_query(tasks, project_ids))
+
+def build_display_project(project, assigned_to, task_counts, project_stats):
+    return {
+        'id': project.id,
+        'name': project.name,
+        'original_project': project,
+        'creator': project.user.username,
+        'assigned_to': assigned_to,
+        'task_count': task_counts.get(project.id, 0),
+        'stats': project_stats.get(project.id),
+    }
+
+def page_summary(page):
+    # Plain-data stand-in for a Page, so it can live in the cache
+    return {
+        'number': page.number,
+        'num_pages': page.paginator.num_pages,
+        'has_other_pages': page.has_other_pages(),
+        'has_previous': page.has_previous(),
+        'has_next': page.has_next(),
+        'previous_page_number': page.number - 1,
+        'next_page_number': page.number + 1,
+    }
+
+def task_list_projects(user):
+    projects = visible_projects(user).select_related('user').order_by('name', 'id')
+    if user.is_superuser:
+        projects = projects.prefetch_related('assigned_users')
+    return projects
+
+def assemble_task_list(user, page, page_projects, task_counts, project_stats):
+    display_projects = []
+    for project in page_projects:
+        if user.is_superuser:
+            # Use the prefetched users; .exists() would issue a query per project
+            assigned_users = project.assigned_users.all()
+            for assigned_user in assigned_users:
+                display_projects.append(
+                    build_display_project(project, assigned_user.username, task_counts, project_stats)
+                )
+            if not assigned_users:
+                display_projects.append(
+                    build_display_project(project, project.user.username, task_counts, project_stats)
+                )
+        else:
+            # Every project here is either owned by or assigned to the requesting user
+            display_projects.append(
+                build_display_project(project, user.username, task_counts, project_stats)
+            )
+    return {'display_projects': display_projects, 'page_obj': page_summary(page)}
+
+def build_task_list(user, page_number):
+    page = Paginator(task_list_projects(user), PROJECTS_PER_PAGE).get_page(page_number)
+    page_projects = list(page)
+    # Only headers and counts are rendered here; each panel loads its tasks from project_tasks
+    project_ids = [project.id for project in page_projects]
+    task_counts = count_tasks_by_project(visible_tasks(user), project_ids)
+    project_stats = stats_for_projects(project_ids)
+    return assemble_task_list(user, page, page_projects, task_counts, project_stats)
+
 @login_required
+@condition(etag_func=task_etag, last_modified_func=task_last_modified)
 def task_list(request):
-    if request.user.is_superuser:
-        tasks = Task.objects.all().select_related('project', 'user', 'project__user').order_by('project')
-        for task in tasks:
-            task.has_edit_permission = True
-            task.has_delete_permission = True
-        projects = Project.objects.all().prefetch_related('assigned_users', 'user')
-        display_projects = []
-        for project in projects:
-            for assigned_user in project.assigned_users.all():
-                display_project = {
-                    'id': project.id,
-                    'name': project.name,
-                    'original_project': project,
-                    'creator': project.user.username,
-                    'assigned_to': assigned_user.username,
-                    'tasks': [task for task in tasks if task.project_id == project.id]
-                }
-                display_projects.append(display_project)
-            if not project.assigned_users.exists():
-                display_project = {
-                    'id': project.id,
-                    'name': project.name,
-                    'original_project': project,
-                    'creator': project.user.username,
-                    'assigned_to': project.user.username,
-                    'tasks': [task for task in tasks if task.project_id == project.id]
-                }
-                display_projects.append(display_project)
-    else:
-        own_tasks = Task.objects.filter(user=request.user)
-        shared_tasks = Task.objects.filter(taskpermission__user=request.user)
-        assigned_project_tasks = Task.objects.filter(project__assigned_users=request.user)
-        tasks = (own_tasks | shared_tasks | assigned_project_tasks).distinct().select_related('project', 'user', 'project__user').order_by('project')
-        for task in tasks:
-            task.has_edit_permission = check_task_permission(request.user, task, 'edit')
-            task.has_delete_permission = check_task_permission(request.user, task, 'delete')
-        user_projects = Project.objects.filter(assigned_users=request.user).select_related('user').prefetch_related('assigned_users')
-        owned_projects = Project.objects.filter(user=request.user).select_related('user').prefetch_related('assigned_users')
-        all_user_projects = (user_projects | owned_projects).distinct()
-        display_projects = []
-        for project in all_user_projects:
-            if project.user == request.user and request.user in project.assigned_users.all():
-                display_project = {
-                    'id': project.id,
-                    'name': project.name,
-                    'original_project': project,
-                    'creator': project.user.username,
-                    'assigned_to': request.user.username,
-                    'tasks': [task for task in tasks if task.project_id == project.id]
-                }
-                display_projects.append(display_project)
-            elif request.user in project.assigned_users.all():
-                display_project = {
-                    'id': project.id,
-                    'name': project.name,
-                    'original_project': project,
-                    'creator': project.user.username,
-                    'assigned_to': request.user.username,
-                    'tasks': [task for task in tasks if task.project_id == project.id]
-                }
-                display_projects.append(display_project)
-            elif project.user == request.user:
-                display_project = {
-                    'id': project.id,
-                    'name': project.name,
-                    'original_project': project,
-                    'creator': project.user.username,
-                    'assigned_to': project.user.username,
-                    'tasks': [task for task in tasks if task.project_id == project.id]
-                }
-                display_projects.append(display_project)
-
-    return render(request, 'task_list.html', {
-        'display_projects': display_projects,
+    page_number = request.GET.get('page', '1')
+    if not page_number.isdigit():
+        page_number = '1'
+    data, hit = task_list_cache.get_or_build(
+        request.user, page_number, lambda: build_task_list(request.user, page_number)
+    )
+    response = render(request, 'task_list.html', {
+        **data,
         'is_admin': request.user.is_superuser,
     })
+    response['X-Task-List-Cache'] = 'hit' if hit else 'miss'
+    return response
+
+@login_required
+@condition(etag_func=task_etag, last_modified_func=task_last_modified)
+def project_tasks(request, project_id):
+    project = get_object_or_404(visible_projects(request.user), id=project_id)
+    tasks = visible_tasks(request.user).filter(project=project).select_related('user')
+    PermissionResolver(request.user, task_ids=tasks.values('id')).annotate(tasks)
+    return render_project_tasks(request, project, list(tasks))
+
+def render_project_tasks(request, project, tasks):
+    return render(request, 'project_tasks.html', {
+        'project': project,
+        'tasks': tasks,
+        'task_rows': render_task_rows(tasks, request.user),
+    })
+
+FEED_PAGE_SIZE = 50
+FEED_MAX_PAGE_SIZE = 200
+
+def serialize_task(task):
+    return {
+        'id': task.id,
+        'title': task.title,
+        'description': task.description,
+        'due_date': task.due_date.isoformat(),
+        'priority': task.priority,
+        'status': task.status,
+        'project': task.project_id,
+        'project_name': task.project.name if task.project else None,
+        'owner': task.user.username,
+        'created_date': task.created_date.isoformat(),
+        'updated_date': task.updated_date.isoformat(),
+    }
+
+def filter_feed(tasks, params):
+    """
+    Apply task_feed's query parameters: ``(tasks, limit, error)`` where
+    ``error`` is a message for a 400 response, or None.
+    """
+    project_id = params.get('project')
+    status = params.get('status')
+    priority = params.get('priority')
+    if project_id:
+        if not project_id.isdigit():
+            return tasks, None, 'Invalid project.'
+        tasks = tasks.filter(project_id=project_id)
+    if status:
+        if status not in dict(Task.STATUS_CHOICES):
+            return tasks, None, 'Invalid status.'
+        tasks = tasks.filter(status=status)
+    if priority:
+        if priority not in dict(Task.PRIORITY_CHOICES):
+            return tasks, None, 'Invalid priority.'
+        tasks = tasks.filter(priority=priority)
+    try:
+        limit = min(max(int(params.get('limit', FEED_PAGE_SIZE)), 1), FEED_MAX_PAGE_SIZE)
+    except ValueError:
+        return tasks, None, 'Invalid limit.'
+    return tasks, limit, None
+
+@login_required
+@condition(etag_func=task_etag, last_modified_func=task_last_modified)
+def task_feed(request):
+    tasks, limit, error = filter_feed(
+        visible_tasks(request.user).select_related('project', 'user'), request.GET
+    )
+    if error:
+        return JsonResponse({'error': error}, status=400)
+    try:
+        page, next_cursor = keyset_page(tasks, request.GET.get('cursor'), limit)
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'results': [serialize_task(task) for task in page],
+        'next_cursor': next_cursor,
+    })
+
+@login_required
+def project_activity(request, project_id):
+    # Audit trail of a project the user can see, newest first; see user.activity
+    project = get_object_or_404(visible_projects(request.user), id=project_id)
+    try:
+        limit = min(max(int(request.GET.get('limit', activity.ACTIVITY_PAGE_SIZE)), 1), activity.ACTIVITY_MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit.'}, status=400)
+    try:
+        events, next_cursor = activity.project_activity_page(project.id, request.GET.get('cursor'), limit)
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'results': [activity.serialize_event(event) for event in events],
+        'next_cursor': next_cursor,
+    })
+
+@login_required
+def task_sync(request):
+    """
+    Changes since ``token`` for clients keeping a local copy; see user.sync.
+    Without a token this is a full sync. Follow ``sync_token`` while
+    ``has_more``, and keep the last one for the next sync.
+    """
+    try:
+        limit = min(max(int(request.GET.get('limit', SYNC_PAGE_SIZE)), 1), SYNC_MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit.'}, status=400)
+    try:
+        page = sync_page(request.user, request.GET.get('token'), limit)
+    except ExpiredSyncToken as e:
+        return JsonResponse({'error': str(e)}, status=410)
+    except InvalidSyncToken as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'projects': [
+            {
+                'id': project.id,
+                'name': project.name,
+                'description': project.description,
+                'owner': project.user.username,
+                'updated_date': project.updated_date.isoformat(),
+            }
+            for project in page.projects
+        ],
+        'tasks': [serialize_task(task) for task in page.tasks],
+        'permissions': [
+            {'task': permission.task_id, 'permission_type': permission.permission_type}
+            for permission in page.permissions
+        ],
+        'removed': page.removed,
+        'sync_token': page.token,
+        'has_more': page.has_more,
+    })
+
+SEARCH_PAGE_SIZE = 20
+
+@login_required
+def search_tasks(request):
+    query = request.GET.get('q', '').strip()
+    page = Paginator(SearchResults(visible_tasks(request.user), query), SEARCH_PAGE_SIZE).get_page(
+        request.GET.get('page')
+    )
+    tasks = page.object_list
+    if request.GET.get('format') == 'json' or wants_json(request):
+        return JsonResponse({
+            'query': query,
+            'count': page.paginator.count,
+            'page': page.number,
+            'num_pages': page.paginator.num_pages,
+            'results': [{**serialize_task(task), 'rank': task.search_rank} for task in tasks],
+        })
+    PermissionResolver(request.user, task_ids=[task.id for task in tasks]).annotate(tasks)
+    return render(request, 'task_search.html', {
+        'query': query,
+        'page_obj': page,
+        'tasks': tasks,
+    })
+
+ARCHIVE_PAGE_SIZE = 50
+
+@login_required
+def archived_tasks(request):
+    # Read-only list of archived tasks; the other views only ever read the live Task table
+    tasks = visible_archived_tasks(request.user).select_related('project', 'user')
+    project_id = request.GET.get('project', '')
+    if project_id.isdigit():
+        tasks = tasks.filter(project_id=project_id)
+    page = Paginator(tasks, ARCHIVE_PAGE_SIZE).get_page(request.GET.get('page'))
+    return render(request, 'archived_tasks.html', {
+        'page_obj': page,
+        'tasks': page.object_list,
+        'project_id': project_id if project_id.isdigit() else '',
+    })
+
+AUTOCOMPLETE_LIMIT = 20
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+def autocomplete_results(request, queryset, field):
+    """
+    ``{'results': [{'id', 'text'}]}`` for the rows whose ``field`` starts with
+    ``q`` (case-insensitive), in lowered ``field`` order. prefix_search seeks
+    the lowered-``field`` index, and the LIMIT stops after the first matches.
+    """
+    try:
+        limit = min(max(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), 1), AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer.'}, status=400)
+    rows = prefix_search(queryset, field, request.GET.get('q', '').strip())
+    return JsonResponse({
+        'results': [{'id': row_id, 'text': text} for row_id, text in rows.values_list('id', field)[:limit]],
+    })
+
+@login_required
+def project_autocomplete(request):
+    return autocomplete_results(request, visible_projects(request.user), 'name')
+
+@login_required
+@user_passes_test(is_admin)
+def user_autocomplete(request):
+    # Project assignment and bulk permissions are admin-only, and so is the user list
+    return autocomplete_results(request, User.objects.filter(is_active=True), 'username')
+
+@login_required
+def export_tasks(request):
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': 'Invalid format.'}, status=400)
+    lines, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(lines(export_rows(request.user)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="tasks.{export_format}"'
+    return response
+
+def wants_json(request):
+    return (
+        request.headers.get('x-requested-with') == 'XMLHttpRequest'
+        or 'application/json' in request.headers.get('accept', '')
+    )
+
+@login_required
+@require_POST
+def bulk_task_action(request):
+    def fail(message):
+        if wants_json(request):
+            return JsonResponse({'error': message}, status=400)
+        messages.error(request, message)
+        return redirect('task_list')
+
+    operation = request.POST.get('operation', '')
+    value = request.POST.get('value', '')
+    if operation not in BULK_OPERATIONS:
+        return fail('Invalid operation.')
+    try:
+        task_ids = {int(task_id) for task_id in request.POST.getlist('task_ids')}
+    except ValueError:
+        return fail('Invalid task ID.')
+    if not task_ids:
+        return fail('Select at least one task.')
+    if len(task_ids) > BULK_ACTION_LIMIT:
+        return fail(f'At most {BULK_ACTION_LIMIT} tasks can be changed at once.')
+
+    changes = {}
+    if operation == 'set_status':
+        if value not in dict(Task.STATUS_CHOICES):
+            return fail('Invalid status.')
+        changes = {'status': value}
+    elif operation == 'set_priority':
+        if value not in dict(Task.PRIORITY_CHOICES):
+            return fail('Invalid priority.')
+        changes = {'priority': value}
+    elif operation == 'move_project':
+        # Same choices TaskForm offers for the project field
+        project = visible_projects(request.user).filter(id=value).first() if value.isdigit() else None
+        if project is None:
+            return fail('Invalid project.')
+        changes = {'project_id': project.id}
+
+    allowed, skipped = partition_tasks(request.user, task_ids, BULK_OPERATIONS[operation])
+    if operation == 'delete':
+        delete_tasks(allowed)
+    else:
+        update_tasks(allowed, **changes)
+
+    changed = sorted(task.id for task in allowed)
+    if wants_json(request):
+        return JsonResponse({'operation': operation, 'changed': changed, 'skipped': skipped})
+    if changed:
+        messages.success(request, f'{len(changed)} tasks updated.' if operation != 'delete' else f'{len(changed)} tasks deleted.')
+    if skipped:
+        messages.warning(request, f'{len(skipped)} tasks skipped for lack of permission.')
+    return redirect('task_list')
 
 @login_required
 def create_project(request):
@@ -154,6 +441,7 @@ def create_project(request):
             else:
                 project.user = request.user
             project.save()
+            activity.record_project(request.user, 'created', project)
             
             # Handle user assignments
             if request.user.is_superuser and 'assigned_users' in request.POST:
@@ -175,7 +463,7 @@ def create_project(request):
                 messages.success(request, 'Project created successfully.')
             
             # Create an initial task
-            Task.objects.create(
+            initial_task = Task.objects.create(
                 title=f"Initial task for {project.name}",
                 description="Placeholder task - edit or delete as needed",
                 user=project.user,
@@ -184,6 +472,7 @@ def create_project(request):
                 priority='Low',
                 status='Pending'
             )
+            activity.record_task(request.user, 'created', initial_task)
             return redirect('task_list')
     else:
         form = ProjectForm(user=request.user)
@@ -194,7 +483,6 @@ def create_project(request):
         'is_admin': request.user.is_superuser,
     }
     if request.user.is_superuser:
-        context['all_users'] = User.objects.all()
         context['current_assigned_users'] = []
     
     return render(request, 'project_form.html', context)
@@ -202,17 +490,19 @@ def create_project(request):
 @login_required
 def update_project(request, project_id):
     if request.user.is_superuser:
-        project = get_object_or_404(Project, id=project_id)
+        project = get_object_or_404(Project, id=project_id, pending_deletion=False)
     else:
-        project = get_object_or_404(Project, id=project_id, user=request.user)
+        project = get_object_or_404(Project, id=project_id, user=request.user, pending_deletion=False)
         
     if request.method == "POST":
         form = ProjectForm(request.POST, instance=project, user=request.user)
         if form.is_valid():
+            changes = activity.form_changes(form)
             project = form.save(commit=False)
             project.save()
             
             if request.user.is_superuser and 'assigned_users' in request.POST:
+                previously_assigned = list(project.assigned_users.values_list('id', flat=True))
                 # Get the list of selected user IDs from checkboxes
                 assigned_user_ids = request.POST.getlist('assigned_users')
                 assigned_users = User.objects.filter(id__in=assigned_user_ids)
@@ -220,19 +510,30 @@ def update_project(request, project_id):
                 project.assigned_users.clear()
                 project.assigned_users.set(assigned_users)
                 # Ensure the owner is included (if not already selected)
+                assigned_ids = [user.id for user in assigned_users]
                 if project.user not in assigned_users:
                     project.assigned_users.add(project.user)
+                    assigned_ids.append(project.user_id)
+                changes.update(activity.diff(
+                    {'assigned_users': previously_assigned}, {'assigned_users': assigned_ids},
+                ))
                 messages.success(
                     request,
                     f'Project updated successfully with {project.assigned_users.count()} assigned users.'
                 )
             else:
                 # For non-admins, ensure they remain assigned
-                if request.user not in project.assigned_users.all():
+                previously_assigned = list(project.assigned_users.values_list('id', flat=True))
+                if request.user.id not in previously_assigned:
+                    changes.update(activity.diff(
+                        {'assigned_users': previously_assigned}, {'assigned_users': [request.user.id]},
+                    ))
                     project.assigned_users.clear()
                     project.assigned_users.add(request.user)
                 messages.success(request, 'Project updated successfully!')
             
+            if changes:
+                activity.record_project(request.user, 'updated', project, changes)
             return redirect('task_list')
     else:
         form = ProjectForm(instance=project, user=request.user)
@@ -243,16 +544,20 @@ def update_project(request, project_id):
         'is_admin': request.user.is_superuser,
     }
     if request.user.is_superuser:
-        context['all_users'] = User.objects.all()
-        context['current_assigned_users'] = project.assigned_users.all()
+        # Only the current assignees are rendered; the picker searches the rest
+        context['current_assigned_users'] = project.assigned_users.order_by('username')
     
     return render(request, 'project_form.html', context)
 
 @login_required
 def delete_project(request, project_id):
-    project = get_object_or_404(Project, id=project_id, user=request.user)
-    project.delete()
-    messages.success(request, 'Project deleted successfully!')
+    project = get_object_or_404(Project, id=project_id, user=request.user, pending_deletion=False)
+    if project.tasks.count() >= settings.PROJECT_PURGE_BACKGROUND_TASKS:
+        purge_in_background(project)
+        messages.success(request, 'Project is being deleted in the background.')
+    else:
+        purge_project(project)
+        messages.success(request, 'Project deleted successfully!')
     return redirect('task_list')
 
 @login_required
@@ -263,36 +568,32 @@ def create_task(request, project_id=None):
             task = form.save(commit=False)
             task.user = request.user
             task.save()
+            activity.record_task(request.user, 'created', task)
             messages.success(request, 'Task created successfully!')
             return redirect('task_list')
     else:
         initial_data = {}
         if project_id:
-            project = get_object_or_404(Project, id=project_id)
-            if project.user == request.user or request.user.is_superuser:
+            project = get_object_or_404(Project, id=project_id, pending_deletion=False)
+            if PermissionResolver(request.user).can_add_to_project(project):
                 initial_data = {'project': project}
             else:
-                has_permission = Task.objects.filter(
-                    project=project,
-                    taskpermission__user=request.user,
-                    taskpermission__permission_type__in=['edit', 'delete']
-                ).exists()
-                if has_permission:
-                    initial_data = {'project': project}
-                else:
-                    raise PermissionDenied("You don't have permission to add tasks to this project.")
+                raise PermissionDenied("You don't have permission to add tasks to this project.")
         form = TaskForm(request.user, initial=initial_data)
     return render(request, 'task_form.html', {'form': form, 'action': 'Create'})
 
 @login_required
 def update_task(request, task_id):
-    task = get_object_or_404(Task, id=task_id)
+    task = get_object_or_404(live_tasks(), id=task_id)
     if not check_task_permission(request.user, task, 'edit'):
         raise PermissionDenied("You don't have permission to edit this task.")
     if request.method == "POST":
         form = TaskForm(request.user, request.POST, instance=task)
         if form.is_valid():
+            changes = activity.form_changes(form)
             form.save()
+            if changes:
+                activity.record_task(request.user, 'updated', task, changes)
             messages.success(request, 'Task updated successfully!')
             return redirect('task_list')
     else:
@@ -301,9 +602,10 @@ def update_task(request, task_id):
 
 @login_required
 def delete_task(request, task_id):
-    task = get_object_or_404(Task, id=task_id)
+    task = get_object_or_404(live_tasks(), id=task_id)
     if not check_task_permission(request.user, task, 'delete'):
         raise PermissionDenied("You don't have permission to delete this task.")
+    activity.record_task(request.user, 'deleted', task)
     task.delete()
     messages.success(request, 'Task deleted successfully!')
     return redirect('task_list')
@@ -311,19 +613,22 @@ def delete_task(request, task_id):
 @login_required
 @user_passes_test(is_admin)
 def manage_task_permissions(request, task_id):
-    task = get_object_or_404(Task, id=task_id)
+    task = get_object_or_404(live_tasks(), id=task_id)
     user = task.user
     if request.method == "POST":
         permission_type = request.POST.get('permission_type', '')
+        previous = TaskPermission.objects.filter(user=user, task=task).values_list('permission_type', flat=True).first()
         if permission_type in ['view', 'edit', 'delete']:
             TaskPermission.objects.update_or_create(
                 user=user,
                 task=task,
                 defaults={'permission_type': permission_type, 'assigned_by': request.user}
             )
+            activity.record_permission(request.user, task, user, previous, permission_type)
             messages.success(request, f"Permissions updated for {user.username}")
         elif permission_type == '':
             TaskPermission.objects.filter(user=user, task=task).delete()
+            activity.record_permission(request.user, task, user, previous, None)
             messages.success(request, f"Permissions removed for {user.username}")
         return redirect('task_list')
 
@@ -337,22 +642,82 @@ def manage_task_permissions(request, task_id):
         'current_permission': current_permission
     })
 
+@login_required
+@user_passes_test(is_admin)
+def bulk_task_permissions(request):
+    if request.method == "POST":
+        def fail(message):
+            if wants_json(request):
+                return JsonResponse({'error': message}, status=400)
+            messages.error(request, message)
+            return redirect('bulk_task_permissions')
+
+        action = request.POST.get('action', 'grant')
+        permission_type = request.POST.get('permission_type', '')
+        if action not in ('grant', 'revoke'):
+            return fail('Invalid action.')
+        if action == 'grant' and permission_type not in PERMISSION_LEVELS:
+            return fail('Invalid permission type.')
+        try:
+            user_ids = {int(user_id) for user_id in request.POST.getlist('user_ids')}
+            task_ids = {int(task_id) for task_id in request.POST.getlist('task_ids')}
+        except ValueError:
+            return fail('Invalid ID.')
+        user_ids = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+        if not user_ids:
+            return fail('Select at least one user.')
+
+        # Never write grants onto tasks a background purge is deleting
+        tasks = live_tasks()
+        project_id = request.POST.get('project', '')
+        if project_id:
+            if not project_id.isdigit():
+                return fail('Invalid project.')
+            tasks = tasks.filter(project_id=project_id)
+        if task_ids:
+            tasks = tasks.filter(id__in=task_ids)
+        if not project_id and not task_ids:
+            return fail('Choose a project or tasks to apply the permissions to.')
+        status = request.POST.get('status', '')
+        if status:
+            if status not in dict(Task.STATUS_CHOICES):
+                return fail('Invalid status.')
+            tasks = tasks.filter(status=status)
+
+        if action == 'grant':
+            count = grant_permissions(tasks, user_ids, permission_type, request.user)
+            message = f'{count} permissions granted.'
+        else:
+            count = revoke_permissions(tasks, user_ids)
+            message = f'{count} permissions revoked.'
+        if wants_json(request):
+            return JsonResponse({'action': action, 'count': count})
+        messages.success(request, message)
+        return redirect('task_list')
+
+    return render(request, 'bulk_permissions.html', {
+        'status_choices': Task.STATUS_CHOICES,
+    })
+
 @login_required
 @user_passes_test(is_admin)
 def set_task_permission(request, task_id):
-    task = get_object_or_404(Task, id=task_id)
+    task = get_object_or_404(live_tasks(), id=task_id)
     user = task.user
     if request.method == "POST":
         permission_type = request.POST.get('permission_type', '')
+        previous = TaskPermission.objects.filter(user=user, task=task).values_list('permission_type', flat=True).first()
         if permission_type in ['view', 'edit', 'delete']:
             TaskPermission.objects.update_or_create(
                 task=task,
                 user=user,
                 defaults={'permission_type': permission_type, 'assigned_by': request.user}
             )
+            activity.record_permission(request.user, task, user, previous, permission_type)
             messages.success(request, 'Permission updated successfully.')
         elif permission_type == '':
             TaskPermission.objects.filter(task=task, user=user).delete()
+            activity.record_permission(request.user, task, user, previous, None)
             messages.success(request, 'Permission removed successfully.')
         return redirect('task_list')
     return redirect('task_list')
\ No newline at end of file